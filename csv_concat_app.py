@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 import logging
 import subprocess
@@ -9,6 +10,12 @@ import threading
 import webbrowser
 import time
 
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from merge import merge_sorted, merge_to_csv
+from partitions import write_partitions
+
 class CSVConcatenatorApp:
     def __init__(self, root):
         self.root = root
@@ -91,10 +98,33 @@ class CSVConcatenatorApp:
         self.output_dir_label.grid(row=8, column=0, columnspan=3, sticky=tk.W, 
                                   pady=(0, 20))
         
+        # Concatenate controls
+        concat_frame = ttk.Frame(main_frame)
+        concat_frame.grid(row=9, column=0, columnspan=3, pady=(0, 20))
+        
         # Concatenate button
-        self.concat_btn = ttk.Button(main_frame, text="Concatenate Files", 
+        self.concat_btn = ttk.Button(concat_frame, text="Concatenate Files", 
                                    command=self.concatenate_files, state=tk.DISABLED)
-        self.concat_btn.grid(row=9, column=0, columnspan=3, pady=(0, 20))
+        self.concat_btn.grid(row=0, column=0, padx=(0, 10))
+        
+        # Merge mode: interleave time-sorted files instead of stacking them
+        self.merge_var = tk.BooleanVar(value=False)
+        self.merge_check = ttk.Checkbutton(concat_frame, 
+                                         text="Merge by time (each file sorted; drops duplicate rows)", 
+                                         variable=self.merge_var)
+        self.merge_check.grid(row=0, column=1)
+        
+        # Partitioned output: a Parquet folder per day instead of one big file
+        self.partition_var = tk.BooleanVar(value=False)
+        self.partition_check = ttk.Checkbutton(concat_frame, 
+                                             text="Partitioned Parquet output (one folder per day)", 
+                                             variable=self.partition_var)
+        self.partition_check.grid(row=1, column=1, sticky=tk.W)
+        self.by_patient_var = tk.BooleanVar(value=False)
+        self.by_patient_check = ttk.Checkbutton(concat_frame, 
+                                              text="...and per patient_id", 
+                                              variable=self.by_patient_var)
+        self.by_patient_check.grid(row=2, column=1, sticky=tk.W)
         
         # Progress bar
         self.progress_var = tk.DoubleVar()
@@ -219,6 +249,10 @@ class CSVConcatenatorApp:
         if not self.selected_files or not self.output_directory:
             messagebox.showerror("Error", "Please select files and output directory")
             return
+        
+        if self.merge_var.get():
+            self.merge_files()
+            return
             
         try:
             self.status_label.config(text="Starting concatenation...", foreground="blue")
@@ -290,6 +324,10 @@ class CSVConcatenatorApp:
             self.progress_var.set(75)
             self.root.update()
             
+            if self.partition_var.get():
+                self.save_partitioned(concatenated_df)
+                return
+            
             # Generate output filenames
             timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
             csv_filename = f"concatenated_{timestamp}.csv"
@@ -326,6 +364,120 @@ class CSVConcatenatorApp:
             self.status_label.config(text=f"Error: {str(e)}", foreground="red")
             messagebox.showerror("Error", f"Concatenation failed: {str(e)}")
             
+    def merge_files(self):
+        """Merge the selected time-sorted CSV files into one sorted CSV without duplicates"""
+        try:
+            self.status_label.config(text="Merging files by time...", foreground="blue")
+            self.progress_var.set(0)
+            self.root.update()
+            
+            timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
+            csv_filename = f"merged_{timestamp}.csv"
+            csv_path = os.path.join(self.output_directory, csv_filename)
+            
+            def progress(rows):
+                self.status_label.config(text=f"Merging files by time... {rows:,} rows written")
+                self.root.update()
+            
+            if self.partition_var.get():
+                stats = {}
+                
+                def batches():
+                    for batch in merge_sorted(self.selected_files, stats=stats):
+                        yield batch
+                        progress(stats['rows'])
+                
+                # Merged batches arrive in time order, so each day is written once
+                self.save_partitioned(batches(), stats)
+                return
+            
+            # Files are streamed chunk by chunk, so the merged rows never sit in memory
+            stats = merge_to_csv(self.selected_files, csv_path, progress=progress)
+            self.logger.info(f"Merged {len(self.selected_files)} files into {csv_path}: {stats}")
+            
+            self.progress_var.set(100)
+            self.status_label.config(text="Merge completed successfully!", foreground="green")
+            self.display_merge_results(stats, csv_path)
+            
+            messagebox.showinfo("Success", 
+                              f"Files merged successfully!\n\n"
+                              f"CSV saved to: {csv_filename}\n\n"
+                              f"Total rows: {stats['rows']}\n"
+                              f"Duplicate rows dropped: {stats['duplicates']}")
+        
+        except Exception as e:
+            self.logger.error(f"Error during merge: {str(e)}")
+            self.status_label.config(text=f"Error: {str(e)}", foreground="red")
+            messagebox.showerror("Error", f"Merge failed: {str(e)}")
+    
+    def save_partitioned(self, data, stats=None):
+        """
+        Write rows to a new date-partitioned Parquet folder in the output directory.
+        
+        Args:
+            data: Concatenated DataFrame, or an iterable of time-sorted frames
+            stats (dict, optional): Merge statistics, filled while ``data`` is consumed
+        """
+        timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
+        folder_name = f"partitioned_{timestamp}"
+        directory = os.path.join(self.output_directory, folder_name)
+        frames = [data] if isinstance(data, pd.DataFrame) else data
+        
+        metadata = write_partitions(frames, directory, by_patient=self.by_patient_var.get())
+        self.logger.info(f"Saved {len(metadata['partitions'])} partitions to: {directory}")
+        
+        self.progress_var.set(100)
+        self.status_label.config(text="Partitioned output completed successfully!", foreground="green")
+        self.display_partition_results(metadata, directory, stats)
+        
+        messagebox.showinfo("Success", 
+                          f"Files written successfully!\n\n"
+                          f"Folder: {folder_name}\n\n"
+                          f"Total rows: {metadata['rows']}\n"
+                          f"Partitions: {len(metadata['partitions'])}")
+    
+    def display_partition_results(self, metadata, directory, stats=None):
+        """Display partitioned output results in the results text area"""
+        self.results_text.delete(1.0, tk.END)
+        
+        results = f"PARTITIONED OUTPUT RESULTS\n"
+        results += f"=" * 50 + "\n\n"
+        
+        results += f"Total rows: {metadata['rows']}\n"
+        if stats:
+            results += f"Duplicate rows dropped: {stats['duplicates']}\n"
+        results += f"Time range: {metadata['min_time']} to {metadata['max_time']}\n\n"
+        
+        results += f"Partitions ({len(metadata['partitions'])}):\n"
+        for entry in metadata['partitions']:
+            results += f"  {entry['path']}: {entry['rows']} rows\n"
+        
+        results += f"\nOutput folder:\n"
+        results += f"  {directory}\n"
+        
+        self.results_text.insert(1.0, results)
+    
+    def display_merge_results(self, stats, csv_path):
+        """Display merge results in the results text area"""
+        self.results_text.delete(1.0, tk.END)
+        
+        results = f"MERGE RESULTS\n"
+        results += f"=" * 50 + "\n\n"
+        
+        results += f"Input files: {len(self.selected_files)}\n"
+        results += f"Total rows: {stats['rows']}\n"
+        results += f"Duplicate rows dropped: {stats['duplicates']}\n"
+        results += f"Sorted by: {stats['time_column']}\n"
+        
+        results += f"\nOutput files:\n"
+        results += f"  CSV: {os.path.basename(csv_path)}\n"
+        results += f"  Excel: not written in merge mode\n"
+        
+        results += f"\nOutput directory:\n"
+        results += f"  {self.output_directory}\n"
+        
+        self.results_text.insert(1.0, results)
+
     def display_results(self, df, csv_path, excel_path):
         """Display concatenation results in the results text area"""
         self.results_text.delete(1.0, tk.END)
@@ -0,0 +1,321 @@
+"""
+Load generator for a running dashboard server.
+
+Replays reviewer sessions against Dash's callback endpoint
+(``/_dash-update-component``) from several threads at once. Each session
+uploads a CSV file, waits for the background conversion, draws the plot and
+the panels below it, then moves the date slider in bursts (redrawing all of
+them) and switches an axis now and then. Latency
+percentiles and throughput are reported per callback, for sizing gunicorn
+workers/threads and checking caching changes.
+
+Camera rotations and small-dataset range changes are handled by clientside
+callbacks in the browser and never reach the server, so they aren't replayed.
+
+Usage:
+    gunicorn --chdir src app:server -w 4 --threads 2 -b 127.0.0.1:8050 &
+    python load_generator.py --url http://127.0.0.1:8050 --sessions 8 --bursts 5
+"""
+
+import argparse
+import base64
+import io
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Panels redrawn along with the plot whenever the date range changes:
+# (name in the report, an output of their callback)
+RANGE_PANELS = [
+    ('timeseries', 'timeseries-graph.figure'),
+    ('projections', 'proj-hrv-hr.figure'),
+    ('correlation', 'correlation-graph.figure'),
+]
+
+# Columns the axis switches pick from
+AXIS_COLUMNS = [
+    'heart_rate_max', 'heart_rate_median', 'heart_rate_variability_max',
+    'heart_rate_variability_median', 'respiration_rate_max', 'relative_stroke_volume_max'
+]
+
+
+def layout_values(node, values=None):
+    """
+    Initial properties of every component with an id, from the layout the
+    server sends the browser (``/_dash-layout``).
+
+    Args:
+        node: Layout, or a part of it
+        values (dict, optional): Dict to fill in
+
+    Returns:
+        dict: 'id.property' -> initial value
+    """
+    values = {} if values is None else values
+    if isinstance(node, list):
+        for child in node:
+            layout_values(child, values)
+    elif isinstance(node, dict) and 'props' in node:
+        component_id = node['props'].get('id')
+        for prop, value in node['props'].items():
+            if isinstance(component_id, str) and prop not in ('id', 'children'):
+                values[f"{component_id}.{prop}"] = value
+            layout_values(value, values)
+    return values
+
+
+def synthetic_csv(rows, seed):
+    """
+    A raw (new format) CSV file with one reading every 10 seconds.
+
+    Args:
+        rows (int): Rows to generate
+        seed (int): Random seed; different seeds give different file hashes,
+            so uploads aren't served from the dataset cache
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'BiosignalTime': pd.date_range('2024-01-01', periods=rows, freq='10s'),
+        'HeartRateValue': rng.normal(70, 8, rows).round(1),
+        'RespirationRateValue': rng.normal(14, 2, rows).round(1),
+        'HeartRateVariabilityValue': rng.normal(45, 10, rows).round(1),
+        'RelativeStrokeVolumeValue': rng.normal(1, 0.1, rows).round(3),
+        'patient_id': 'load-test'
+    })
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode('utf-8')
+
+
+class DashClient:
+    """
+    Calls server-side Dash callbacks over HTTP, like the browser does.
+
+    Inputs and states a session hasn't set itself are sent with their values
+    in the server's layout, so sessions start from the app's own defaults.
+
+    Args:
+        url (str): Base URL of the dashboard
+        timeout (float): Seconds to wait for each response
+    """
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        with urllib.request.urlopen(f"{self.url}/_dash-dependencies", timeout=timeout) as response:
+            self.callbacks = json.load(response)
+        with urllib.request.urlopen(f"{self.url}/_dash-layout", timeout=timeout) as response:
+            self.defaults = layout_values(json.load(response))
+
+    def find(self, trigger, output):
+        """
+        The callback fired by an input that updates an output.
+
+        Args:
+            trigger (str): Input as 'id.property'
+            output (str): Output as 'id.property'
+
+        Raises:
+            KeyError: If no callback matches
+        """
+        for callback in self.callbacks:
+            inputs = [f"{i['id']}.{i['property']}" for i in callback['inputs']]
+            outputs = [o.split('@')[0] for o in callback['output'].strip('.').split('...')]
+            if trigger in inputs and output in outputs and not callback.get('clientside_function'):
+                return callback
+        raise KeyError(f"no server callback from {trigger} to {output}")
+
+    def call(self, callback, values, trigger):
+        """
+        Fire a callback.
+
+        Args:
+            callback (dict): Entry of ``/_dash-dependencies``
+            values (dict): 'id.property' -> value of inputs and states
+            trigger (str): Input that changed
+
+        Returns:
+            tuple: (HTTP status, seconds, response body or None)
+        """
+        def props(entries):
+            return [
+                {'id': e['id'], 'property': e['property'],
+                 'value': values.get(f"{e['id']}.{e['property']}", self.defaults.get(f"{e['id']}.{e['property']}"))}
+                for e in entries
+            ]
+
+        body = json.dumps({
+            'output': callback['output'],
+            'inputs': props(callback['inputs']),
+            'state': props(callback['state']),
+            'changedPropIds': [trigger]
+        }).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.url}/_dash-update-component", data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            return e.code, time.perf_counter() - start, None
+        elapsed = time.perf_counter() - start
+        return status, elapsed, json.loads(data) if data else None
+
+
+class Recorder:
+    """Thread-safe collection of (callback, seconds, ok) samples."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name, status, seconds):
+        with self._lock:
+            self.samples[name].append(seconds)
+            # 204 is Dash's answer when a callback raises PreventUpdate
+            if status not in (200, 204):
+                self.errors[name] += 1
+
+    def report(self, wall_seconds):
+        """Rows of the latency table, one per callback."""
+        rows = []
+        for name, seconds in sorted(self.samples.items()):
+            ms = np.array(seconds) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            rows.append({
+                'callback': name,
+                'requests': len(ms),
+                'errors': self.errors[name],
+                'p50_ms': round(float(p50), 1),
+                'p95_ms': round(float(p95), 1),
+                'p99_ms': round(float(p99), 1),
+                'req_per_s': round(len(ms) / wall_seconds, 2)
+            })
+        return rows
+
+
+def response_value(body, component, prop):
+    """A property from a callback response, or None."""
+    if not body:
+        return None
+    return body.get('response', {}).get(component, {}).get(prop)
+
+
+def run_session(client, recorder, args, seed):
+    """One reviewer: upload, first plot and panels, then slider bursts and axis switches."""
+    rng = random.Random(seed)
+    upload = client.find('upload-data.contents', 'upload-job.data')
+    poll = client.find('upload-poll.n_intervals', 'stored-data.data')
+    graph = client.find('server-range-store.data', '3d-graph.figure')
+    panels = [(name, client.find('date-range-store.data', output)) for name, output in RANGE_PANELS]
+
+    contents = 'data:text/csv;base64,' + base64.b64encode(
+        synthetic_csv(args.rows, seed if args.unique_uploads else 0)).decode('ascii')
+    status, seconds, body = client.call(
+        upload, {'upload-data.contents': contents, 'upload-data.filename': f'load-{seed}.csv'},
+        'upload-data.contents')
+    recorder.add('upload', status, seconds)
+    job = response_value(body, 'upload-job', 'data')
+    if not job:
+        print(f"Session {seed}: upload failed ({status})")
+        return
+
+    stored = None
+    for n in range(int(args.upload_timeout / args.poll_interval)):
+        time.sleep(args.poll_interval)
+        status, seconds, body = client.call(poll, {'upload-poll.n_intervals': n, 'upload-job.data': job},
+                                            'upload-poll.n_intervals')
+        recorder.add('upload-poll', status, seconds)
+        stored = response_value(body, 'stored-data', 'data')
+        if stored is not None or response_value(body, 'upload-poll', 'disabled'):
+            break
+    if not stored:
+        print(f"Session {seed}: upload did not finish")
+        return
+
+    values = {'stored-data.data': stored}
+    status, seconds, _ = client.call(graph, values, 'stored-data.data')
+    recorder.add('graph (load)', status, seconds)
+    for name, panel in panels:
+        status, seconds, _ = client.call(panel, values, 'stored-data.data')
+        recorder.add(f'{name} (load)', status, seconds)
+
+    n_days = len(stored['dates'])
+    for _ in range(args.bursts):
+        # Dragging a slider handle sends a quick run of neighbouring ranges
+        first = rng.randrange(n_days)
+        last = rng.randrange(first, n_days)
+        for _ in range(args.burst_size):
+            last = min(max(last + rng.choice([-1, 1]), first), n_days - 1)
+            values['server-range-store.data'] = values['date-range-store.data'] = [first, last]
+            status, seconds, _ = client.call(graph, values, 'server-range-store.data')
+            recorder.add('graph (slider)', status, seconds)
+            for name, panel in panels:
+                status, seconds, _ = client.call(panel, values, 'date-range-store.data')
+                recorder.add(f'{name} (slider)', status, seconds)
+            time.sleep(args.drag_interval)
+
+        if rng.random() < args.axis_share:
+            axis = rng.choice(['x', 'y', 'z', 'color'])
+            values[f'{axis}-column.data'] = rng.choice(AXIS_COLUMNS)
+            status, seconds, _ = client.call(graph, values, f'{axis}-column.data')
+            recorder.add('graph (axis)', status, seconds)
+        time.sleep(args.think)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='dashboard base URL')
+    parser.add_argument('--sessions', type=int, default=4, help='concurrent reviewer sessions')
+    parser.add_argument('--rows', type=int, default=50_000, help='rows of each uploaded file')
+    parser.add_argument('--bursts', type=int, default=5, help='slider bursts per session')
+    parser.add_argument('--burst-size', type=int, default=8, help='range changes per burst')
+    parser.add_argument('--drag-interval', type=float, default=0.05, help='seconds between range changes in a burst')
+    parser.add_argument('--think', type=float, default=1.0, help='seconds between bursts')
+    parser.add_argument('--axis-share', type=float, default=0.5, help='chance of an axis switch after a burst')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between upload polls')
+    parser.add_argument('--upload-timeout', type=float, default=300, help='seconds to wait for a conversion')
+    parser.add_argument('--same-file', dest='unique_uploads', action='store_false',
+                        help='upload identical files, so later uploads reuse the cached dataset')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    client = DashClient(args.url)
+    recorder = Recorder()
+    threads = [
+        threading.Thread(target=run_session, args=(client, recorder, args, seed))
+        for seed in range(1, args.sessions + 1)
+    ]
+    print(f"Running {args.sessions} sessions against {args.url}...")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    rows = recorder.report(wall)
+    print(f"\n{'callback':<22}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}")
+    for row in rows:
+        print(f"{row['callback']:<22}{row['requests']:>10}{row['errors']:>8}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['req_per_s']:>8}")
+    print(f"\nWall time: {wall:.1f} s")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'args': vars(args), 'wall_seconds': wall, 'callbacks': rows}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+Batch renderer of offline HTML reports, one per patient and ISO week.
+
+Reads CSV exports or partitioned archives, splits their rows by patient and by
+week (Monday to Sunday), and renders every (patient, week) with the same
+figure code the dashboard's 3D scatter plot uses: the week is converted,
+aggregated into the pyramid, and plotted at the finest level within the point
+budget. Jobs run in a process pool, one per core by default, so hundreds of
+reports take minutes rather than hours.
+
+Reports are self-contained apart from plotly.js, which is written once to the
+output folder and shared by every report, instead of being embedded (about
+4 MB) in each file. Nothing is fetched from the network when a report is
+opened, so the whole folder can be copied or zipped and viewed offline.
+
+    reports/
+        index.html
+        plotly.min.js
+        p7/2024-01-01.html
+        p7/2024-01-08.html
+
+Usage:
+    python render_reports.py recordings/*.csv --out reports
+    python render_reports.py data/ward-3 --out reports --workers 8 --outlier-mode highlight
+"""
+
+import argparse
+import html
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+
+from app import DEFAULT_AXES, OUTLIER_MODES, build_figure, prepare_frame
+from dataset import Dataset
+from formats import compile_plan, read_header
+from partitions import PARTITION_METADATA, PATIENT_COLUMN, read_metadata, read_partitions
+from pyramid import Pyramid
+
+# Shared plotly.js bundle, next to the index
+PLOTLY_JS = 'plotly.min.js'
+
+# Patient folder of rows without a patient column
+ALL_PATIENTS = 'all'
+
+# Modebar without the plotly logo, like the dashboard
+PLOT_CONFIG = {'displaylogo': False, 'responsive': True}
+
+
+def safe_name(value):
+    """Folder name for a patient id, safe to use as a path component."""
+    return re.sub(r'[^\w.-]', '_', str(value)) or '_'
+
+
+def week_starts(times):
+    """Midnight of the Monday starting each timestamp's ISO week."""
+    days = times.dt.normalize()
+    return days - pd.to_timedelta(days.dt.weekday, unit='D')
+
+
+def csv_jobs(path):
+    """
+    Report jobs of a CSV export, one per patient and week, holding its raw rows.
+
+    Rows are only parsed here; converting and plotting them is left to the
+    workers.
+    """
+    header = read_header(path)
+    plan = compile_plan(header)
+    df = plan.read_csv(path)
+    time_column = next(c for c in df.columns if c.lower() == plan.time_column)
+    patient_column = next((c for c in df.columns if c.lower() == PATIENT_COLUMN), None)
+
+    keys = [week_starts(plan.parse_time(df[time_column]))]
+    if patient_column is not None:
+        keys.insert(0, df[patient_column].astype(str))
+    for key, rows in df.groupby(keys, sort=True):
+        patient, week = key if patient_column is not None else (ALL_PATIENTS, key[0])
+        yield {'patient': patient, 'week': week, 'header': header, 'rows': rows}
+
+
+def archive_jobs(directory):
+    """
+    Report jobs of a partitioned archive, one per patient and week.
+
+    Only the metadata is read here; each worker reads the partitions of its
+    own week.
+    """
+    metadata = read_metadata(directory)
+    weeks = {
+        (entry['patient_id'], pd.Timestamp(entry['date']) - pd.Timedelta(days=pd.Timestamp(entry['date']).weekday()))
+        for entry in metadata['partitions'] if entry['rows']
+    }
+    for patient, week in sorted(weeks, key=lambda key: (str(key[0]), key[1])):
+        yield {
+            'patient': ALL_PATIENTS if patient is None else patient,
+            'week': week,
+            'header': metadata['columns'],
+            'archive': directory,
+            'patients': None if patient is None else [patient]
+        }
+
+
+def collect_jobs(sources, since=None, until=None):
+    """
+    Report jobs of every source, keeping the weeks that overlap a date range.
+
+    Args:
+        sources (list): CSV files and partitioned archive folders
+        since, until (str, optional): Inclusive 'YYYY-MM-DD' bounds
+
+    Returns:
+        list: Job dicts with 'patient', 'week' and where to read the rows from
+
+    Raises:
+        FileNotFoundError: If a source is neither a file nor an archive
+    """
+    since = pd.Timestamp(since) if since else None
+    until = pd.Timestamp(until) if until else None
+    jobs = []
+    for source in sources:
+        if os.path.isfile(os.path.join(source, PARTITION_METADATA)):
+            source_jobs = archive_jobs(source)
+        elif os.path.isfile(source):
+            source_jobs = csv_jobs(source)
+        else:
+            raise FileNotFoundError(f"not a CSV file or partitioned archive: {source}")
+        for job in source_jobs:
+            if since is not None and job['week'] + pd.Timedelta(days=7) <= since:
+                continue
+            if until is not None and job['week'] > until:
+                continue
+            jobs.append(job)
+    return jobs
+
+
+def report_path(out_dir, job):
+    """Where the report of a job is written."""
+    return os.path.join(out_dir, safe_name(job['patient']), f"{job['week']:%Y-%m-%d}.html")
+
+
+def render_report(job, out_dir, axes=None, outlier_mode='show'):
+    """
+    Convert, aggregate and plot one patient's week, and write it as HTML.
+
+    Runs in a worker process.
+
+    Args:
+        job (dict): Job from ``collect_jobs``
+        out_dir (str): Output folder
+        axes (dict, optional): Column for 'x', 'y', 'z' and 'color';
+            defaults to ``DEFAULT_AXES``
+        outlier_mode (str): 'show', 'hide', 'highlight' or 'only'
+
+    Returns:
+        tuple: ``(path, rows plotted, pyramid level)``
+    """
+    start, end = job['week'], job['week'] + pd.Timedelta(days=7)
+    if 'archive' in job:
+        rows = read_partitions(job['archive'], start, end - pd.Timedelta(1, unit='ns'), job['patients'])
+    else:
+        rows = job['rows']
+    dataset = Dataset(prepare_frame(rows, compile_plan(job['header'])))
+    dataset.pyramid = Pyramid(dataset)
+
+    resolution, level, plotted = dataset.pyramid.select(start.value, end.value)
+    figure = build_figure(level, plotted, None, resolution, axes or DEFAULT_AXES, outlier_mode)
+    figure['layout'].update(
+        title=dict(text=f"{job['patient']}, week of {start:%Y-%m-%d} ({resolution})", x=0.5),
+        margin=dict(l=0, r=0, b=0, t=40)
+    )
+
+    path = report_path(out_dir, job)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    go.Figure(figure).write_html(
+        path, config=PLOT_CONFIG, full_html=True,
+        include_plotlyjs=f'../{PLOTLY_JS}', default_width='100%', default_height='100vh'
+    )
+    return path, plotted.stop - plotted.start, resolution
+
+
+def write_index(out_dir, paths):
+    """Index page linking every report, grouped by patient."""
+    by_patient = {}
+    for path in sorted(paths):
+        patient = os.path.basename(os.path.dirname(path))
+        by_patient.setdefault(patient, []).append(os.path.relpath(path, out_dir).replace(os.sep, '/'))
+
+    sections = []
+    for patient, links in by_patient.items():
+        items = ''.join(
+            f'<li><a href="{html.escape(link)}">{html.escape(os.path.basename(link)[:-5])}</a></li>'
+            for link in links
+        )
+        sections.append(f'<h2>{html.escape(patient)}</h2><ul>{items}</ul>')
+
+    path = os.path.join(out_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write(
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Reports</title></head>'
+            f'<body style="font-family: sans-serif"><h1>Reports</h1>{"".join(sections)}</body></html>'
+        )
+    return path
+
+
+def render_reports(sources, out_dir, workers=None, axes=None, outlier_mode='show', since=None, until=None):
+    """
+    Render the report of every patient and week of some sources.
+
+    Args:
+        sources (list): CSV files and partitioned archive folders
+        out_dir (str): Output folder, created if needed
+        workers (int, optional): Worker processes; one per core by default
+        axes (dict, optional): Column for 'x', 'y', 'z' and 'color'
+        outlier_mode (str): 'show', 'hide', 'highlight' or 'only'
+        since, until (str, optional): Inclusive 'YYYY-MM-DD' bounds
+
+    Returns:
+        list: Paths of the reports written; failed jobs are reported and skipped
+    """
+    started = time.perf_counter()
+    jobs = collect_jobs(sources, since, until)
+    print(f"{len(jobs)} reports to render from {len(sources)} sources")
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, PLOTLY_JS), 'w', encoding='utf-8') as fh:
+        fh.write(get_plotlyjs())
+
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(render_report, job, out_dir, axes, outlier_mode): job
+            for job in jobs
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            try:
+                path, rows, resolution = future.result()
+            except Exception as e:
+                print(f"[{done}/{len(jobs)}] {job['patient']} {job['week']:%Y-%m-%d} failed: {str(e)}")
+                continue
+            paths.append(path)
+            print(f"[{done}/{len(jobs)}] {path}: {rows} points at {resolution}")
+
+    write_index(out_dir, paths)
+    elapsed = time.perf_counter() - started
+    print(f"Rendered {len(paths)} of {len(jobs)} reports in {elapsed:.1f} s")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='+', help='CSV files and partitioned archive folders')
+    parser.add_argument('--out', default='reports', help='Output folder')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    for axis in ('x', 'y', 'z', 'color'):
+        parser.add_argument(f'--{axis}', default=DEFAULT_AXES[axis], help=f'Column plotted on {axis}')
+    parser.add_argument('--outlier-mode', default='show', choices=[mode['value'] for mode in OUTLIER_MODES])
+    parser.add_argument('--since', help='First day to report, YYYY-MM-DD')
+    parser.add_argument('--until', help='Last day to report, YYYY-MM-DD')
+    args = parser.parse_args()
+
+    axes = {axis: getattr(args, axis) for axis in ('x', 'y', 'z', 'color')}
+    paths = render_reports(args.sources, args.out, args.workers, axes, args.outlier_mode, args.since, args.until)
+    return 0 if paths else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,13 +17,33 @@ The application automatically detects the format and converts new format data to
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import base64
 import io
+import os
+import time
 
-from dash import Dash, dcc, html, Input, Output, State, callback_context
+from dash import Dash, dcc, html, Input, Output, State, Patch, callback_context, no_update
 from dash.exceptions import PreventUpdate
+from flask import Response, abort, request, stream_with_context
 from datetime import datetime
 
+from dataset import Dataset, dataset_hash, datasets, encode_array
+from pyramid import Pyramid, POINT_BUDGET, split_budget
+from features import column_label, signal_choices, split_statistic, transform_label, SEPARATOR
+from density import density_grids
+from outliers import outlier_mask
+from events import parse_events, event_codes, event_sets
+from tail import CsvTail
+from formats import FORMATS, compile_plan, detect_format, read_header
+from catalog import Catalog, DATA_DIR
+from brush import brush_masks, combine_masks
+from spatial import NEIGHBORHOOD_RADIUS, spatial_index
+from downsample import TIMESERIES_BUCKETS, minmax_downsample
+from correlation import CORRELATION_WINDOWS, rolling_correlation
+from jobs import JobCancelled, jobs, submit
+from export import EXPORT_TYPES, EXPORT_WRITERS, export_chunks, export_formats
+
 # Define common styles
 FONT_FAMILY = (
     "Inter, -apple-system, BlinkMacSystemFont, Segoe UI, Roboto, Oxygen, "
@@ -42,6 +62,85 @@ slider_container_styles = {
     'top': '-20px'
 }
 
+# Datasets up to this many rows are sent to the browser once and filtered
+# there when the date range changes; larger ones are filtered on the server.
+CLIENT_SIDE_MAX_ROWS = int(os.environ.get('CLIENT_SIDE_MAX_ROWS', 100_000))
+
+# Columns plotted on each 3D axis and the color scale until the user picks others
+DEFAULT_AXES = {
+    'x': 'heart_rate_variability_max',
+    'y': 'heart_rate_max',
+    'z': 'respiration_rate_max',
+    'color': 'relative_stroke_volume_max'
+}
+
+AXIS_LABELS = {'x': 'X axis', 'y': 'Y axis', 'z': 'Z axis', 'color': 'Color'}
+
+# Axes whose columns locate hovered and clicked points in the spatial index
+SPATIAL_AXES = ('x', 'y', 'z')
+
+# Samples listed around a clicked point
+NEIGHBORS_SHOWN = 10
+
+# Line color of each axis column in the time-series panel
+TIMESERIES_COLORS = ['#2563eb', '#dc2626', '#059669', '#d97706']
+
+# Signals correlated pairwise in the correlation panel, each through its
+# first stored statistic
+CORRELATION_SIGNALS = ['heart_rate', 'heart_rate_variability', 'respiration_rate', 'relative_stroke_volume']
+CORRELATION_STATISTICS = ['median', 'max']
+
+# Option value standing for "no statistic suffix" and "no transform"
+PLAIN = 'value'
+
+OUTLIER_MODES = [
+    {'label': 'Show all', 'value': 'show'},
+    {'label': 'Hide outliers', 'value': 'hide'},
+    {'label': 'Highlight', 'value': 'highlight'},
+    {'label': 'Only outliers', 'value': 'only'}
+]
+
+# Colors of the event categories, 'No event' first
+EVENT_COLORS = ['#d1d5db', '#dc2626', '#2563eb', '#059669', '#d97706', '#7c3aed', '#db2777', '#0891b2']
+
+# Rows parsed per step of a background upload, between progress reports
+UPLOAD_CHUNK_ROWS = int(os.environ.get('UPLOAD_CHUNK_ROWS', 200_000))
+
+# Base64 characters decoded (and hashed) at a time when spooling an upload
+UPLOAD_BLOCK_CHARS = 4 * 2**20
+
+# How often the browser asks for the progress of an upload
+UPLOAD_POLL_MS = int(os.environ.get('UPLOAD_POLL_MS', 500))
+
+# Live tailing: files must be inside WATCH_DIR, since the path comes from the browser
+WATCH_DIR = os.path.realpath(os.environ.get('WATCH_DIR', os.getcwd()))
+WATCH_INTERVAL_MS = int(os.environ.get('WATCH_INTERVAL_MS', 5000))
+
+# How often a worker rewrites the on-disk copy of a watched dataset, so
+# workers that load it catch up from a recent offset of the file
+WATCH_PERSIST_SECONDS = int(os.environ.get('WATCH_PERSIST_SECONDS', 60))
+
+# Linked 2D projections next to the 3D plot: view id -> (x column, y column)
+PROJECTIONS = {
+    'proj-hrv-hr': ('heart_rate_variability_median', 'heart_rate_median'),
+    'proj-hr-rr': ('heart_rate_median', 'respiration_rate_median'),
+    'proj-hrv-rr': ('heart_rate_variability_median', 'respiration_rate_median')
+}
+
+# Days plotted when an archive from the catalog is opened; widening the
+# range loads more partitions
+ARCHIVE_INITIAL_DAYS = int(os.environ.get('ARCHIVE_INITIAL_DAYS', 1))
+
+# Marker color and symbol of each dataset overlaid for comparison, in load order
+OVERLAY_COLORS = ['#f97316', '#0ea5e9', '#a855f7', '#22c55e', '#e11d48', '#64748b']
+OVERLAY_SYMBOLS = ['diamond', 'square', 'cross', 'circle-open', 'diamond-open', 'square-open']
+
+VIEW_MODES = [
+    {'label': 'Points', 'value': 'scatter'},
+    {'label': 'Density (count)', 'value': 'count'},
+    {'label': 'Density (mean color)', 'value': 'color'}
+]
+
 app = Dash(__name__, suppress_callback_exceptions=True)
 server = app.server
 
@@ -55,99 +154,68 @@ def convert_new_format_to_old(new_df):
     Returns:
         pd.DataFrame: DataFrame in old format
     """
-    # Normalize columns to lowercase
-    new_df.columns = [c.lower() for c in new_df.columns]
-    # ——— 0) guard against any accidental duplicate columns ———
-    new_df = new_df.loc[:, ~new_df.columns.duplicated()]
-    
-    # ——— 1) unify your time column ———
-    if 'biosignaltime' in new_df.columns:
-        # if you already have a plain 'time', drop the old one
-        if 'time' in new_df.columns:
-            new_df = new_df.drop(columns='biosignaltime')
-        else:
-            new_df = new_df.rename(columns={'biosignaltime':'time'})
-    
-    if 'time' not in new_df.columns:
-        raise KeyError("no time column found in new_df")
-    
-    # ——— 2) pick your numeric columns (exclude 'time') ———
-    numeric_cols = new_df.select_dtypes(include='number').columns.difference(['time'])
-    
-    # ——— 3) group on time → min/median/max ———
-    agg = (
-        new_df
-          .groupby('time')[numeric_cols]
-          .agg(['min','median','max'])
-    )
-    
-    # ——— 4) flatten the MultiIndex → e.g. 'heartratevalue_min' ———
-    agg.columns = [f"{col}_{stat}" for col, stat in agg.columns]
-    
-    # ——— 5) rename your sensor bases into the old-format names ———
-    base_map = {
-        'heartratevalue':            'heart_rate',
-        'respirationratevalue':      'respiration_rate',
-        'heartratevariabilityvalue': 'heart_rate_variability',
-        'relativestrokevolumevalue': 'relative_stroke_volume',
-        # …add more if you ever rename other columns…
-    }
-    def _rename(c):
-        base, stat = c.rsplit('_', 1)
-        return f"{base_map.get(base, base)}_{stat}"
-    
-    agg = agg.rename(columns={c: _rename(c) for c in agg.columns})
-    
-    # ——— 6) reset time back into a column ———
-    out = agg.reset_index()
-    
-    # ——— 7) take *all* the other (non-numeric, non-time) cols and join them back ———
-    others = [c for c in new_df.columns if c not in numeric_cols and c != 'time']
-    if others:
-        extras = new_df.groupby('time')[others].first()
-        out = out.join(extras, on='time')
-    
-    return out
+    return compile_plan(new_df.columns, FORMATS['new']).convert(new_df)
 
 def detect_data_format(df):
     """
-    Detect whether the data is in old or new format.
+    Detect which registered format the data is in, from its columns alone.
     
     Args:
         df (pd.DataFrame): Input DataFrame
         
     Returns:
-        str: 'old' or 'new'
+        str: Format name, e.g. 'old' or 'new'
     """
-    # Check for new format indicators
-    new_format_indicators = ['biosignaltime', 'heartratevalue', 'respirationratevalue', 
-                           'heartratevariabilityvalue', 'relativestrokevolumevalue']
-    
-    # Check for old format indicators
-    old_format_indicators = ['heart_rate_max', 'respiration_rate_max', 
-                           'heart_rate_variability_max', 'relative_stroke_volume_max']
-    
-    new_format_count = sum(1 for col in new_format_indicators if col in df.columns)
-    old_format_count = sum(1 for col in old_format_indicators if col in df.columns)
-    
-    print(f"New format indicators found: {new_format_count}")
-    print(f"Old format indicators found: {old_format_count}")
-    
-    if new_format_count > old_format_count:
-        return 'new'
-    elif old_format_count > 0:
-        return 'old'
-    else:
-        # If neither format is clearly detected, check for time column variations
-        time_columns = [col for col in df.columns if 'time' in col.lower()]
-        if 'biosignaltime' in time_columns:
-            return 'new'
-        elif 'time' in df.columns:
-            return 'old'
-        else:
-            # Default to old format if we can't determine
-            print("Warning: Could not determine data format, defaulting to old format")
-            return 'old'
+    return detect_format(df.columns).name
+
+def choice_options(values, label):
+    """Dropdown options for statistics or transforms, '' shown as plain values."""
+    return [{'label': label(v) if v else 'Value', 'value': v or PLAIN} for v in values]
+
+
+def axis_controls(axis):
+    """
+    Signal, statistic and transform choice for one axis (or the color).
+
+    The resulting column name is kept in the ``{axis}-column`` store.
+    """
+    signal, stat = split_statistic(DEFAULT_AXES[axis])
+    dropdown_style = {'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}
+    return html.Div([
+        html.Label(
+            AXIS_LABELS[axis],
+            style={
+                'fontFamily': FONT_FAMILY,
+                'fontSize': '0.8rem',
+                'color': '#666'
+            }
+        ),
+        html.Div([
+            dcc.Dropdown(
+                id=f'{axis}-signal',
+                options=[{'label': column_label(signal), 'value': signal}],
+                value=signal,
+                clearable=False,
+                style=dict(dropdown_style, flex='2')
+            ),
+            dcc.Dropdown(
+                id=f'{axis}-stat',
+                options=choice_options([stat], str.title),
+                value=stat or PLAIN,
+                clearable=False,
+                style=dict(dropdown_style, flex='1')
+            ),
+            dcc.Dropdown(
+                id=f'{axis}-transform',
+                options=choice_options([''], transform_label),
+                value=PLAIN,
+                clearable=False,
+                style=dict(dropdown_style, flex='1.5')
+            )
+        ], style={'display': 'flex', 'gap': '4px'}),
+        dcc.Store(id=f'{axis}-column', data=DEFAULT_AXES[axis])
+    ], style={'flex': '1', 'minWidth': '320px'})
+
 
 app.layout = html.Div([
     # Top section with title and date picker
@@ -234,17 +302,294 @@ app.layout = html.Div([
     ),
     
     html.Div(id='error-container'),
+    
+    # Progress of the upload being converted in the background
+    html.Div([
+        html.Button('Cancel upload', id='upload-cancel', n_clicks=0, disabled=True,
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}),
+        dcc.Interval(id='upload-poll', interval=UPLOAD_POLL_MS, disabled=True),
+        dcc.Store(id='upload-job')
+    ], style={'margin': '0 10px 10px 10px'}),
+    
+    # Clinical event annotations from a side CSV
+    html.Div([
+        dcc.Upload(
+            id='upload-events',
+            children=html.Div([
+                'Events: ',
+                html.A('Load event CSV (start, end, event)', style={'color': '#2563eb', 'textDecoration': 'underline'})
+            ]),
+            style={
+                'fontFamily': FONT_FAMILY,
+                'fontSize': '0.85rem',
+                'color': '#4b5563',
+                'padding': '8px 0',
+                'cursor': 'pointer'
+            },
+            multiple=False
+        ),
+        dcc.Dropdown(
+            id='event-filter',
+            options=[],
+            value=[],
+            multi=True,
+            placeholder='Show only samples during events...',
+            style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'flex': '1', 'minWidth': '250px'}
+        ),
+        dcc.Checklist(
+            id='color-by-event',
+            options=[{'label': 'Color by event', 'value': 'color'}],
+            value=[],
+            inputStyle={'marginRight': '4px'},
+            style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '8px'}
+        ),
+        html.Div(id='events-message', style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '8px'})
+    ], style={
+        'display': 'flex',
+        'flexWrap': 'wrap',
+        'gap': '15px',
+        'alignItems': 'flex-start',
+        'margin': '0 10px 10px 10px'
+    }),
+    
+    # Live tail of a CSV file that another program keeps appending to
+    html.Div([
+        dcc.Input(
+            id='watch-path',
+            type='text',
+            placeholder=f'Watch a growing CSV file in {WATCH_DIR}',
+            debounce=True,
+            style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'flex': '1', 'minWidth': '250px', 'padding': '6px'}
+        ),
+        html.Button('Start watching', id='watch-start', n_clicks=0,
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}),
+        html.Button('Stop', id='watch-stop', n_clicks=0,
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}),
+        html.Div(id='watch-status', style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '6px'}),
+        dcc.Interval(id='watch-interval', interval=WATCH_INTERVAL_MS, disabled=True)
+    ], style={
+        'display': 'flex',
+        'flexWrap': 'wrap',
+        'gap': '15px',
+        'alignItems': 'flex-start',
+        'margin': '0 10px 10px 10px'
+    }),
+    
+    # Partitioned archives in the data directory, opened from their metadata
+    html.Div([
+        dcc.Dropdown(
+            id='catalog-archive',
+            options=[],
+            placeholder=f'Open an archive from {DATA_DIR}',
+            style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'flex': '1', 'minWidth': '250px'}
+        ),
+        html.Button('Refresh list', id='catalog-refresh', n_clicks=0,
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}),
+        html.Div(id='catalog-status', style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '6px'})
+    ], style={
+        'display': 'flex',
+        'flexWrap': 'wrap',
+        'gap': '15px',
+        'alignItems': 'flex-start',
+        'margin': '0 10px 10px 10px'
+    }),
+    
+    # Further datasets drawn on the same axes for comparison
+    html.Div([
+        dcc.Upload(
+            id='upload-overlay',
+            children=html.Div([
+                'Compare: ',
+                html.A('Add datasets to overlay', style={'color': '#2563eb', 'textDecoration': 'underline'})
+            ]),
+            style={
+                'fontFamily': FONT_FAMILY,
+                'fontSize': '0.85rem',
+                'color': '#4b5563',
+                'padding': '8px 0',
+                'cursor': 'pointer'
+            },
+            multiple=True
+        ),
+        dcc.Checklist(
+            id='overlay-toggle',
+            options=[],
+            value=[],
+            inline=True,
+            inputStyle={'marginRight': '4px', 'marginLeft': '10px'},
+            style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '8px'}
+        ),
+        html.Button('Clear overlays', id='overlay-clear', n_clicks=0,
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}),
+        html.Div(id='overlay-message', style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '8px'})
+    ], style={
+        'display': 'flex',
+        'flexWrap': 'wrap',
+        'gap': '15px',
+        'alignItems': 'flex-start',
+        'margin': '0 10px 10px 10px'
+    }),
+    
+    # Column choice for each axis and the color scale
+    html.Div(
+        [axis_controls(axis) for axis in DEFAULT_AXES] + [
+            html.Div([
+                html.Label(
+                    'View',
+                    style={
+                        'fontFamily': FONT_FAMILY,
+                        'fontSize': '0.8rem',
+                        'color': '#666'
+                    }
+                ),
+                dcc.RadioItems(
+                    id='view-mode',
+                    options=VIEW_MODES,
+                    value='scatter',
+                    inline=True,
+                    inputStyle={'marginRight': '4px', 'marginLeft': '10px'},
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '8px'}
+                )
+            ], style={'flex': '1.5', 'minWidth': '300px'}),
+            html.Div([
+                html.Label(
+                    'Outliers',
+                    style={
+                        'fontFamily': FONT_FAMILY,
+                        'fontSize': '0.8rem',
+                        'color': '#666'
+                    }
+                ),
+                dcc.RadioItems(
+                    id='outlier-mode',
+                    options=OUTLIER_MODES,
+                    value='show',
+                    inline=True,
+                    inputStyle={'marginRight': '4px', 'marginLeft': '10px'},
+                    style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'paddingTop': '8px'}
+                )
+            ], style={'flex': '2', 'minWidth': '380px'})
+        ],
+        style={
+            'display': 'flex',
+            'flexWrap': 'wrap',
+            'gap': '15px',
+            'margin': '0 10px 10px 10px'
+        }
+    ),
+    
     dcc.Store(id='camera-store'),
     dcc.Store(id='stored-data'),
     dcc.Store(id='date-range-store'),
+    dcc.Store(id='server-range-store'),
+    dcc.Store(id='client-data'),
+    dcc.Store(id='events-store'),
+    dcc.Store(id='overlay-store', data=[]),
+    dcc.Store(id='overlay-traces'),
+    dcc.Store(id='brush-store'),
+    dcc.Store(id='timeseries-window'),
+    dcc.Store(id='watch-rows'),
     
     # Graph and slider section
     html.Div([
+        # Download of the rows in the current view
+        html.Div([
+            dcc.Dropdown(
+                id='export-format',
+                options=[{'label': fmt.upper(), 'value': fmt} for fmt in export_formats()],
+                value='csv',
+                clearable=False,
+                style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'width': '110px'}
+            ),
+            html.A(
+                'Export view',
+                id='export-link',
+                href='',
+                style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem', 'color': '#2563eb', 'paddingTop': '8px'}
+            )
+        ], style={
+            'display': 'flex',
+            'gap': '10px',
+            'justifyContent': 'flex-end',
+            'margin': '0 10px'
+        }),
+        
         dcc.Graph(
             id='3d-graph',
             style={'height': '70vh'}
         ),
         
+        # The plotted columns over time; zooming here narrows the date range
+        dcc.Graph(
+            id='timeseries-graph',
+            config={'displaylogo': False},
+            style={'height': '45vh', 'margin': '0 10px'}
+        ),
+        
+        # Sliding-window correlations between the signals over the date range
+        html.Div([
+            html.Label(
+                'Correlation window',
+                style={
+                    'fontFamily': FONT_FAMILY,
+                    'fontSize': '0.8rem',
+                    'color': '#666'
+                }
+            ),
+            dcc.RadioItems(
+                id='correlation-window',
+                options=[{'label': name, 'value': name} for name, _, _ in CORRELATION_WINDOWS],
+                value='1 hour',
+                inline=True,
+                inputStyle={'marginRight': '4px', 'marginLeft': '10px'},
+                style={'fontFamily': FONT_FAMILY, 'fontSize': '0.85rem'}
+            ),
+            dcc.Graph(
+                id='correlation-graph',
+                config={'displaylogo': False},
+                style={'height': '30vh'}
+            )
+        ], style={'margin': '0 10px'}),
+        
+        # Samples behind the hovered marker, and around the clicked one
+        html.Div([
+            html.Div(id='point-details', style={'flex': '1', 'minWidth': '280px'}),
+            html.Div([
+                html.Div('Neighborhood radius (standard deviations)'),
+                dcc.Slider(
+                    id='neighborhood-radius',
+                    min=0.05,
+                    max=1,
+                    step=0.05,
+                    value=NEIGHBORHOOD_RADIUS,
+                    marks={0.25: '0.25', 0.5: '0.5', 1: '1'}
+                ),
+                html.Div(id='point-neighborhood')
+            ], style={'flex': '1', 'minWidth': '280px'})
+        ], style={
+            'display': 'flex',
+            'flexWrap': 'wrap',
+            'gap': '15px',
+            'margin': '0 10px 10px 10px',
+            'fontFamily': FONT_FAMILY,
+            'fontSize': '0.85rem'
+        }),
+        
+        # Box or lasso selections here filter the other views and the 3D plot
+        html.Div([
+            dcc.Graph(
+                id=view,
+                config={'displaylogo': False},
+                style={'height': '35vh', 'flex': '1', 'minWidth': '280px'}
+            )
+            for view in PROJECTIONS
+        ], style={
+            'display': 'flex',
+            'flexWrap': 'wrap',
+            'gap': '10px',
+            'margin': '0 10px'
+        }),
+        
         html.Div(
             id='slider-container',
             style={
@@ -265,26 +610,28 @@ def parse_contents(contents):
     """Parse the uploaded CSV file and handle both old and new data formats."""
     content_type, content_string = contents.split(',')
     decoded = base64.b64decode(content_string)
-    
-    try:
-        df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-        
-        # Normalize columns to lowercase
-        df.columns = [c.lower() for c in df.columns]
+    plan = compile_plan(read_header(io.BytesIO(decoded)))
+    return prepare_frame(plan.read_csv(io.BytesIO(decoded)), plan)
+
 
-        # Detect the data format
-        data_format = detect_data_format(df)
-        print(f"Detected data format: {data_format}")
+def prepare_frame(df, plan=None):
+    """
+    Bring parsed CSV rows of any registered format into the old format.
+
+    Args:
+        df (pd.DataFrame): Parsed rows
+        plan (ParsePlan, optional): Plan the rows were read with; compiled
+            from their columns if not given
+    """
+    try:
+        if plan is None:
+            plan = compile_plan(df.columns)
+        print(f"Detected data format: {plan.format.name}")
         print(f"Original columns: {list(df.columns)}")
         
-        # Convert new format to old format if necessary
-        if data_format == 'new':
-            print("Converting new format to old format...")
-            df = convert_new_format_to_old(df)
-            print(f"Converted columns: {list(df.columns)}")
-        
-        # Ensure time column is properly formatted
-        df['time'] = pd.to_datetime(df['time'])
+        # Unify and parse the time column, aggregating raw formats per timestamp
+        df = plan.convert(df)
+        print(f"Converted columns: {list(df.columns)}")
         
         # Verify required columns exist
         required_columns = ['heart_rate_variability_max', 'heart_rate_max', 
@@ -300,264 +647,2066 @@ def parse_contents(contents):
         raise
 
 
+# Partitions are converted one by one as they are read, like uploads
+catalog = Catalog(DATA_DIR, convert=prepare_frame)
+
+
 @app.callback(
-    [Output('stored-data', 'data'),
-     Output('slider-container', 'children'),
-     Output('error-container', 'children')],
+    [Output('upload-job', 'data'),
+     Output('upload-poll', 'disabled'),
+     Output('upload-cancel', 'disabled'),
+     Output('error-container', 'children', allow_duplicate=True)],
     Input('upload-data', 'contents'),
     State('upload-data', 'filename'),
     prevent_initial_call=True
 )
 def process_data(contents, filename):
+    """Spool an upload to disk and convert it in the background."""
     if contents is None:
-        return {}, None, ""
+        raise PreventUpdate
     
     try:
-        # Parse the uploaded file
-        df = parse_contents(contents)
-        
-        # Get unique dates and sort them
-        dates = df['time'].dt.date.unique()
-        dates.sort()
+        content_type, content_string = contents.split(',')
+        job_id = jobs.create(filename=filename)
+        path = jobs.upload_path(job_id)
+        digest = spool_upload(content_string, path)
+        state = jobs.update(job_id, total_bytes=os.path.getsize(path), dataset_id=digest)
         
-        # Prepare stored data (JSON-serializable)
-        stored_data = {
-            'df': df.to_dict('records'),
-            'dates': [d.strftime('%d-%m-%Y') for d in dates]
-        }
+        if datasets.contains(digest):
+            # Same bytes and dataset format as an earlier upload: reuse its converted dataset
+            os.remove(path)
+            jobs.update(job_id, status='done', cached=True)
+            return {'job_id': job_id}, False, True, status_message(f"♻️ {filename} was loaded before, reusing it")
         
-        # Create slider component
-        slider_component = html.Div([
-            dcc.RangeSlider(
-                id='date-slider',
-                min=0,
-                max=len(dates) - 1,
-                value=[0, len(dates) - 1],
-                marks={
-                    i: {
-                        'label': dates[i].strftime('%d-%m-%Y'),
-                        'style': {
-                            'white-space': 'nowrap',
-                            'padding-top': '10px',
-                            'font-size': '11px'
-                        }
-                    }
-                    for i in range(0, len(dates), max(1, len(dates) // 8))
-                },
-                step=1,
-                tooltip={
-                    "placement": "bottom",
-                    "always_visible": True
-                },
-                allowCross=False
-            )
-        ])
+        submit(run_upload_job, job_id)
+        return {'job_id': job_id}, False, False, upload_progress(state)
+    
+    except Exception as e:
+        print(f"Error processing file: {str(e)}")
+        return None, True, True, status_message(f"❌ Error processing file: {str(e)}", error=True)
+
+
+def spool_upload(content_string, path, block=UPLOAD_BLOCK_CHARS):
+    """
+    Decode base64 upload contents to a file, hashing the bytes on the way.
+
+    Args:
+        content_string (str): Base64 part of the upload contents
+        path (str): File to write the decoded bytes to
+        block (int): Characters decoded at a time, a multiple of 4
+
+    Returns:
+        str: SHA-256 hex digest of the dataset format and the decoded bytes,
+        used as dataset id
+    """
+    digest = dataset_hash()
+    with open(path, 'wb') as fh:
+        for start in range(0, len(content_string), block):
+            data = base64.b64decode(content_string[start:start + block])
+            digest.update(data)
+            fh.write(data)
+    return digest.hexdigest()
+
+
+def run_upload_job(job_id):
+    """
+    Parse, convert and index a spooled upload in a pool process.
+
+    Progress (bytes and rows parsed, rows converted) is written to the job
+    store after every chunk, and the job stops at the next chunk once
+    cancelled. The dataset ends up in the shared dataset store.
+    """
+    path = jobs.upload_path(job_id)
+    try:
+        jobs.update(job_id, status='running', stage='parsing', bytes_parsed=0, rows_parsed=0)
+        chunks = []
+        rows = 0
+        with open(path, 'rb') as fh:
+            # The format is decided from the header, before any row is parsed
+            plan = compile_plan(read_header(fh))
+            fh.seek(0)
+            for chunk in plan.read_csv(fh, chunksize=UPLOAD_CHUNK_ROWS):
+                jobs.check(job_id)
+                chunks.append(chunk)
+                rows += len(chunk)
+                jobs.update(job_id, bytes_parsed=fh.tell(), rows_parsed=rows)
         
-        # Create success message
-        success_message = html.Div([
-            html.P(
-                f"✅ Successfully loaded {filename}",
-                style={
-                    'color': '#059669',
-                    'fontFamily': FONT_FAMILY,
-                    'fontSize': '0.9rem',
-                    'margin': '10px 0',
-                    'padding': '8px 12px',
-                    'backgroundColor': '#d1fae5',
-                    'borderRadius': '6px',
-                    'border': '1px solid #a7f3d0'
-                }
-            )
-        ])
+        state = jobs.update(job_id, stage='converting', bytes_parsed=os.path.getsize(path))
+        dataset = Dataset(prepare_frame(pd.concat(chunks, ignore_index=True), plan), state.get('dataset_id'))
+        jobs.check(job_id)
         
-        return stored_data, slider_component, success_message
+        jobs.update(job_id, stage='indexing', rows_converted=len(dataset))
+        publish_dataset(dataset)
+        jobs.update(job_id, status='done', dataset_id=dataset.dataset_id)
     
+    except JobCancelled:
+        jobs.update(job_id, status='cancelled')
     except Exception as e:
-        error_message = html.Div([
-            html.P(
-                f"❌ Error processing file: {str(e)}",
-                style={
-                    'color': '#dc2626',
-                    'fontFamily': FONT_FAMILY,
-                    'fontSize': '0.9rem',
-                    'margin': '10px 0',
-                    'padding': '8px 12px',
-                    'backgroundColor': '#fee2e2',
-                    'borderRadius': '6px',
-                    'border': '1px solid #fecaca'
-                }
-            )
-        ])
-        return {}, None, error_message
+        print(f"Error processing file: {str(e)}")
+        jobs.update(job_id, status='failed', error=str(e))
+    finally:
+        # The final poll may already have removed the job's files
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
 
-# Callback to store camera position from 3D graph interactions
-@app.callback(
-    Output('camera-store', 'data'),
-    Input('3d-graph', 'relayoutData'),
-    prevent_initial_call=True
-)
-def store_camera(relayout_data):
-    if relayout_data and 'scene.camera' in relayout_data:
-        return relayout_data['scene.camera']
-    raise PreventUpdate
+def upload_progress(state):
+    """Progress bar and counters of a background upload."""
+    total = max(state.get('total_bytes', 0), 1)
+    parsed = state.get('bytes_parsed', 0)
+    text = f"⏳ {state.get('filename')}: {parsed / 1e6:.1f} of {total / 1e6:.1f} MB parsed"
+    if state.get('rows_parsed'):
+        text += f", {state['rows_parsed']:,} rows"
+    if state.get('rows_converted'):
+        text += f", {state['rows_converted']:,} converted"
+    if state.get('stage') in ('converting', 'indexing'):
+        text += f" ({state['stage']})"
+    return html.Div([
+        html.Progress(value=str(parsed), max=str(total), style={'width': '300px', 'marginRight': '10px'}),
+        html.Span(text)
+    ], style={
+        'fontFamily': FONT_FAMILY,
+        'fontSize': '0.9rem',
+        'color': '#4b5563',
+        'margin': '10px 0',
+        'padding': '8px 12px'
+    })
 
 
-# Callback to update the 3D graph based on stored data and slider selection
 @app.callback(
-    Output('3d-graph', 'figure'),
-    [Input('stored-data', 'data'),
-     Input('date-slider', 'value')],
-    State('camera-store', 'data'),
+    [Output('stored-data', 'data'),
+     Output('slider-container', 'children'),
+     Output('error-container', 'children'),
+     Output('date-range-store', 'data'),
+     Output('events-store', 'data')] +
+    [Output(f'{axis}-signal', 'options') for axis in DEFAULT_AXES] +
+    [Output('upload-poll', 'disabled', allow_duplicate=True),
+     Output('upload-cancel', 'disabled', allow_duplicate=True)],
+    Input('upload-poll', 'n_intervals'),
+    State('upload-job', 'data'),
     prevent_initial_call=True
 )
-def update_graph(stored_data, slider_value, camera_pos):
-    if not stored_data:
+def poll_upload(n_intervals, job):
+    """Report the progress of the background upload, loading the dataset once done."""
+    if not job:
         raise PreventUpdate
+    unchanged = (no_update,) * len(DEFAULT_AXES)
     
     try:
-        # Reconstruct DataFrame from stored data
-        df = pd.DataFrame(stored_data['df'])
-        df['time'] = pd.to_datetime(df['time'])
-        
-        # Convert stored string dates back to datetime
-        dates = pd.to_datetime(stored_data['dates'])
-        
-        # Filter data based on slider values if available
-        if slider_value is not None:
-            min_date = dates[slider_value[0]]
-            max_date = dates[slider_value[1]]
-            df = df[(df['time'].dt.date >= min_date.date()) &
-                    (df['time'].dt.date <= max_date.date())]
-        
-        # Create the 3D scatter plot figure
-        figure = {
-            'data': [
-                go.Scatter3d(
-                    x=df['heart_rate_variability_max'],
-                    y=df['heart_rate_max'],
-                    z=df['respiration_rate_max'],
-                    mode='markers',
-                    marker=dict(
-                        size=8,
-                        color=df['relative_stroke_volume_max'],
-                        colorscale='Viridis',
-                        opacity=0.8,
-                        colorbar=dict(
-                            title=dict(
-                                text="Relative Stroke Volume",
-                                side="right",  # Use 'side' within the title dictionary
-                                font=dict(
-                                    family=FONT_FAMILY,
-                                    size=14
-                                )
-                            ),
-                            tickfont=dict(
-                                family=FONT_FAMILY
-                            )
-                        )
-                    ),
-                    hovertemplate=(
-                        '<b>Time</b>: %{customdata}<br>' +
-                        '<b>HRV Max</b>: %{x:.1f}<br>' +
-                        '<b>HR Max</b>: %{y:.1f}<br>' +
-                        '<b>RR Max</b>: %{z:.1f}<br>' +
-                        '<b>RSV Max</b>: %{marker.color:.1f}<br>'
-                    ),
-                    customdata=df['time'].dt.strftime('%Y-%m-%d %H:%M')
-                )
-            ],
-            'layout': go.Layout(
-                scene=dict(
-                    xaxis=dict(
-                        title=dict(
-                            text='HRV Max',
-                            font=dict(
-                                family=FONT_FAMILY,
-                                size=14
-                            )
-                        )
-                    ),
-                    yaxis=dict(
-                        title=dict(
-                            text='Heart Rate Max',
-                            font=dict(
-                                family=FONT_FAMILY,
-                                size=14
-                            )
-                        )
-                    ),
-                    zaxis=dict(
-                        title=dict(
-                            text='Respiration Rate Max',
-                            font=dict(
-                                family=FONT_FAMILY,
-                                size=14
-                            )
-                        )
-                    ),                  
-                    bgcolor='rgb(250,250,250)',
-                    camera=camera_pos if camera_pos else dict()
-                ),
-                margin=dict(l=0, r=0, b=0, t=0),
-                paper_bgcolor='white',
-                uirevision=True,
-                font=dict(
-                    family=FONT_FAMILY
-                )
-            )
-        }
+        state = jobs.get(job['job_id'])
+        if state['status'] in ('queued', 'running'):
+            return (no_update, no_update, upload_progress(state), no_update, no_update) + unchanged + (False, False)
+        # This is the last poll of the job, so its files can go
+        jobs.remove(job['job_id'])
+        if state['status'] == 'cancelled':
+            return (no_update, no_update, status_message("Upload cancelled"), no_update, no_update) + unchanged + (True, True)
+        if state['status'] == 'failed':
+            raise ValueError(state.get('error'))
         
-        return figure
+        dataset = datasets.get(state['dataset_id'])
+        reused = " (same file as an earlier upload)" if state.get('cached') else ""
+        message = status_message(f"✅ Successfully loaded {state['filename']}{reused}")
+        return dataset_outputs(dataset, message) + (True, True)
     
     except Exception as e:
-        print(f"Error in update_graph: {str(e)}")
-        return {
-            'data': [],
-            'layout': go.Layout(
-                scene=dict(
-                    xaxis=dict(title='Error occurred'),
-                    yaxis=dict(title=''),
-                    zaxis=dict(title='')
-                )
-            )
-        }
+        error_message = status_message(f"❌ Error processing file: {str(e)}", error=True)
+        return ({}, None, error_message, None, None) + unchanged + (True, True)
+
 
-# Replace the two callbacks with a single one
 @app.callback(
-    [Output('date-slider', 'value'),
-     Output('date-picker-range', 'start_date'),
-     Output('date-picker-range', 'end_date')],
-    [Input('date-slider', 'value'),
-     Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date')],
-    [State('stored-data', 'data')],
+    Output('error-container', 'children', allow_duplicate=True),
+    Input('upload-cancel', 'n_clicks'),
+    State('upload-job', 'data'),
     prevent_initial_call=True
 )
-def sync_date_controls(slider_value, picker_start, picker_end, stored_data):
-    if not stored_data:
+def cancel_upload(n_clicks, job):
+    """Flag the background upload as cancelled; the job stops at its next chunk."""
+    if not job:
         raise PreventUpdate
-        
-    dates = pd.to_datetime(stored_data['dates'])
-    ctx = callback_context
+    jobs.cancel(job['job_id'])
+    return status_message("Cancelling upload...")
+
+
+def publish_dataset(dataset, persist=True):
+    """Build the aggregate pyramid and outlier flags of a dataset and store it."""
+    # Aggregates at coarser time resolutions keep long ranges fast to plot
+    dataset.pyramid = Pyramid(dataset)
+    # Flag outliers once per level so toggling them is only a mask lookup
+    for _, _, _, level in dataset.pyramid.levels:
+        outlier_mask(level)
+    # Spatial indexes are built on the first hover of each level and axes
+    datasets.put(dataset, persist)
+    return dataset
+
+
+def stored_reference(dataset, **extra):
+    """The small reference to a dataset that is kept in the browser."""
+    stored_data = {
+        'dataset_id': dataset.dataset_id,
+        'dates': dataset.date_labels(),
+        'n_rows': len(dataset),
+        'client_side': len(dataset) <= min(CLIENT_SIDE_MAX_ROWS, POINT_BUDGET),
+        # Statistic and transform options of each signal, for the axis controls
+        'signals': {
+            signal: {
+                'stats': choice_options(choice['stats'], str.title),
+                'transforms': choice_options(choice['transforms'], transform_label)
+            }
+            for signal, choice in signal_choices(dataset).items()
+        }
+    }
+    stored_data.update(extra)
+    return stored_data
+
+
+def dataset_outputs(dataset, message, slider=None, date_range=None, **extra):
+    """Values of the outputs shared by every way of loading a dataset."""
+    # Only a reference to the dataset goes to the browser
+    stored_data = stored_reference(dataset, **extra)
     
-    if not ctx.triggered:
-        raise PreventUpdate
-        
-    trigger_id = ctx.triggered[0]['prop_id']
+    # Every signal can go on any axis, with any of its statistics and transforms
+    options = [{'label': column_label(signal), 'value': signal} for signal in stored_data['signals']]
     
-    if 'date-slider' in trigger_id:
-        # Slider was moved
-        start_date = dates[slider_value[0]]
-        end_date = dates[slider_value[1]]
-        return slider_value, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
-    else:
-        # Date picker was changed
-        if not all([picker_start, picker_end]):
-            raise PreventUpdate
-        start_idx = dates.get_loc(pd.to_datetime(picker_start).strftime('%Y-%m-%d'))
-        end_idx = dates.get_loc(pd.to_datetime(picker_end).strftime('%Y-%m-%d'))
-        return [start_idx, end_idx], picker_start, picker_end
+    slider = slider or build_slider(dataset)
+    return (stored_data, slider, message, date_range, None) + (options,) * len(DEFAULT_AXES)
+
+
+def build_slider(dataset):
+    """Date range slider with one step per day that has data."""
+    # Get unique dates (already sorted)
+    return date_slider(pd.to_datetime(dataset.day_starts))
+
+
+def date_slider(dates, value=None):
+    """
+    Date range slider over a list of days.
+
+    Args:
+        dates (pd.DatetimeIndex): Days that have data, sorted
+        value (list, optional): Selected ``[first, last]`` day indices;
+            all days if not given
+    """
+    return html.Div([
+        dcc.RangeSlider(
+            id='date-slider',
+            min=0,
+            max=len(dates) - 1,
+            value=value or [0, len(dates) - 1],
+            marks={
+                i: {
+                    'label': dates[i].strftime('%d-%m-%Y'),
+                    'style': {
+                        'white-space': 'nowrap',
+                        'padding-top': '10px',
+                        'font-size': '11px'
+                    }
+                }
+                for i in range(0, len(dates), max(1, len(dates) // 8))
+            },
+            step=1,
+            tooltip={
+                "placement": "bottom",
+                "always_visible": True
+            },
+            allowCross=False
+        )
+    ])
+
+
+def status_message(text, error=False):
+    """Green success or red error banner below the upload area."""
+    return html.Div([
+        html.P(
+            text,
+            style={
+                'color': '#dc2626' if error else '#059669',
+                'fontFamily': FONT_FAMILY,
+                'fontSize': '0.9rem',
+                'margin': '10px 0',
+                'padding': '8px 12px',
+                'backgroundColor': '#fee2e2' if error else '#d1fae5',
+                'borderRadius': '6px',
+                'border': f"1px solid {'#fecaca' if error else '#a7f3d0'}"
+            }
+        )
+    ])
+
+
+def watched_file(path):
+    """
+    Resolve a path typed into the watch box.
+
+    Raises:
+        ValueError: If it isn't an existing file inside ``WATCH_DIR``
+    """
+    resolved = os.path.realpath(os.path.join(WATCH_DIR, (path or '').strip()))
+    if os.path.commonpath([resolved, WATCH_DIR]) != WATCH_DIR:
+        raise ValueError(f"only files inside {WATCH_DIR} can be watched")
+    if not os.path.isfile(resolved):
+        raise ValueError(f"no such file: {path}")
+    return resolved
+
+
+@app.callback(
+    [Output('stored-data', 'data', allow_duplicate=True),
+     Output('slider-container', 'children', allow_duplicate=True),
+     Output('error-container', 'children', allow_duplicate=True),
+     Output('date-range-store', 'data', allow_duplicate=True),
+     Output('events-store', 'data', allow_duplicate=True)] +
+    [Output(f'{axis}-signal', 'options', allow_duplicate=True) for axis in DEFAULT_AXES] +
+    [Output('watch-interval', 'disabled'),
+     Output('watch-status', 'children'),
+     Output('watch-rows', 'data')],
+    [Input('watch-start', 'n_clicks'),
+     Input('watch-stop', 'n_clicks')],
+    State('watch-path', 'value'),
+    prevent_initial_call=True
+)
+def toggle_watch(start_clicks, stop_clicks, path):
+    """Load a growing CSV file once, then let the interval pick up new rows."""
+    unchanged = (no_update,) * (5 + len(DEFAULT_AXES))
+    if 'watch-stop.n_clicks' in [t['prop_id'] for t in callback_context.triggered]:
+        return unchanged + (True, "Stopped watching", None)
+    
+    try:
+        tail = CsvTail(watched_file(path))
+        plan = compile_plan(tail.columns())
+        tail.dtype = plan.dtypes
+        if plan.aggregates:
+            # Raw rows are aggregated per timestamp, so the last one must be complete
+            tail.group_column = plan.time_column
+        frame = tail.read()
+        if frame.empty:
+            raise ValueError("the file has no complete rows yet")
+        
+        dataset = Dataset(prepare_frame(frame, plan))
+        dataset.tail = tail
+        dataset.persisted = time.time()
+        publish_dataset(dataset)
+        
+        name = os.path.basename(tail.path)
+        message = status_message(f"✅ Watching {name}")
+        # Rows keep arriving, so ranges are always cut on the server
+        outputs = dataset_outputs(dataset, message, client_side=False, watching=True)
+        return outputs + (False, f"{len(dataset)} rows from {name}", len(dataset))
+    
+    except Exception as e:
+        print(f"Error watching file: {str(e)}")
+        return unchanged + (True, html.Span(f"❌ {str(e)}", style={'color': '#dc2626'}), no_update)
+
+
+@app.callback(
+    [Output('3d-graph', 'extendData'),
+     Output('stored-data', 'data', allow_duplicate=True),
+     Output('slider-container', 'children', allow_duplicate=True),
+     Output('server-range-store', 'data', allow_duplicate=True),
+     Output('watch-status', 'children', allow_duplicate=True),
+     Output('watch-rows', 'data', allow_duplicate=True)],
+    Input('watch-interval', 'n_intervals'),
+    [State('stored-data', 'data'),
+     State('date-range-store', 'data'),
+     State('watch-rows', 'data')] +
+    [State(f'{axis}-column', 'data') for axis in DEFAULT_AXES] +
+    [State('view-mode', 'value'),
+     State('outlier-mode', 'value'),
+     State('event-filter', 'value'),
+     State('color-by-event', 'value')],
+    prevent_initial_call=True
+)
+def refresh_watch(n_intervals, stored_data, current_range, shown_rows, x_column, y_column, z_column,
+                  color_column, view_mode, outlier_mode, event_filter, color_by_event):
+    """
+    Append the rows written to the watched file since the last refresh.
+
+    Only the new bytes are parsed and only the newest buckets of each pyramid
+    level are re-aggregated. When the plot shows raw rows up to the last day,
+    the new points are appended to the trace with ``extendData``; otherwise
+    the visible range is redrawn, and a new day resets the slider.
+
+    Every worker follows the file with the tail kept in its own copy of the
+    dataset, so rows and offset always match. The browser remembers how many
+    rows it has been sent (``watch-rows``); a worker whose copy is behind
+    reads on until it has caught up, and only rows past that count are sent.
+    """
+    if not stored_data or not stored_data.get('watching'):
+        raise PreventUpdate
+    
+    try:
+        dataset = datasets.get(stored_data['dataset_id'])
+        tail = getattr(dataset, 'tail', None)
+        if tail is None:
+            raise PreventUpdate
+        shown_rows = shown_rows or 0
+        
+        first_row = len(dataset)
+        while True:
+            frame = tail.read()
+            if frame.empty:
+                break
+            _, late = dataset.append_frame(prepare_frame(frame))
+            if late:
+                print(f"Dropped {late} rows older than the last row already loaded")
+            if len(dataset) > shown_rows:
+                break
+        if first_row < len(dataset):
+            dataset.pyramid.extend(first_row)
+            # Rewriting the on-disk copy costs a full dump, so only now and then
+            persist = time.time() - getattr(dataset, 'persisted', 0) >= WATCH_PERSIST_SECONDS
+            if persist:
+                dataset.persisted = time.time()
+            datasets.put(dataset, persist=persist)
+        if len(dataset) <= shown_rows:
+            raise PreventUpdate
+    
+    except (KeyError, OSError, ValueError) as e:
+        print(f"Error refreshing watched file: {str(e)}")
+        error = html.Span(f"❌ {str(e)}", style={'color': '#dc2626'})
+        return no_update, no_update, no_update, no_update, error, no_update
+    
+    first_row = shown_rows
+    n_rows = len(dataset)
+    status = f"{n_rows} rows, {n_rows - first_row} new"
+    n_days = len(stored_data['dates'])
+    if len(dataset.day_starts) != n_days:
+        # A new day: the slider gains a step and the plot starts over
+        stored = stored_reference(dataset, client_side=False, watching=True)
+        return no_update, stored, build_slider(dataset), no_update, status, n_rows
+    
+    last_day = n_days - 1
+    first_day, shown_last = current_range or (0, last_day)
+    if shown_last < last_day:
+        # The new rows are outside the plotted range
+        return no_update, no_update, no_update, no_update, status, n_rows
+    
+    start, end = dataset.day_range(first_day, last_day)
+    resolution, level, rows = dataset.pyramid.select(start, end)
+    single_trace = (view_mode == 'scatter' and outlier_mode == 'show' and
+                    not event_filter and not color_by_event)
+    if not single_trace or resolution != 'raw':
+        # Aggregated buckets or split traces changed: redraw the range
+        return no_update, no_update, no_update, [first_day, last_day], status, n_rows
+    
+    new = slice(first_row, n_rows)
+    axes = {'x': x_column, 'y': y_column, 'z': z_column, 'color': color_column}
+    update = {axis: [dataset.column(axes[axis])[new]] for axis in ('x', 'y', 'z')}
+    update['marker.color'] = [dataset.column(axes['color'])[new]]
+    return [update, [0], POINT_BUDGET], no_update, no_update, no_update, status, n_rows
+
+
+@app.callback(
+    Output('catalog-archive', 'options'),
+    Input('catalog-refresh', 'n_clicks')
+)
+def list_archives(n_clicks):
+    """Archives of the data directory; listing them reads no data."""
+    return [{'label': name, 'value': name} for name in catalog.archives()]
+
+
+@app.callback(
+    [Output('stored-data', 'data', allow_duplicate=True),
+     Output('slider-container', 'children', allow_duplicate=True),
+     Output('error-container', 'children', allow_duplicate=True),
+     Output('date-range-store', 'data', allow_duplicate=True),
+     Output('events-store', 'data', allow_duplicate=True)] +
+    [Output(f'{axis}-signal', 'options', allow_duplicate=True) for axis in DEFAULT_AXES] +
+    [Output('catalog-status', 'children')],
+    Input('catalog-archive', 'value'),
+    prevent_initial_call=True
+)
+def open_archive(name):
+    """
+    Open an archive from its partition metadata alone.
+
+    The slider gets one step per partition day and the signals come from
+    the schema of one file; rows are only read once a range is plotted.
+    """
+    if not name:
+        raise PreventUpdate
+    
+    try:
+        metadata = catalog.metadata(name)
+        dates = pd.to_datetime(catalog.days(name))
+        if not len(dates):
+            raise ValueError(f"{name} holds no rows")
+        # Start on the last days instead of reading the whole archive
+        initial_range = [max(len(dates) - ARCHIVE_INITIAL_DAYS, 0), len(dates) - 1]
+        
+        outputs = dataset_outputs(
+            Dataset(catalog.empty_frame(name)),
+            status_message(f"✅ Opened archive {name}"),
+            slider=date_slider(dates, initial_range),
+            date_range=initial_range,
+            dataset_id=None,
+            archive=name,
+            version=catalog.version(name),
+            dates=list(dates.strftime('%d-%m-%Y')),
+            n_rows=metadata['rows'],
+            client_side=False
+        )
+        status = f"{metadata['rows']:,} rows over {len(dates)} days in {len(metadata['partitions'])} partitions"
+        return outputs + (status,)
+    
+    except Exception as e:
+        print(f"Error opening archive: {str(e)}")
+        unchanged = (no_update,) * (5 + len(DEFAULT_AXES))
+        return unchanged + (html.Span(f"❌ {str(e)}", style={'color': '#dc2626'}),)
+
+
+def archive_dataset(stored_data, first_day, last_day):
+    """
+    Dataset of a day range of an archive, read from its cached partitions.
+
+    Ranges are kept in the dataset store like uploads, keyed by archive,
+    version and days, so revisiting a range doesn't rebuild its pyramid.
+    """
+    days = [pd.to_datetime(date, format='%d-%m-%Y').strftime('%Y-%m-%d')
+            for date in (stored_data['dates'][first_day], stored_data['dates'][last_day])]
+    key = f"{stored_data['archive']}|{stored_data.get('version')}|{days[0]}|{days[1]}"
+    dataset_id = dataset_hash(key.encode('utf-8')).hexdigest()
+    try:
+        return datasets.get(dataset_id)
+    except KeyError:
+        pass
+    
+    dataset = Dataset(catalog.load(stored_data['archive'], *days), dataset_id)
+    # Ranges are cheap to rebuild from the partition cache; keep them off disk
+    return publish_dataset(dataset, persist=False)
+
+
+def range_dataset(stored_data, slider_value):
+    """
+    Dataset holding a slider range, with the range's day indices in it.
+
+    Uploads are cut from their whole dataset. For archives only the
+    partitions of the selected days are read, and that dataset is used whole.
+
+    Returns:
+        tuple: ``(dataset, first_day, last_day)``
+    """
+    if stored_data.get('archive'):
+        first_day, last_day = slider_value or (0, len(stored_data['dates']) - 1)
+        dataset = archive_dataset(stored_data, first_day, last_day)
+        return dataset, 0, len(dataset.day_starts) - 1
+    dataset = datasets.get(stored_data['dataset_id'])
+    first_day, last_day = slider_value or (0, len(dataset.day_starts) - 1)
+    return dataset, first_day, last_day
+
+
+def current_brushes(stored_data, brush_data):
+    """Brushed regions drawn on the dataset that is loaded now, by view."""
+    key = dataset_key(stored_data)
+    if not brush_data or brush_data.get('key') != key:
+        return {}
+    return brush_data.get('regions') or {}
+
+
+# Turn the selections of the 2D projections into brushed regions. Only the
+# box corners or lasso outline are kept; the selected points themselves can
+# be huge and are recomputed on the server from the columns.
+app.clientside_callback(
+    """
+    function(...args) {
+        const ctx = window.dash_clientside.callback_context;
+        const brushes = args.pop();
+        const storedData = args.pop();
+        const key = storedData ? (storedData.dataset_id || storedData.archive) : null;
+        // Brushes drawn on another dataset don't carry over
+        const regions = brushes && brushes.key === key ? Object.assign({}, brushes.regions) : {};
+        ctx.triggered.forEach(t => {
+            const view = t.prop_id.split('.')[0];
+            const selected = args[ctx.inputs_list.findIndex(input => input.id === view)];
+            if (selected && selected.range) {
+                regions[view] = {box: {x: selected.range.x, y: selected.range.y}};
+            } else if (selected && selected.lassoPoints) {
+                regions[view] = {lasso: {x: selected.lassoPoints.x, y: selected.lassoPoints.y}};
+            } else {
+                delete regions[view];
+            }
+        });
+        return {key: key, regions: regions};
+    }
+    """,
+    Output('brush-store', 'data'),
+    [Input(view, 'selectedData') for view in PROJECTIONS],
+    [State('stored-data', 'data'),
+     State('brush-store', 'data')],
+    prevent_initial_call=True
+)
+
+
+def projection_figure(level, rows, view, masks, resolution, revision):
+    """
+    WebGL scatter of one 2D projection.
+
+    Samples brushed out by the other views are drawn in light gray behind
+    the remaining ones; the view's own brush doesn't hide anything in it.
+
+    Args:
+        level (Dataset): Dataset or pyramid level
+        rows (slice): Plotted rows
+        view (str): Key of ``PROJECTIONS``
+        masks (dict): Brush masks over ``rows``, from ``brush_masks``
+        resolution (str): Name of the pyramid level, shown on hover
+        revision (str): Keeps zoom and selection until the dataset changes
+    """
+    x_column, y_column = PROJECTIONS[view]
+    x = level.column(x_column)[rows]
+    y = level.column(y_column)[rows]
+    keep = combine_masks(masks, skip=view)
+    
+    data = []
+    if keep is not None:
+        data.append(go.Scattergl(
+            x=x[~keep], y=y[~keep], mode='markers', name='Brushed out', showlegend=False,
+            marker=dict(size=3, color='#d1d5db'), hoverinfo='skip'
+        ))
+        x, y = x[keep], y[keep]
+    data.append(go.Scattergl(
+        x=x, y=y, mode='markers', name='Samples', showlegend=False,
+        marker=dict(size=3, color='#2563eb', opacity=0.6),
+        hovertemplate=(
+            f"{column_label(x_column)}: %{{x:.1f}}<br>"
+            f"{column_label(y_column)}: %{{y:.1f}}<br>"
+            f"Resolution: {resolution}<extra></extra>"
+        )
+    ))
+    
+    axis_font = dict(family=FONT_FAMILY, size=12)
+    return {
+        'data': data,
+        'layout': go.Layout(
+            xaxis=dict(title=dict(text=column_label(x_column), font=axis_font)),
+            yaxis=dict(title=dict(text=column_label(y_column), font=axis_font)),
+            dragmode='select',
+            uirevision=revision,
+            margin=dict(l=50, r=10, t=10, b=45),
+            paper_bgcolor='white',
+            plot_bgcolor='#f8fafc'
+        )
+    }
+
+
+@app.callback(
+    [Output(view, 'figure') for view in PROJECTIONS],
+    [Input('stored-data', 'data'),
+     Input('date-range-store', 'data'),
+     Input('brush-store', 'data')],
+    prevent_initial_call=True
+)
+def update_projections(stored_data, date_range, brush_data):
+    """Draw the 2D projections of the plotted range, filtered by each other's brushes."""
+    if not stored_data:
+        raise PreventUpdate
+    
+    try:
+        dataset, first_day, last_day = range_dataset(stored_data, date_range)
+        missing = {column for columns in PROJECTIONS.values() for column in columns} - set(dataset.columns)
+        if missing:
+            raise KeyError(f"projections need {sorted(missing)}")
+        
+        # Same level as the 3D plot, so the brushes act on the same samples
+        start, end = dataset.day_range(first_day, last_day)
+        resolution, level, rows = dataset.pyramid.select(start, end)
+        masks = brush_masks(level, rows, current_brushes(stored_data, brush_data), PROJECTIONS)
+        revision = dataset_key(stored_data)
+        return [projection_figure(level, rows, view, masks, resolution, revision) for view in PROJECTIONS]
+    
+    except Exception as e:
+        print(f"Error in update_projections: {str(e)}")
+        return [{'data': [], 'layout': go.Layout(title=str(e))} for view in PROJECTIONS]
+
+
+def timeseries_figure(level, columns, start, end, resolution, revision):
+    """
+    WebGL line plots of columns over a time window, one row each.
+
+    Every line is downsampled to the minimum and maximum of each pixel-wide
+    bucket, so the points sent don't grow with the window.
+
+    Args:
+        level (Dataset): Dataset or pyramid level with buckets no wider
+            than a pixel
+        columns (list): Columns to plot, top to bottom
+        start, end (int): Window in nanoseconds
+        resolution (str): Name of the pyramid level, shown on hover
+        revision (str): Keeps the zoom until the window changes
+    """
+    figure = make_subplots(rows=len(columns), cols=1, shared_xaxes=True, vertical_spacing=0.03)
+    for i, column in enumerate(columns):
+        time, values = minmax_downsample(level.time, level.column(column), start, end)
+        figure.add_trace(go.Scattergl(
+            x=time.view('datetime64[ns]'),
+            y=values,
+            mode='lines',
+            name=column_label(column),
+            line=dict(width=1, color=TIMESERIES_COLORS[i % len(TIMESERIES_COLORS)]),
+            hovertemplate=f"%{{x}}<br>{column_label(column)}: %{{y:.1f}}<extra>{resolution}</extra>"
+        ), row=i + 1, col=1)
+    
+    window = [np.datetime64(start, 'ns'), np.datetime64(end, 'ns')]
+    figure.update_xaxes(range=window)
+    figure.update_layout(
+        uirevision=revision,
+        legend=dict(orientation='h', y=1.02, yanchor='bottom', x=0),
+        margin=dict(l=50, r=10, t=30, b=30),
+        paper_bgcolor='white',
+        plot_bgcolor='#f8fafc',
+        font=dict(family=FONT_FAMILY, size=11)
+    )
+    return figure
+
+
+def slider_range(stored_data, date_range):
+    """Slider indices of a date range; the whole range when it was never set."""
+    return list(date_range) if date_range else [0, len(stored_data['dates']) - 1]
+
+
+@app.callback(
+    Output('timeseries-graph', 'figure'),
+    [Input('stored-data', 'data'),
+     Input('date-range-store', 'data'),
+     Input('timeseries-window', 'data')] +
+    [Input(f'{axis}-column', 'data') for axis in DEFAULT_AXES],
+    prevent_initial_call=True
+)
+def update_timeseries(stored_data, date_range, window, *columns):
+    """Draw the plotted columns over the date range, or over the window zoomed into."""
+    if not stored_data:
+        raise PreventUpdate
+    key = dataset_key(stored_data)
+    zoomed = bool(window) and window['key'] == key and window['range'] == slider_range(stored_data, date_range)
+    if window and not zoomed and callback_context.triggered[0]['prop_id'] == 'timeseries-window.data':
+        # The zoom moved the slider; draw once the date range follows
+        raise PreventUpdate
+    
+    try:
+        dataset, first_day, last_day = range_dataset(stored_data, date_range)
+        start, end = dataset.day_range(first_day, last_day)
+        if zoomed:
+            start, end = max(start, window['start']), min(end, window['end'])
+        
+        # A finer level than a pixel adds nothing but rows to scan
+        resolution, level = dataset.pyramid.level_within((end - start) // TIMESERIES_BUCKETS)
+        columns = list(dict.fromkeys(columns))
+        return timeseries_figure(level, columns, start, end, resolution, f"{key}|{start}|{end}")
+    
+    except Exception as e:
+        print(f"Error in update_timeseries: {str(e)}")
+        return {'data': [], 'layout': go.Layout(title=str(e))}
+
+
+def correlation_columns(dataset):
+    """Column of each correlated signal the dataset has, e.g. its median."""
+    columns = []
+    for signal in CORRELATION_SIGNALS:
+        column = next((f"{signal}_{stat}" for stat in CORRELATION_STATISTICS
+                       if f"{signal}_{stat}" in dataset.columns), None)
+        if column is not None:
+            columns.append(column)
+    return columns
+
+
+def correlation_figure(correlation, start, end, window_name):
+    """
+    Heatmap of the pairwise correlations of the windows ending in a time range,
+    one row per pair of signals.
+
+    Windows are thinned to about one per pixel; neighbouring windows overlap,
+    so the skipped ones add little.
+    """
+    windows = correlation.window_slice(start, end)
+    stride = max(-(-(windows.stop - windows.start) // TIMESERIES_BUCKETS), 1)
+    windows = slice(windows.start, windows.stop, stride)
+    labels = [
+        f"{column_label(split_statistic(a)[0])} × {column_label(split_statistic(b)[0])}"
+        for a, b in correlation.pairs
+    ]
+    figure = go.Figure(go.Heatmap(
+        x=correlation.time[windows].view('datetime64[ns]'),
+        y=labels,
+        z=correlation.values[:, windows],
+        customdata=correlation.counts[:, windows],
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        colorbar=dict(title=dict(text='r', side='right'), thickness=12),
+        hovertemplate='%{y}<br>Window to %{x}: r = %{z:.2f}<br>%{customdata:.0f} samples<extra></extra>'
+    ))
+    figure.update_xaxes(range=[np.datetime64(start, 'ns'), np.datetime64(end, 'ns')])
+    figure.update_layout(
+        title=dict(text=f'Correlation over {window_name} windows', font=dict(size=12), x=0.01),
+        margin=dict(l=50, r=10, t=30, b=30),
+        paper_bgcolor='white',
+        font=dict(family=FONT_FAMILY, size=11)
+    )
+    return figure
+
+
+@app.callback(
+    Output('correlation-graph', 'figure'),
+    [Input('stored-data', 'data'),
+     Input('date-range-store', 'data'),
+     Input('correlation-window', 'value')],
+    prevent_initial_call=True
+)
+def update_correlation(stored_data, date_range, window_name):
+    """Draw the sliding-window correlations between the signals over the date range."""
+    if not stored_data:
+        raise PreventUpdate
+    
+    try:
+        dataset, first_day, last_day = range_dataset(stored_data, date_range)
+        start, end = dataset.day_range(first_day, last_day)
+        _, window, step = next(entry for entry in CORRELATION_WINDOWS if entry[0] == window_name)
+        # Computed over the whole dataset once per window, then only sliced
+        correlation = rolling_correlation(dataset, correlation_columns(dataset), window, step)
+        return correlation_figure(correlation, start, end, window_name)
+    
+    except Exception as e:
+        print(f"Error in update_correlation: {str(e)}")
+        return {'data': [], 'layout': go.Layout(title=str(e))}
+
+
+def zoomed_window(relayout):
+    """Nanosecond bounds of a zoom in relayoutData of the time-series panel, or None."""
+    for key, value in relayout.items():
+        axis, _, prop = key.partition('.')
+        if not axis.startswith('xaxis'):
+            continue
+        if prop == 'range' and value:
+            bounds = value
+        elif prop == 'range[0]' and f'{axis}.range[1]' in relayout:
+            bounds = [value, relayout[f'{axis}.range[1]']]
+        else:
+            continue
+        return [pd.Timestamp(bound).value for bound in bounds]
+    return None
+
+
+@app.callback(
+    [Output('timeseries-window', 'data'),
+     Output('date-slider', 'value', allow_duplicate=True)],
+    Input('timeseries-graph', 'relayoutData'),
+    [State('stored-data', 'data'),
+     State('date-range-store', 'data')],
+    prevent_initial_call=True
+)
+def zoom_timeseries(relayout, stored_data, date_range):
+    """
+    Narrow the shared date range to the days of a zoom on the time-series
+    panel, and remember the exact window so only it is downsampled again.
+    """
+    if not relayout or not stored_data:
+        raise PreventUpdate
+    bounds = zoomed_window(relayout)
+    if bounds is None:
+        if any(key.endswith('autorange') for key in relayout):
+            # Zoomed back out: show the slider range again
+            return None, no_update
+        raise PreventUpdate
+    
+    start, end = sorted(bounds)
+    days = pd.to_datetime(stored_data['dates'], format='%d-%m-%Y').to_numpy(dtype='datetime64[ns]').view('int64')
+    first_day = max(int(np.searchsorted(days, start, side='right')) - 1, 0)
+    last_day = max(int(np.searchsorted(days, end - 1, side='right')) - 1, first_day)
+    
+    window = {
+        'key': dataset_key(stored_data),
+        'range': [first_day, last_day],
+        'start': start,
+        'end': end
+    }
+    if [first_day, last_day] == slider_range(stored_data, date_range):
+        return window, no_update
+    return window, [first_day, last_day]
+
+
+# Store the camera position from 3D graph interactions. This runs in the
+# browser: it only copies a value out of relayoutData, so there is no reason
+# to spend a server round-trip on every rotation.
+app.clientside_callback(
+    """
+    function(relayoutData) {
+        if (relayoutData && relayoutData['scene.camera']) {
+            return relayoutData['scene.camera'];
+        }
+        throw window.dash_clientside.PreventUpdate;
+    }
+    """,
+    Output('camera-store', 'data'),
+    Input('3d-graph', 'relayoutData'),
+    prevent_initial_call=True
+)
+
+
+def format_times(time_ns):
+    """Format int64 nanosecond timestamps as 'YYYY-MM-DD HH:MM' hover labels."""
+    labels = np.datetime_as_string(time_ns.view('datetime64[ns]'), unit='m')
+    if not len(labels):
+        return labels
+    return np.char.replace(labels, 'T', ' ')
+
+
+def build_layout(labels, camera_pos=None):
+    """Scene layout shared by the scatter and density views."""
+    return go.Layout(
+        scene=dict(
+            xaxis=dict(
+                title=dict(
+                    text=labels['x'],
+                    font=dict(
+                        family=FONT_FAMILY,
+                        size=14
+                    )
+                )
+            ),
+            yaxis=dict(
+                title=dict(
+                    text=labels['y'],
+                    font=dict(
+                        family=FONT_FAMILY,
+                        size=14
+                    )
+                )
+            ),
+            zaxis=dict(
+                title=dict(
+                    text=labels['z'],
+                    font=dict(
+                        family=FONT_FAMILY,
+                        size=14
+                    )
+                )
+            ),                  
+            bgcolor='rgb(250,250,250)',
+            camera=camera_pos if camera_pos else dict()
+        ),
+        margin=dict(l=0, r=0, b=0, t=0),
+        paper_bgcolor='white',
+        uirevision=True,
+        font=dict(
+            family=FONT_FAMILY
+        )
+    )
+
+
+def hover_template(labels, resolution, show_color=True, name=None, outlier=False):
+    """Hover text of a point trace, from the axis labels and the pyramid level."""
+    return (
+        (f'<b>{name}</b><br>' if name else '') +
+        f'<b>{labels["x"]}</b>: %{{x:.1f}}<br>' +
+        f'<b>{labels["y"]}</b>: %{{y:.1f}}<br>' +
+        f'<b>{labels["z"]}</b>: %{{z:.1f}}<br>' +
+        (f'<b>{labels["color"]}</b>: %{{marker.color:.1f}}<br>' if show_color else '') +
+        f'<extra>{"outlier, " if outlier else ""}{resolution}</extra>'
+    )
+
+
+def scatter_trace(dataset, index, axes, labels, resolution='raw', meta='all', event_colors=None):
+    """
+    One Scatter3d trace for a subset of a dataset's rows.
+
+    Args:
+        dataset (Dataset): Converted, time-sorted dataset or pyramid level
+        index (slice or np.ndarray): Rows to plot
+        axes (dict): Column for 'x', 'y', 'z' and 'color'
+        labels (dict): Axis labels for the hover text and colorbar
+        resolution (str): Name of the pyramid level, shown on hover
+        meta (str): Which rows the trace holds: 'all', 'inliers', 'outliers',
+            or 'highlight' for outliers drawn in red. The browser-side range
+            filter reads this back.
+        event_colors (tuple, optional): ``(codes, labels)`` to color the
+            markers by clinical event instead of the color column
+    """
+    highlight = meta == 'highlight'
+    if highlight:
+        # Flagged samples stand out in red on top of the colored inliers
+        marker = dict(size=5, color='#dc2626', symbol='x', opacity=0.9)
+    elif event_colors is not None:
+        codes, event_labels = event_colors
+        marker = dict(
+            size=8,
+            color=codes[index],
+            colorscale=discrete_colorscale(EVENT_COLORS, len(event_labels)),
+            cmin=-0.5,
+            cmax=len(event_labels) - 0.5,
+            opacity=0.8,
+            colorbar=dict(
+                title=dict(
+                    text='Event',
+                    side="right",
+                    font=dict(
+                        family=FONT_FAMILY,
+                        size=14
+                    )
+                ),
+                tickvals=list(range(len(event_labels))),
+                ticktext=event_labels,
+                tickfont=dict(
+                    family=FONT_FAMILY
+                )
+            )
+        )
+    else:
+        marker = dict(
+            size=8,
+            color=dataset.column(axes['color'])[index],
+            colorscale='Viridis',
+            opacity=0.8,
+            colorbar=dict(
+                title=dict(
+                    text=labels['color'],
+                    side="right",  # Use 'side' within the title dictionary
+                    font=dict(
+                        family=FONT_FAMILY,
+                        size=14
+                    )
+                ),
+                tickfont=dict(
+                    family=FONT_FAMILY
+                )
+            )
+        )
+    
+    return go.Scatter3d(
+        x=dataset.column(axes['x'])[index],
+        y=dataset.column(axes['y'])[index],
+        z=dataset.column(axes['z'])[index],
+        mode='markers',
+        name='Outliers' if highlight else 'Samples',
+        meta=meta,
+        showlegend=False,
+        marker=marker,
+        hovertemplate=hover_template(labels, resolution, not highlight and event_colors is None,
+                                     outlier=highlight)
+    )
+
+
+def discrete_colorscale(colors, n):
+    """Stepped colorscale giving each of ``n`` integer codes its own color."""
+    scale = []
+    for i in range(n):
+        color = colors[i % len(colors)]
+        scale += [[i / n, color], [(i + 1) / n, color]]
+    return scale
+
+
+def outlier_groups(dataset, rows, outlier_mode='show', keep=None):
+    """
+    Split a row range into traces according to the outlier mode.
+
+    Args:
+        dataset (Dataset): Dataset or pyramid level
+        rows (slice): Row range with explicit start and stop
+        outlier_mode (str): 'show', 'hide', 'highlight' or 'only'
+        keep (np.ndarray, optional): Boolean mask over ``rows`` of the
+            samples that pass other filters
+
+    Returns:
+        list: ``(meta, index)`` pairs, see ``scatter_trace``
+    """
+    if outlier_mode == 'show':
+        return [('all', rows if keep is None else np.flatnonzero(keep) + rows.start)]
+    flagged = outlier_mask(dataset)[rows]
+    if keep is None:
+        keep = np.ones(len(flagged), dtype=bool)
+    inliers = np.flatnonzero(keep & ~flagged) + rows.start
+    outliers = np.flatnonzero(keep & flagged) + rows.start
+    if outlier_mode == 'hide':
+        return [('inliers', inliers)]
+    if outlier_mode == 'only':
+        return [('outliers', outliers)]
+    return [('inliers', inliers), ('highlight', outliers)]
+
+
+def overlay_trace(dataset, index, axes, labels, resolution, name, n):
+    """
+    Scatter3d trace of a dataset overlaid for comparison.
+
+    Overlays share the axes of the main dataset but are drawn in a solid
+    color and symbol of their own, named in the legend.
+
+    Args:
+        dataset (Dataset): Overlay dataset or one of its pyramid levels
+        index (slice): Rows to plot
+        axes (dict): Column for 'x', 'y', 'z' and 'color'
+        labels (dict): Axis labels for the hover text
+        resolution (str): Name of the pyramid level, shown on hover
+        name (str): Legend entry, usually the file name
+        n (int): Position of the overlay, picks its color and symbol
+    """
+    return go.Scatter3d(
+        x=dataset.column(axes['x'])[index],
+        y=dataset.column(axes['y'])[index],
+        z=dataset.column(axes['z'])[index],
+        mode='markers',
+        name=name,
+        meta='overlay',
+        uid=dataset.dataset_id,
+        showlegend=True,
+        marker=dict(
+            size=5,
+            color=OVERLAY_COLORS[n % len(OVERLAY_COLORS)],
+            symbol=OVERLAY_SYMBOLS[n % len(OVERLAY_SYMBOLS)],
+            opacity=0.7
+        ),
+        hovertemplate=hover_template(labels, resolution, show_color=False, name=name)
+    )
+
+
+def figure_groups(dataset, rows, outlier_mode='show', events=None, event_filter=None, brushed=None):
+    """
+    Rows of each point trace, in the order ``build_figure`` draws them.
+
+    Args:
+        brushed (np.ndarray, optional): Boolean mask over ``rows`` of the
+            samples inside the brushes of the 2D projections
+
+    Returns:
+        list: ``(meta, index)`` pairs, see ``outlier_groups``
+    """
+    rows = slice(*rows.indices(len(dataset)))
+    keep = brushed
+    if events is not None and event_filter:
+        codes = event_codes(dataset, events)
+        wanted = [code for code, label in enumerate(events.labels) if label in event_filter]
+        in_events = np.isin(codes[rows], wanted)
+        keep = in_events if keep is None else keep & in_events
+    return outlier_groups(dataset, rows, outlier_mode, keep)
+
+
+def axis_patch(changed, axes, traces, color_by_event=False):
+    """
+    Patch swapping the columns of some axes in the figure already drawn.
+
+    Only the new arrays, hover texts and titles are sent; times, markers
+    and the layout stay as they are in the browser.
+
+    Args:
+        changed (list): Axes whose column changed, e.g. ['x']
+        axes (dict): Column for 'x', 'y', 'z' and 'color'
+        traces (list): ``(dataset, index, resolution, meta, name)`` of every
+            trace, in figure order
+
+    Returns:
+        Patch: Partial update of the figure
+    """
+    labels = {axis: column_label(column) for axis, column in axes.items()}
+    patch = Patch()
+    for k, (dataset, index, resolution, meta, name) in enumerate(traces):
+        colored = meta not in ('highlight', 'overlay') and not color_by_event
+        for axis in changed:
+            if axis != 'color':
+                patch['data'][k][axis] = dataset.column(axes[axis])[index]
+            elif colored:
+                patch['data'][k]['marker']['color'] = dataset.column(axes['color'])[index]
+                patch['data'][k]['marker']['colorbar']['title']['text'] = labels['color']
+        patch['data'][k]['hovertemplate'] = hover_template(labels, resolution, colored, name, meta == 'highlight')
+    for axis in changed:
+        if axis != 'color':
+            patch['layout']['scene'][f'{axis}axis']['title']['text'] = labels[axis]
+    return patch
+
+
+def build_figure(dataset, rows=slice(None), camera_pos=None, resolution='raw', axes=None,
+                 outlier_mode='show', events=None, event_filter=None, color_by_event=False,
+                 brushed=None):
+    """
+    Build the 3D scatter figure for a row range of a dataset.
+
+    Args:
+        dataset (Dataset): Converted, time-sorted dataset or pyramid level
+        rows (slice): Rows to plot, e.g. from ``Dataset.day_slice``
+        camera_pos (dict, optional): Stored scene camera
+        resolution (str): Name of the pyramid level, shown on hover
+        axes (dict, optional): Column for 'x', 'y', 'z' and 'color';
+            defaults to ``DEFAULT_AXES``
+        outlier_mode (str): 'show', 'hide', 'highlight' or 'only'
+        events (EventIndex, optional): Clinical events of the dataset
+        event_filter (list, optional): Event labels to keep; empty keeps all
+        color_by_event (bool): Color markers by event instead of the color column
+        brushed (np.ndarray, optional): Mask over ``rows`` of brushed samples
+
+    Returns:
+        dict: Plotly figure with ``data`` and ``layout``
+    """
+    axes = axes or DEFAULT_AXES
+    labels = {axis: column_label(column) for axis, column in axes.items()}
+    
+    event_colors = None
+    if events is not None and color_by_event:
+        event_colors = (event_codes(dataset, events), events.labels)
+    
+    figure = {
+        'data': [
+            scatter_trace(dataset, index, axes, labels, resolution, meta, event_colors)
+            for meta, index in figure_groups(dataset, rows, outlier_mode, events, event_filter, brushed)
+        ],
+        'layout': build_layout(labels, camera_pos)
+    }
+    
+    return figure
+
+
+def build_density_figure(dataset, first_day, last_day, camera_pos=None, axes=None, value='count'):
+    """
+    Build the 3D density (volume) figure for an inclusive range of day indices.
+
+    Args:
+        dataset (Dataset): Converted, time-sorted dataset
+        first_day (int): Index of the first day
+        last_day (int): Index of the last day
+        camera_pos (dict, optional): Stored scene camera
+        axes (dict, optional): Column for 'x', 'y', 'z' and 'color'
+        value (str): 'count' for rows per bin, 'color' for the mean color per bin
+
+    Returns:
+        dict: Plotly figure with ``data`` and ``layout``
+    """
+    axes = axes or DEFAULT_AXES
+    labels = {axis: column_label(column) for axis, column in axes.items()}
+    grids = density_grids(dataset, axes)
+    x, y, z = grids.centers()
+    grid = grids.grid(first_day, last_day, value)
+    
+    filled = grid[np.isfinite(grid) & (grid > 0)] if value == 'count' else grid[np.isfinite(grid)]
+    if len(filled):
+        isomin, isomax = float(filled.min()), float(filled.max())
+    else:
+        isomin, isomax = 0.0, 1.0
+    # Empty bins sit just below isomin so they are never drawn
+    empty = isomin - max(abs(isomin), 1.0)
+    grid = np.where(np.isfinite(grid) & ((grid > 0) | (value != 'count')), grid, empty)
+    
+    title = 'Samples' if value == 'count' else f"Mean {labels['color']}"
+    figure = {
+        'data': [
+            go.Volume(
+                x=x,
+                y=y,
+                z=z,
+                value=grid,
+                isomin=isomin,
+                isomax=isomax,
+                opacity=0.15,
+                surface_count=12,
+                colorscale='Viridis',
+                colorbar=dict(
+                    title=dict(
+                        text=title,
+                        side="right",
+                        font=dict(
+                            family=FONT_FAMILY,
+                            size=14
+                        )
+                    ),
+                    tickfont=dict(
+                        family=FONT_FAMILY
+                    )
+                ),
+                hovertemplate=(
+                    f'<b>{labels["x"]}</b>: %{{x:.1f}}<br>' +
+                    f'<b>{labels["y"]}</b>: %{{y:.1f}}<br>' +
+                    f'<b>{labels["z"]}</b>: %{{z:.1f}}<br>' +
+                    f'<b>{title}</b>: %{{value:.1f}}<extra></extra>'
+                )
+            )
+        ],
+        'layout': build_layout(labels, camera_pos)
+    }
+    
+    return figure
+
+
+def build_client_payload(dataset, axes=None):
+    """
+    Pack the plotted columns of a small dataset for browser-side filtering.
+
+    Columns are sent once as base64 float32, together with the row offset of
+    each day, so the browser can cut out any slider range with two lookups.
+    Times stay on the server; hovered points are looked up there. ``key``
+    changes whenever the columns do, telling the browser to decode them again.
+    """
+    axes = axes or DEFAULT_AXES
+    payload = {
+        'dataset_id': dataset.dataset_id,
+        'key': '|'.join([dataset.dataset_id] + [axes[axis] for axis in DEFAULT_AXES]),
+        'day_offsets': dataset.day_offsets.tolist(),
+        'outliers': encode_array(outlier_mask(dataset), dtype='u1')
+    }
+    for axis in DEFAULT_AXES:
+        payload[axis] = encode_array(dataset.column(axes[axis]))
+    return payload
+
+
+def client_patch(dataset, axes, changed):
+    """Patch of the browser-side payload replacing only the changed columns."""
+    patch = Patch()
+    patch['key'] = '|'.join([dataset.dataset_id] + [axes[axis] for axis in DEFAULT_AXES])
+    for axis in changed:
+        patch[axis] = encode_array(dataset.column(axes[axis]))
+    return patch
+
+
+@app.callback(
+    [Output('events-store', 'data', allow_duplicate=True),
+     Output('events-message', 'children')],
+    Input('upload-events', 'contents'),
+    [State('upload-events', 'filename'),
+     State('stored-data', 'data')],
+    prevent_initial_call=True
+)
+def load_events(contents, filename, stored_data):
+    """
+    Index an uploaded events CSV for the current dataset.
+
+    The index is kept in the event store, not on the dataset, which other
+    sessions may share; the browser keeps its key.
+    """
+    if contents is None:
+        raise PreventUpdate
+    if not stored_data:
+        return no_update, html.Span("Upload a data file before loading events", style={'color': '#dc2626'})
+    
+    try:
+        events = parse_events(contents)
+        event_sets.put(events)
+        
+        events_data = {'key': events.key, 'labels': events.labels, 'dataset': dataset_key(stored_data)}
+        message = html.Span(f"✅ {events.n_events} events loaded from {filename}", style={'color': '#059669'})
+        return events_data, message
+    
+    except Exception as e:
+        print(f"Error loading events: {str(e)}")
+        return no_update, html.Span(f"❌ Error loading events: {str(e)}", style={'color': '#dc2626'})
+
+
+def dataset_key(stored_data):
+    """What the browser's dataset reference points at: an upload or an archive."""
+    return stored_data.get('dataset_id') or stored_data.get('archive')
+
+
+def loaded_events(events_data, stored_data):
+    """
+    Events this session loaded for the dataset it shows, or None.
+
+    Returns:
+        EventIndex: From the event store, by the key kept in the browser
+    """
+    if not events_data or not stored_data or events_data.get('dataset') != dataset_key(stored_data):
+        return None
+    try:
+        return event_sets.get(events_data['key'])
+    except KeyError:
+        return None
+
+
+@app.callback(
+    [Output('event-filter', 'options'),
+     Output('event-filter', 'value')],
+    Input('events-store', 'data'),
+    prevent_initial_call=True
+)
+def update_event_options(events_data):
+    if not events_data:
+        return [], []
+    return [{'label': label, 'value': label} for label in events_data['labels']], []
+
+
+# Filter on date range changes. Small datasets are cut out of the columns
+# already in the browser; for large ones the range is handed to the server
+# through 'server-range-store'.
+app.clientside_callback(
+    """
+    function(sliderValue, storedData, clientData, viewMode, eventFilter, colorByEvent, overlays, brushes, figure) {
+        const clientside = window.dash_clientside;
+        if (!sliderValue || !storedData) {
+            throw clientside.PreventUpdate;
+        }
+        // Density views, event filtering/coloring, overlays and brushes are done on the server
+        const serverOnly = viewMode !== 'scatter' ||
+            (eventFilter && eventFilter.length) || (colorByEvent && colorByEvent.length) ||
+            (overlays && overlays.length) ||
+            (brushes && brushes.regions && Object.keys(brushes.regions).length);
+        if (!clientData || clientData.dataset_id !== storedData.dataset_id || serverOnly ||
+                !figure || !figure.data || !figure.data.length) {
+            return [clientside.no_update, sliderValue, sliderValue];
+        }
+
+        // Decode the columns once per dataset and keep them on the window
+        const cache = window.biosignalColumns || {};
+        if (cache.key !== clientData.key) {
+            const decode = (b64, ArrayType) => {
+                const raw = atob(b64);
+                const bytes = new Uint8Array(raw.length);
+                for (let i = 0; i < raw.length; i++) {
+                    bytes[i] = raw.charCodeAt(i);
+                }
+                return new ArrayType(bytes.buffer);
+            };
+            cache.key = clientData.key;
+            cache.outliers = decode(clientData.outliers, Uint8Array);
+            for (const key of ['x', 'y', 'z', 'color']) {
+                cache[key] = decode(clientData[key], Float32Array);
+            }
+            window.biosignalColumns = cache;
+        }
+
+        const offsets = clientData.day_offsets;
+        const lo = offsets[sliderValue[0]];
+        const hi = offsets[sliderValue[1] + 1];
+
+        // Row indices for a trace, from the outlier mask; null means all rows
+        const rowsFor = meta => {
+            if (!meta || meta === 'all') {
+                return null;
+            }
+            const wantOutliers = meta !== 'inliers';
+            const rows = [];
+            for (let i = lo; i < hi; i++) {
+                if ((cache.outliers[i] === 1) === wantOutliers) {
+                    rows.push(i);
+                }
+            }
+            return rows;
+        };
+        const take = (values, rows) => rows ?
+            values.constructor.from(rows, i => values[i]) : values.subarray(lo, hi);
+
+        const data = figure.data.map(template => {
+            const rows = rowsFor(template.meta);
+            const trace = Object.assign({}, template, {
+                x: take(cache.x, rows),
+                y: take(cache.y, rows),
+                z: take(cache.z, rows)
+            });
+            if (template.meta !== 'highlight') {
+                trace.marker = Object.assign({}, template.marker, {color: take(cache.color, rows)});
+            }
+            return trace;
+        });
+        return [Object.assign({}, figure, {data: data}), sliderValue, clientside.no_update];
+    }
+    """,
+    [Output('3d-graph', 'figure', allow_duplicate=True),
+     Output('date-range-store', 'data', allow_duplicate=True),
+     Output('server-range-store', 'data')],
+    Input('date-slider', 'value'),
+    [State('stored-data', 'data'),
+     State('client-data', 'data'),
+     State('view-mode', 'value'),
+     State('event-filter', 'value'),
+     State('color-by-event', 'value'),
+     State('overlay-store', 'data'),
+     State('brush-store', 'data'),
+     State('3d-graph', 'figure')],
+    prevent_initial_call=True
+)
+
+
+@app.callback(
+    [Output('overlay-store', 'data'),
+     Output('overlay-toggle', 'options'),
+     Output('overlay-toggle', 'value'),
+     Output('overlay-message', 'children')],
+    [Input('upload-overlay', 'contents'),
+     Input('overlay-clear', 'n_clicks')],
+    [State('upload-overlay', 'filename'),
+     State('overlay-store', 'data'),
+     State('overlay-toggle', 'value')],
+    prevent_initial_call=True
+)
+def load_overlays(contents, clear_clicks, filenames, overlays, visible):
+    """Convert uploaded comparison datasets and add them as overlays."""
+    if 'overlay-clear.n_clicks' in [t['prop_id'] for t in callback_context.triggered]:
+        return [], [], [], ""
+    if not contents:
+        raise PreventUpdate
+    
+    overlays = list(overlays or [])
+    visible = list(visible or [])
+    errors = []
+    for content, filename in zip(contents, filenames):
+        try:
+            content_string = content.split(',')[1]
+            digest = dataset_hash(base64.b64decode(content_string)).hexdigest()
+            if any(overlay['dataset_id'] == digest for overlay in overlays):
+                raise ValueError("already overlaid")
+            if datasets.contains(digest):
+                dataset = datasets.get(digest)
+            else:
+                dataset = publish_dataset(Dataset(parse_contents(content), digest))
+            overlays.append({'dataset_id': dataset.dataset_id, 'name': filename})
+            visible.append(dataset.dataset_id)
+        except Exception as e:
+            errors.append(f"{filename}: {str(e)}")
+    
+    options = [{'label': overlay['name'], 'value': overlay['dataset_id']} for overlay in overlays]
+    if errors:
+        message = html.Span("❌ " + "; ".join(errors), style={'color': '#dc2626'})
+    else:
+        message = html.Span(f"✅ {len(overlays)} datasets overlaid", style={'color': '#059669'})
+    return overlays, options, visible, message
+
+
+@app.callback(
+    Output('3d-graph', 'figure', allow_duplicate=True),
+    Input('overlay-toggle', 'value'),
+    State('overlay-traces', 'data'),
+    prevent_initial_call=True
+)
+def toggle_overlays(visible, overlay_traces):
+    """Show or hide overlay traces in place, leaving every other trace alone."""
+    if not overlay_traces:
+        raise PreventUpdate
+    patch = Patch()
+    for dataset_id, index in overlay_traces.items():
+        patch['data'][index]['visible'] = dataset_id in (visible or [])
+    return patch
+
+
+# Offer the statistics and transforms of the chosen signal, keeping the
+# current choices where the signal has them
+for _axis in DEFAULT_AXES:
+    app.clientside_callback(
+        """
+        function(signal, storedData, stat, transform) {
+            const clientside = window.dash_clientside;
+            const choice = storedData && storedData.signals && storedData.signals[signal];
+            if (!choice) {
+                throw clientside.PreventUpdate;
+            }
+            // Otherwise fall back to the maximum and to the plain values
+            const pick = (options, value, fallback) =>
+                options.some(o => o.value === value) ? value : fallback.value;
+            return [choice.stats, pick(choice.stats, stat, choice.stats[choice.stats.length - 1]),
+                    choice.transforms, pick(choice.transforms, transform, choice.transforms[0])];
+        }
+        """,
+        [Output(f'{_axis}-stat', 'options'),
+         Output(f'{_axis}-stat', 'value'),
+         Output(f'{_axis}-transform', 'options'),
+         Output(f'{_axis}-transform', 'value')],
+        Input(f'{_axis}-signal', 'value'),
+        [State('stored-data', 'data'),
+         State(f'{_axis}-stat', 'value'),
+         State(f'{_axis}-transform', 'value')],
+        prevent_initial_call=True
+    )
+
+    # Column name of the signal, statistic and transform, e.g.
+    # 'heart_rate_median__rollmean_5min'
+    app.clientside_callback(
+        """
+        function(signal, stat, transform, current) {
+            if (!signal || !stat || !transform) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            let column = stat === '%(plain)s' ? signal : signal + '_' + stat;
+            if (transform !== '%(plain)s') {
+                column += '%(separator)s' + transform;
+            }
+            if (column === current) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return column;
+        }
+        """ % {'plain': PLAIN, 'separator': SEPARATOR},
+        Output(f'{_axis}-column', 'data'),
+        [Input(f'{_axis}-signal', 'value'),
+         Input(f'{_axis}-stat', 'value'),
+         Input(f'{_axis}-transform', 'value')],
+        State(f'{_axis}-column', 'data'),
+        prevent_initial_call=True
+    )
+
+
+def export_response(dataset, fmt, first_day, last_day):
+    """
+    Stream rows of a dataset as a CSV or Parquet download.
+
+    Query parameters: ``columns`` (comma separated), ``outliers`` (the
+    outlier mode), ``events`` (key of the session's loaded events) and
+    ``event`` (repeated, labels to keep). Every row in range is written with
+    an ``outlier`` flag, and with its ``event`` when events are given.
+
+    Args:
+        dataset (Dataset): Dataset to export from
+        fmt (str): Export format, e.g. 'csv'
+        first_day, last_day (int): Inclusive range of day indices
+    """
+    try:
+        n_days = len(dataset.day_starts)
+        columns = list(dict.fromkeys(c for c in request.args.get('columns', '').split(',') if c))
+        for column in columns:
+            dataset.column(column)
+    except KeyError:
+        abort(400)
+    
+    start, end = dataset.day_range(first_day, last_day)
+    rows = dataset.time_slice(start, end)
+    
+    # Same row filters as the plot
+    flags = outlier_mask(dataset)
+    outlier_mode = request.args.get('outliers', 'show')
+    keep = np.ones(rows.stop - rows.start, dtype=bool)
+    if outlier_mode == 'hide':
+        keep &= ~flags[rows]
+    elif outlier_mode == 'only':
+        keep &= flags[rows]
+    
+    categories = {}
+    events = None
+    if request.args.get('events'):
+        try:
+            events = event_sets.get(request.args['events'])
+        except KeyError:
+            abort(400)
+    if events is not None:
+        codes = event_codes(dataset, events)
+        categories['event'] = (codes, events.labels)
+        wanted = request.args.getlist('event')
+        if wanted:
+            keep &= np.isin(codes[rows], [code for code, label in enumerate(events.labels) if label in wanted])
+    
+    frames = export_chunks(dataset, rows, columns, None if keep.all() else keep,
+                           {'outlier': flags}, categories)
+    labels = dataset.date_labels()
+    first_label, last_label = labels[min(max(first_day, 0), n_days - 1)], labels[min(max(last_day, 0), n_days - 1)]
+    filename = f"biosignals_{first_label}_{last_label}.{fmt}"
+    return Response(
+        stream_with_context(EXPORT_WRITERS[fmt](frames)),
+        mimetype=EXPORT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+def requested_days(n_days):
+    """Inclusive ``first``/``last`` day indices of an export request; all days by default."""
+    try:
+        return int(request.args.get('first', 0)), int(request.args.get('last', n_days - 1))
+    except ValueError:
+        abort(400)
+
+
+@server.route('/export/<dataset_id>.<fmt>')
+def export_view(dataset_id, fmt):
+    """
+    Stream the rows of the current view of an upload; see ``export_response``.
+
+    Query parameters also include ``first``/``last`` day indices.
+    """
+    if fmt not in export_formats():
+        abort(404)
+    try:
+        dataset = datasets.get(dataset_id)
+    except KeyError:
+        abort(404)
+    return export_response(dataset, fmt, *requested_days(len(dataset.day_starts)))
+
+
+@server.route('/export/archive/<name>.<fmt>')
+def export_archive(name, fmt):
+    """
+    Stream the rows of the current view of an archive; see ``export_response``.
+
+    ``first``/``last`` are indices into the archive's days, like its slider;
+    only the partitions of those days are read.
+    """
+    if fmt not in export_formats():
+        abort(404)
+    try:
+        dates = pd.to_datetime(catalog.days(name))
+        version = catalog.version(name)
+    except KeyError:
+        abort(404)
+    if not len(dates):
+        abort(404)
+    
+    first_day, last_day = requested_days(len(dates))
+    first_day = min(max(first_day, 0), len(dates) - 1)
+    last_day = min(max(last_day, first_day), len(dates) - 1)
+    stored_data = {'archive': name, 'version': version, 'dates': list(dates.strftime('%d-%m-%Y'))}
+    try:
+        dataset = archive_dataset(stored_data, first_day, last_day)
+    except ValueError:
+        abort(404)
+    return export_response(dataset, fmt, 0, len(dataset.day_starts) - 1)
+
+
+# Point the export link at the current dataset, range, columns and filters
+app.clientside_callback(
+    """
+    function(storedData, range, x, y, z, color, outlierMode, eventFilter, fmt, eventsData) {
+        const key = storedData && (storedData.dataset_id || storedData.archive);
+        if (!key) {
+            return '';
+        }
+        const params = new URLSearchParams();
+        if (range) {
+            params.set('first', range[0]);
+            params.set('last', range[1]);
+        }
+        params.set('columns', [x, y, z, color].join(','));
+        params.set('outliers', outlierMode || 'show');
+        if (eventsData && eventsData.dataset === key) {
+            params.set('events', eventsData.key);
+            for (const label of eventFilter || []) {
+                params.append('event', label);
+            }
+        }
+        if (storedData.archive) {
+            // Archive ranges are read on demand, so the link names the archive
+            return '/export/archive/' + encodeURIComponent(storedData.archive) + '.' + fmt + '?' + params.toString();
+        }
+        return '/export/' + storedData.dataset_id + '.' + fmt + '?' + params.toString();
+    }
+    """,
+    Output('export-link', 'href'),
+    [Input('stored-data', 'data'),
+     Input('date-range-store', 'data')] +
+    [Input(f'{axis}-column', 'data') for axis in DEFAULT_AXES] +
+    [Input('outlier-mode', 'value'),
+     Input('event-filter', 'value'),
+     Input('export-format', 'value'),
+     Input('events-store', 'data')]
+)
+
+
+def plotted_levels(dataset, start, end, overlays=None):
+    """
+    Pyramid level and rows drawn for a dataset and its overlays over a time span.
+
+    Overlays are cut from their own time index over the same time span and
+    share the point budget in proportion to their rows in it.
+
+    Returns:
+        list: ``(resolution, level, rows)`` of the dataset, then of each overlay
+    """
+    compared = [dataset] + [datasets.get(overlay['dataset_id']) for overlay in overlays or []]
+    counts = [rows.stop - rows.start for rows in (d.time_slice(start, end) for d in compared)]
+    budgets = split_budget(counts)
+    return [d.pyramid.select(start, end, budget) for d, budget in zip(compared, budgets)]
+
+
+# Callback to update the 3D graph on upload, and on range changes of
+# datasets too large for browser-side filtering
+@app.callback(
+    [Output('3d-graph', 'figure'),
+     Output('client-data', 'data'),
+     Output('overlay-traces', 'data')],
+    [Input('stored-data', 'data'),
+     Input('server-range-store', 'data')] +
+    [Input(f'{axis}-column', 'data') for axis in DEFAULT_AXES] +
+    [Input('view-mode', 'value'),
+     Input('outlier-mode', 'value'),
+     Input('events-store', 'data'),
+     Input('event-filter', 'value'),
+     Input('color-by-event', 'value'),
+     Input('overlay-store', 'data'),
+     Input('brush-store', 'data')],
+    [State('date-range-store', 'data'),
+     State('camera-store', 'data'),
+     State('overlay-toggle', 'value')],
+    prevent_initial_call=True
+)
+def update_graph(stored_data, server_range, x_column, y_column, z_column, color_column,
+                 view_mode, outlier_mode, events_data, event_filter, color_by_event, overlays,
+                 brush_data, current_range, camera_pos, visible_overlays):
+    if not stored_data:
+        raise PreventUpdate
+    
+    try:
+        triggered = [t['prop_id'] for t in callback_context.triggered]
+        axes = {'x': x_column, 'y': y_column, 'z': z_column, 'color': color_column}
+        
+        client_data = no_update
+        if 'stored-data.data' in triggered:
+            # New upload: plot everything; archives open on their last days
+            slider_value = current_range if stored_data.get('archive') else None
+        elif 'server-range-store.data' in triggered:
+            slider_value = server_range
+        else:
+            # Axis, view, outlier or event change: keep the current range
+            slider_value = current_range
+        
+        dataset, first_day, last_day = range_dataset(stored_data, slider_value)
+        changed = [axis for axis in DEFAULT_AXES if f'{axis}-column.data' in triggered]
+        # Only columns were switched on a drawn point view: swap their arrays
+        axes_only = bool(changed) and len(changed) == len(triggered) and view_mode == 'scatter'
+        if 'stored-data.data' in triggered or changed:
+            # If small enough, ship the plotted columns so later range
+            # changes never reach the server
+            if not stored_data.get('client_side'):
+                client_data = None
+            elif axes_only:
+                client_data = client_patch(dataset, axes, changed)
+            else:
+                client_data = build_client_payload(dataset, axes)
+        
+        if view_mode in ('count', 'color'):
+            # Density view: cost depends on the grid size, not the row count
+            figure = build_density_figure(dataset, first_day, last_day, camera_pos, axes, view_mode)
+            return figure, client_data, None
+        
+        # Filter data based on slider values if available
+        start, end = dataset.day_range(first_day, last_day)
+        
+        # Plot the finest resolution that fits the point budget
+        (resolution, level, rows), *overlay_rows = plotted_levels(dataset, start, end, overlays)
+        
+        # Events belong to this dataset only if loaded after its upload
+        events = loaded_events(events_data, stored_data)
+        
+        # Samples outside the brushes of the 2D projections are left out
+        brushed = combine_masks(brush_masks(level, rows, current_brushes(stored_data, brush_data), PROJECTIONS))
+        
+        if axes_only:
+            traces = [(level, index, resolution, meta, None)
+                      for meta, index in figure_groups(level, rows, outlier_mode, events, event_filter, brushed)]
+            traces += [(other_level, other_rows, other_resolution, 'overlay', overlay['name'])
+                       for overlay, (other_resolution, other_level, other_rows) in zip(overlays or [], overlay_rows)]
+            return axis_patch(changed, axes, traces, bool(color_by_event)), client_data, no_update
+        
+        figure = build_figure(level, rows, camera_pos, resolution, axes, outlier_mode,
+                              events, event_filter, bool(color_by_event), brushed)
+        
+        labels = {axis: column_label(column) for axis, column in axes.items()}
+        overlay_traces = {}
+        for n, (overlay, (other_resolution, other_level, other_rows)) in enumerate(zip(overlays or [], overlay_rows)):
+            trace = overlay_trace(other_level, other_rows, axes, labels, other_resolution, overlay['name'], n)
+            trace.visible = overlay['dataset_id'] in (visible_overlays or [])
+            overlay_traces[overlay['dataset_id']] = len(figure['data'])
+            figure['data'].append(trace)
+        return figure, client_data, overlay_traces
+    
+    except Exception as e:
+        print(f"Error in update_graph: {str(e)}")
+        return {
+            'data': [],
+            'layout': go.Layout(
+                scene=dict(
+                    xaxis=dict(title='Error occurred'),
+                    yaxis=dict(title=''),
+                    zaxis=dict(title='')
+                )
+            )
+        }, no_update, None
+
+def plotted_marker(point, stored_data, date_range, overlays, columns):
+    """
+    Samples drawn at a marker of the 3D plot.
+
+    The marker's coordinates are looked up in the spatial index of the
+    plotted level of the dataset, then of each overlay.
+
+    Args:
+        point (dict): Entry of the graph's hoverData or clickData points
+        stored_data (dict): Reference to the plotted dataset
+        date_range (list): Plotted slider range
+        overlays (list): Overlaid datasets
+        columns (list): Columns on the x, y and z axes
+
+    Returns:
+        tuple: ``(name, resolution, level, rows, found)``, with ``name``
+        None for the dataset itself and ``found`` the matching rows of
+        ``level`` within the plotted ``rows``; None if no sample lies there
+    """
+    dataset, first_day, last_day = range_dataset(stored_data, date_range)
+    start, end = dataset.day_range(first_day, last_day)
+    coordinates = [point[axis] for axis in SPATIAL_AXES]
+    names = [None] + [overlay['name'] for overlay in overlays or []]
+    for name, (resolution, level, rows) in zip(names, plotted_levels(dataset, start, end, overlays)):
+        found = spatial_index(level, columns).locate(coordinates, rows)
+        if len(found):
+            return name, resolution, level, rows, found
+    return None
+
+
+def time_heading(level, row, resolution='raw'):
+    """Time of a sample, or the span of its bucket on aggregated levels."""
+    time = str(format_times(level.time[row:row + 1])[0])
+    return time if resolution == 'raw' else f"{resolution} from {time}"
+
+
+def sample_details(level, found, resolution, name=None):
+    """
+    Every column of the first sample at a marker: its time, the statistics
+    of each signal, text columns such as patient and status, and whether it
+    was flagged as an outlier.
+    """
+    row = found[0]
+    heading = time_heading(level, row, resolution)
+    if len(found) > 1:
+        heading += f" (and {len(found) - 1} more samples at this point)"
+    
+    stats, signals, lines = [], {}, []
+    for column, values in level.columns.items():
+        if values.dtype.kind != 'f':
+            lines.append(html.Div(f"{column_label(column)}: {values[row]}"))
+            continue
+        signal, stat = split_statistic(column)
+        if stat not in stats:
+            stats.append(stat)
+        signals.setdefault(signal, {})[stat] = values[row]
+    lines.append(html.Div(f"Outlier: {'yes' if outlier_mask(level)[row] else 'no'}"))
+    
+    cell = {'padding': '2px 8px', 'textAlign': 'right'}
+    table = html.Table([
+        html.Tr([html.Th('')] + [html.Th(stat.title() or 'Value', style=cell) for stat in stats]),
+        *[
+            html.Tr([html.Td(column_label(signal))] + [
+                html.Td(f"{values[stat]:.1f}" if stat in values else '', style=cell) for stat in stats
+            ])
+            for signal, values in signals.items()
+        ]
+    ])
+    return [html.B(f"{name}: {heading}" if name else heading), table] + lines
+
+
+def neighborhood_summary(level, index, coordinates, rows, radius, resolution):
+    """Samples of the plotted range around a point, counted and the nearest listed."""
+    within = index.within(coordinates, radius, rows)
+    nearest, distances = index.nearest(coordinates, NEIGHBORS_SHOWN, rows)
+    kind = 'samples' if resolution == 'raw' else f"{resolution} buckets"
+    summary = f"{len(within)} plotted {kind} within {radius:g} standard deviations"
+    if len(within):
+        summary += f", {time_heading(level, within[0])} to {time_heading(level, within[-1])}"
+    
+    cell = {'padding': '2px 8px', 'textAlign': 'right'}
+    header = ['Time', 'Distance'] + [column_label(column) for column in index.columns]
+    table = html.Table([
+        html.Tr([html.Th(text, style=cell) for text in header]),
+        *[
+            html.Tr(
+                [html.Td(time_heading(level, row), style=cell),
+                 html.Td(f"{distance:.2f}", style=cell)] +
+                [html.Td(f"{level.column(column)[row]:.1f}", style=cell) for column in index.columns]
+            )
+            for row, distance in zip(nearest, distances)
+        ]
+    ])
+    return [html.Div(summary), table]
+
+
+@app.callback(
+    Output('point-details', 'children'),
+    [Input('3d-graph', 'hoverData'),
+     Input('3d-graph', 'clickData')],
+    [State('stored-data', 'data'),
+     State('date-range-store', 'data'),
+     State('overlay-store', 'data'),
+     State('view-mode', 'value')] +
+    [State(f'{axis}-column', 'data') for axis in SPATIAL_AXES],
+    prevent_initial_call=True
+)
+def show_point_details(hover_data, click_data, stored_data, date_range, overlays, view_mode, *columns):
+    """Details of the samples behind the hovered (or clicked) marker, looked up on the server."""
+    triggered = callback_context.triggered[0]['prop_id']
+    data = click_data if triggered == '3d-graph.clickData' else hover_data
+    if not stored_data or not data or not data.get('points') or view_mode != 'scatter':
+        raise PreventUpdate
+    
+    try:
+        marker = plotted_marker(data['points'][0], stored_data, date_range, overlays, columns)
+        if marker is None:
+            return "No plotted sample at this point"
+        name, resolution, level, rows, found = marker
+        return sample_details(level, found, resolution, name)
+    
+    except Exception as e:
+        print(f"Error in show_point_details: {str(e)}")
+        return html.Span(f"❌ {str(e)}", style={'color': '#dc2626'})
+
+
+@app.callback(
+    Output('point-neighborhood', 'children'),
+    [Input('3d-graph', 'clickData'),
+     Input('neighborhood-radius', 'value')],
+    [State('stored-data', 'data'),
+     State('date-range-store', 'data'),
+     State('overlay-store', 'data'),
+     State('view-mode', 'value')] +
+    [State(f'{axis}-column', 'data') for axis in SPATIAL_AXES],
+    prevent_initial_call=True
+)
+def show_neighborhood(click_data, radius, stored_data, date_range, overlays, view_mode, *columns):
+    """Samples of the plotted range near the clicked marker, from a radius query."""
+    if not stored_data or not click_data or not click_data.get('points') or view_mode != 'scatter':
+        raise PreventUpdate
+    
+    try:
+        marker = plotted_marker(click_data['points'][0], stored_data, date_range, overlays, columns)
+        if marker is None:
+            return "No plotted sample at this point"
+        _, resolution, level, rows, _ = marker
+        coordinates = [click_data['points'][0][axis] for axis in SPATIAL_AXES]
+        return neighborhood_summary(level, spatial_index(level, columns), coordinates, rows,
+                                    radius or NEIGHBORHOOD_RADIUS, resolution)
+    
+    except Exception as e:
+        print(f"Error in show_neighborhood: {str(e)}")
+        return html.Span(f"❌ {str(e)}", style={'color': '#dc2626'})
+
+
+# Keep the date slider and the date picker in sync. Both only map slider
+# indices to the date strings already held in the stored data, so this is done
+# in the browser as well.
+app.clientside_callback(
+    """
+    function(sliderValue, pickerStart, pickerEnd, storedData) {
+        const clientside = window.dash_clientside;
+        if (!storedData || !storedData.dates || !storedData.dates.length) {
+            throw clientside.PreventUpdate;
+        }
+        const ctx = clientside.callback_context;
+        if (!ctx.triggered || !ctx.triggered.length) {
+            throw clientside.PreventUpdate;
+        }
+
+        // Stored dates are 'DD-MM-YYYY'; the picker speaks 'YYYY-MM-DD'.
+        const isoDates = storedData.dates.map(d => d.split('-').reverse().join('-'));
+        const triggerId = ctx.triggered[0].prop_id;
+
+        if (triggerId.indexOf('date-slider') !== -1) {
+            // Slider was moved
+            if (!sliderValue) {
+                throw clientside.PreventUpdate;
+            }
+            return [clientside.no_update, isoDates[sliderValue[0]], isoDates[sliderValue[1]]];
+        }
+
+        // Date picker was changed: snap to the nearest dates that have data
+        if (!pickerStart || !pickerEnd) {
+            throw clientside.PreventUpdate;
+        }
+        const start = pickerStart.slice(0, 10);
+        const end = pickerEnd.slice(0, 10);
+        let startIdx = isoDates.findIndex(d => d >= start);
+        let endIdx = -1;
+        for (let i = isoDates.length - 1; i >= 0; i--) {
+            if (isoDates[i] <= end) {
+                endIdx = i;
+                break;
+            }
+        }
+        if (startIdx === -1 || endIdx === -1 || startIdx > endIdx) {
+            throw clientside.PreventUpdate;
+        }
+        return [[startIdx, endIdx], clientside.no_update, clientside.no_update];
+    }
+    """,
+    [Output('date-slider', 'value'),
+     Output('date-picker-range', 'start_date'),
+     Output('date-picker-range', 'end_date')],
+    [Input('date-slider', 'value'),
+     Input('date-picker-range', 'start_date'),
+     Input('date-picker-range', 'end_date')],
+    [State('stored-data', 'data')],
+    prevent_initial_call=True
+)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
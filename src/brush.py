@@ -0,0 +1,82 @@
+"""
+Brushing: selecting rows by drawing on 2D projections of the data.
+
+A brush is a box or lasso drawn on one projection, kept in the data
+coordinates of that projection's two columns. It becomes a boolean row mask
+through vectorized comparisons against those columns, one pass per brush.
+Each view combines the masks of the other views' brushes, and the 3D plot
+combines all of them, so adding views never repeats the tests.
+"""
+
+import numpy as np
+
+
+def region_mask(x, y, region):
+    """
+    Points inside a brushed region.
+
+    Args:
+        x, y (np.ndarray): Point coordinates
+        region (dict): ``{'box': {'x': [x0, x1], 'y': [y0, y1]}}`` or
+            ``{'lasso': {'x': [...], 'y': [...]}}`` with the polygon corners
+
+    Returns:
+        np.ndarray: Boolean mask; points with a NaN coordinate are outside
+    """
+    if 'box' in region:
+        x0, x1 = sorted(region['box']['x'])
+        y0, y1 = sorted(region['box']['y'])
+        return (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+
+    px = np.asarray(region['lasso']['x'], dtype='float64')
+    py = np.asarray(region['lasso']['y'], dtype='float64')
+    # Only points in the polygon's bounding box need the crossing test
+    inside = (x >= px.min()) & (x <= px.max()) & (y >= py.min()) & (y <= py.max())
+    candidates = np.flatnonzero(inside)
+    cx, cy = x[candidates], y[candidates]
+
+    # Even-odd rule: count the polygon edges crossed by a ray towards +x
+    crossings = np.zeros(len(candidates), dtype=bool)
+    for x0, y0, x1, y1 in zip(px, py, np.roll(px, -1), np.roll(py, -1)):
+        if y0 == y1:
+            continue
+        straddles = (y0 > cy) != (y1 > cy)
+        crossings ^= straddles & (cx < x0 + (cy - y0) * (x1 - x0) / (y1 - y0))
+    inside[candidates] = crossings
+    return inside
+
+
+def brush_masks(dataset, rows, brushes, views):
+    """
+    Mask of every brush over a row range.
+
+    Args:
+        dataset (Dataset): Dataset or pyramid level
+        rows (slice): Row range with explicit start and stop
+        brushes (dict): View id -> region, see ``region_mask``
+        views (dict): View id -> ``(x column, y column)``
+
+    Returns:
+        dict: View id -> boolean mask over ``rows``, for brushed views
+    """
+    masks = {}
+    for view, region in (brushes or {}).items():
+        if view not in views or not region:
+            continue
+        x_column, y_column = views[view]
+        masks[view] = region_mask(dataset.column(x_column)[rows], dataset.column(y_column)[rows], region)
+    return masks
+
+
+def combine_masks(masks, skip=None):
+    """
+    Rows passing every brush but the one of ``skip``.
+
+    Returns:
+        np.ndarray: Boolean mask, or None when no brush applies
+    """
+    combined = None
+    for view, mask in masks.items():
+        if view != skip:
+            combined = mask.copy() if combined is None else combined & mask
+    return combined
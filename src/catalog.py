@@ -0,0 +1,141 @@
+"""
+Catalog of the partitioned archives in a local data directory.
+
+Every folder of the data directory holding a ``_partitions.json`` (as
+written by the concatenator's partitioned output) is an archive. Browsing the
+catalog and opening an archive only reads that metadata. Rows are read when a
+date range is plotted, and only from the partitions overlapping it. Converted
+partitions are kept in a size-bounded LRU cache, so moving the range back and
+forth re-reads only the days that went cold.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from partitions import PARTITION_METADATA, pq, read_metadata, read_partition
+
+# Folder whose partitioned archives are listed in the dashboard
+DATA_DIR = os.path.realpath(os.environ.get('DATA_DIR', os.path.join(os.getcwd(), 'data')))
+
+# Most bytes of converted partitions kept in memory
+CATALOG_CACHE_BYTES = int(os.environ.get('CATALOG_CACHE_BYTES', 2**30))
+
+
+class Catalog:
+    """
+    Partitioned archives of a data directory.
+
+    Args:
+        directory (str): Data directory
+        convert (callable, optional): Turns the raw rows of one partition
+            into plotted rows, e.g. aggregating a raw format per timestamp
+        max_bytes (int): Memory budget of the partition cache
+    """
+
+    def __init__(self, directory=DATA_DIR, convert=None, max_bytes=CATALOG_CACHE_BYTES):
+        self.directory = directory
+        self.convert = convert or (lambda df: df)
+        self.max_bytes = max_bytes
+        self._metadata = {}
+        self._partitions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _archive_dir(self, name):
+        path = os.path.join(self.directory, name or '')
+        if (not name or os.path.basename(name) != name or name.startswith('.') or
+                not os.path.isfile(os.path.join(path, PARTITION_METADATA))):
+            raise KeyError(f"unknown archive: {name!r}")
+        return path
+
+    def archives(self):
+        """Names of the archives, sorted."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if os.path.isfile(os.path.join(self.directory, name, PARTITION_METADATA))
+        )
+
+    def metadata(self, name):
+        """
+        Partition metadata of an archive, re-read when the file changes.
+
+        Raises:
+            KeyError: If there is no such archive
+        """
+        path = os.path.join(self._archive_dir(name), PARTITION_METADATA)
+        version = os.path.getmtime(path)
+        cached = self._metadata.get(name)
+        if cached is None or cached[0] != version:
+            cached = (version, read_metadata(os.path.dirname(path)))
+            self._metadata[name] = cached
+        return cached[1]
+
+    def version(self, name):
+        """Token that changes whenever an archive is rewritten."""
+        self.metadata(name)
+        return self._metadata[name][0]
+
+    def days(self, name):
+        """Sorted 'YYYY-MM-DD' days that have a partition."""
+        return sorted({entry['date'] for entry in self.metadata(name)['partitions'] if entry['rows']})
+
+    def empty_frame(self, name):
+        """
+        Converted rows of an archive without any row, for its column names
+        and dtypes; only the schema of one file is read.
+        """
+        if pq is None:
+            raise ImportError("Reading partitions needs pyarrow")
+        entry = self.metadata(name)['partitions'][0]
+        path = os.path.join(self._archive_dir(name), entry['path'], entry['files'][0])
+        return self.convert(pq.read_schema(path).empty_table().to_pandas())
+
+    def _partition(self, name, entry):
+        key = (name, self.version(name), entry['path'])
+        with self._lock:
+            if key in self._partitions:
+                self._partitions.move_to_end(key)
+                return self._partitions[key][0]
+
+        frame = self.convert(read_partition(self._archive_dir(name), entry))
+        size = int(frame.memory_usage(index=False).sum())
+        with self._lock:
+            if key in self._partitions:
+                # Another request read it meanwhile
+                return self._partitions[key][0]
+            self._partitions[key] = (frame, size)
+            self._bytes += size
+            # Evict the least recently used partitions, never the new one
+            while self._bytes > self.max_bytes and len(self._partitions) > 1:
+                _, (_, evicted) = self._partitions.popitem(last=False)
+                self._bytes -= evicted
+        return frame
+
+    def load(self, name, first_day, last_day):
+        """
+        Converted rows of the days in an inclusive range.
+
+        Args:
+            name (str): Archive name
+            first_day, last_day (str): 'YYYY-MM-DD' bounds
+
+        Returns:
+            pd.DataFrame: Rows of the overlapping partitions
+
+        Raises:
+            KeyError: If there is no such archive
+            ValueError: If no partition overlaps the range
+        """
+        entries = [
+            entry for entry in self.metadata(name)['partitions']
+            if entry['rows'] and first_day <= entry['date'] <= last_day
+        ]
+        if not entries:
+            raise ValueError(f"{name} has no data from {first_day} to {last_day}")
+        frames = [self._partition(name, entry) for entry in entries]
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
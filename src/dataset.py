@@ -0,0 +1,302 @@
+"""
+Server-side storage for converted biosignal datasets.
+
+An upload is converted once and kept here as time-sorted numpy columns. The
+dashboard callbacks then only pass a small dataset reference back and forth
+with the browser instead of shipping every row on every interaction.
+
+Datasets are kept in a small in-process LRU and mirrored to disk, so any
+gunicorn worker can serve a dataset that was uploaded through another one.
+"""
+
+import base64
+import hashlib
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from features import compute_derived
+from storage import APP_CACHE_DIR, MirroredStore
+
+# Where converted datasets are mirrored so every worker process can load
+# them; only ever used if private to this user, see ``storage``
+CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', os.path.join(APP_CACHE_DIR, 'datasets'))
+
+# How many datasets each worker keeps decoded in memory
+MAX_CACHED_DATASETS = int(os.environ.get('MAX_CACHED_DATASETS', 8))
+
+# Size cap of the on-disk copies; the least recently used are removed first
+MAX_CACHE_BYTES = int(os.environ.get('DATASET_CACHE_BYTES', 4 * 2**30))
+
+# Version of the conversion and aggregation code and of the stored dataset
+# layout. It seeds every content-derived dataset id, so datasets stored by an
+# older version are never reused (and age out of the on-disk cache); bump it
+# whenever either changes.
+DATASET_FORMAT = 1
+
+NS_PER_DAY = 86_400 * 10**9
+
+_DATASET_ID = re.compile(r'^[0-9a-f]{8,64}$')
+
+
+class Dataset:
+    """
+    Time-sorted, columnar copy of a converted DataFrame.
+
+    Attributes:
+        dataset_id (str): Key of the dataset in the store
+        time (np.ndarray): int64 nanoseconds since epoch, sorted ascending
+        columns (dict): Column name -> np.ndarray aligned with ``time``.
+            Numeric columns are float64, everything else is object.
+        derived (dict): Cache of columns computed on demand by ``column``
+        cache (dict): Other structures built on demand, e.g. density grids
+        day_starts (np.ndarray): int64 nanoseconds of each calendar day with data
+        day_offsets (np.ndarray): Row where each day starts, followed by ``len(time)``
+    """
+
+    def __init__(self, df, dataset_id=None):
+        self.dataset_id = dataset_id or uuid.uuid4().hex
+
+        # Stable sort; close to free when the rows already are in time order
+        df = df.sort_values('time', kind='mergesort')
+        self.time = _time_values(df['time'])
+        self.columns = {col: _column_values(df[col]) for col in df.columns if col != 'time'}
+
+        self.derived = {}
+        self.cache = {}
+        self._index_days()
+
+    @classmethod
+    def from_columns(cls, time, columns, dataset_id=None):
+        """
+        Build a dataset from arrays that already are in time order.
+
+        Args:
+            time (np.ndarray): Sorted int64 nanosecond timestamps
+            columns (dict): Column name -> array aligned with ``time``
+            dataset_id (str, optional): Key of the dataset in the store
+        """
+        dataset = cls.__new__(cls)
+        dataset.dataset_id = dataset_id or uuid.uuid4().hex
+        dataset.time = time
+        dataset.columns = dict(columns)
+        dataset.derived = {}
+        dataset.cache = {}
+        dataset._index_days()
+        return dataset
+
+    def _index_days(self, first_row=0):
+        # Days before the one holding first_row keep their offsets, so
+        # appending rows only re-indexes the tail of the dataset
+        first_day = 0
+        if first_row:
+            first_day = max(int(np.searchsorted(self.day_offsets[:-1], first_row, side='right')) - 1, 0)
+            first_row = int(self.day_offsets[first_day])
+
+        time = self.time[first_row:]
+        days, offsets = np.unique(time - time % NS_PER_DAY, return_index=True)
+        self.day_starts = np.concatenate([self.day_starts[:first_day], days]) if first_day else days
+        offsets = np.concatenate([self.day_offsets[:first_day], offsets + first_row]) if first_day else offsets
+        self.day_offsets = np.append(offsets, len(self.time)).astype('int64')
+
+    def __getstate__(self):
+        # Growth buffers only matter while appending; pickle the exact columns
+        state = dict(self.__dict__)
+        state.pop('_buffers', None)
+        return state
+
+    def splice(self, first_row, time, columns):
+        """
+        Replace the rows from ``first_row`` on with new rows.
+
+        Columns are views into buffers that grow by doubling, so appending k
+        rows costs O(k) amortized instead of copying the whole dataset.
+        Derived columns and cached structures are dropped since they no
+        longer match the rows.
+
+        Args:
+            first_row (int): First row to overwrite; ``len(self)`` appends
+            time (np.ndarray): Sorted int64 nanosecond timestamps, later than
+                the rows that are kept
+            columns (dict): Column name -> new values, for every column
+        """
+        n_rows = first_row + len(time)
+        buffers = self.__dict__.get('_buffers')
+        if buffers is None or len(buffers['time']) < n_rows:
+            capacity = max(n_rows, 2 * len(self.time), 1024)
+            buffers = {}
+            for name, values in [('time', self.time)] + list(self.columns.items()):
+                buffers[name] = np.empty(capacity, dtype=values.dtype)
+                buffers[name][:first_row] = values[:first_row]
+            self._buffers = buffers
+
+        buffers['time'][first_row:n_rows] = time
+        self.time = buffers['time'][:n_rows]
+        for name in self.columns:
+            buffers[name][first_row:n_rows] = columns[name]
+            self.columns[name] = buffers[name][:n_rows]
+
+        self.derived = {}
+        self.cache = {}
+        self._index_days(first_row)
+
+    def append_frame(self, df):
+        """
+        Append the rows of a converted DataFrame that are newer than the last row.
+
+        Rows at or before the current last timestamp would break the time
+        order and are dropped. Columns missing from ``df`` are filled with
+        NaN (or None), columns the dataset doesn't have are ignored.
+
+        Returns:
+            tuple: ``(first appended row, number of rows dropped as late)``
+        """
+        first_row = len(self)
+        time = _time_values(df['time'])
+        order = np.argsort(time, kind='mergesort')
+        if first_row:
+            order = order[time[order] > self.time[-1]]
+
+        columns = {}
+        for name, values in self.columns.items():
+            if name in df.columns:
+                new_values = _column_values(df[name])[order]
+            else:
+                new_values = np.full(len(order), np.nan if values.dtype.kind == 'f' else None)
+            columns[name] = new_values.astype(values.dtype)
+        self.splice(first_row, time[order], columns)
+        return first_row, len(df) - len(order)
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def numeric_columns(self):
+        """Names of the float64 columns, in their original order."""
+        return [c for c, v in self.columns.items() if v.dtype.kind == 'f']
+
+    def column(self, name):
+        """
+        Values of a stored or derived column for all rows.
+
+        Derived columns (see ``features``) are computed on first use and cached.
+
+        Raises:
+            KeyError: If the column neither exists nor can be derived
+        """
+        if name in self.columns:
+            return self.columns[name]
+        if name not in self.derived:
+            self.derived[name] = compute_derived(self, name)
+        return self.derived[name]
+
+    def date_labels(self, fmt='%d-%m-%Y'):
+        """Formatted calendar days that have data, in order."""
+        return list(pd.to_datetime(self.day_starts).strftime(fmt))
+
+    def day_slice(self, first_day, last_day):
+        """
+        Rows belonging to an inclusive range of day indices.
+
+        Args:
+            first_day (int): Index into ``day_starts`` of the first day
+            last_day (int): Index into ``day_starts`` of the last day
+
+        Returns:
+            slice: Contiguous row range, ready to index any column
+        """
+        n_days = len(self.day_starts)
+        first_day = min(max(int(first_day), 0), n_days)
+        last_day = min(max(int(last_day), first_day - 1), n_days - 1)
+        return slice(int(self.day_offsets[first_day]), int(self.day_offsets[last_day + 1]))
+
+    def day_range(self, first_day, last_day):
+        """
+        Time span of an inclusive range of day indices.
+
+        Returns:
+            tuple: ``(start_ns, end_ns)`` from midnight of the first day to
+            midnight after the last one
+        """
+        n_days = len(self.day_starts)
+        first_day = min(max(int(first_day), 0), n_days - 1)
+        last_day = min(max(int(last_day), first_day), n_days - 1)
+        return int(self.day_starts[first_day]), int(self.day_starts[last_day]) + NS_PER_DAY
+
+    def time_slice(self, start_ns, end_ns):
+        """Rows with ``start_ns <= time < end_ns``, found by binary search."""
+        lo, hi = np.searchsorted(self.time, [start_ns, end_ns], side='left')
+        return slice(int(lo), int(hi))
+
+    def frame(self, rows=slice(None), columns=None):
+        """
+        Materialize a DataFrame for a row range.
+
+        Args:
+            rows (slice): Row range, e.g. from ``day_slice``
+            columns (list, optional): Columns to include besides ``time``
+
+        Returns:
+            pd.DataFrame: The selected rows with a datetime ``time`` column
+        """
+        columns = list(self.columns) if columns is None else columns
+        data = {'time': self.time[rows].view('datetime64[ns]')}
+        data.update({c: self.column(c)[rows] for c in columns})
+        return pd.DataFrame(data)
+
+
+def _time_values(values):
+    time = pd.to_datetime(values)
+    if time.dt.tz is not None:
+        time = time.dt.tz_localize(None)
+    return time.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _column_values(values):
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype='float64', na_value=np.nan)
+    return values.to_numpy(dtype=object)
+
+
+def dataset_hash(data=b''):
+    """
+    SHA-256 hash object for a content-derived dataset id, seeded with
+    ``DATASET_FORMAT``; feed it the content with ``update``.
+    """
+    return hashlib.sha256(f"biosignal-dataset-{DATASET_FORMAT}\n".encode('ascii') + data)
+
+
+class DatasetStore(MirroredStore):
+    """
+    LRU of datasets in this process, mirrored to pickles on disk.
+
+    Args:
+        directory (str): Folder for the on-disk copies
+        max_entries (int): Datasets to keep in memory per process
+        max_bytes (int): Total size of the on-disk copies to keep
+    """
+
+    key_pattern = _DATASET_ID
+    kind = 'dataset'
+
+    def __init__(self, directory=CACHE_DIR, max_entries=MAX_CACHED_DATASETS, max_bytes=MAX_CACHE_BYTES):
+        super().__init__(directory, max_entries, max_bytes)
+
+    def key(self, dataset):
+        return dataset.dataset_id
+
+
+def encode_array(values, dtype='<f4'):
+    """
+    Pack a numeric array as base64 little-endian bytes for the browser.
+
+    Float32 halves the transfer compared to float64 and is plenty for plotting.
+    """
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+# Shared store used by the dashboard callbacks
+datasets = DatasetStore()
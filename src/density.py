@@ -0,0 +1,109 @@
+"""
+3D histograms of the plotted columns for the density view.
+
+Rows are binned once per day into a fixed grid spanning the whole dataset,
+and the per-day grids are stored as a running sum. The grid for any day range
+is then the difference of two cumulative grids, so changing the date range
+costs a few grid-sized array operations regardless of how many rows it covers.
+"""
+
+import os
+
+import numpy as np
+
+# Bins along each axis of the density grid
+DENSITY_BINS = int(os.environ.get('DENSITY_BINS', 24))
+
+
+class DensityGrids:
+    """
+    Cumulative per-day 3D histograms of one (x, y, z, color) column choice.
+
+    Args:
+        dataset (Dataset): Time-sorted dataset
+        axes (dict): Column for 'x', 'y', 'z' and 'color'
+        bins (int): Bins along each axis
+
+    Attributes:
+        edges (list): Bin edges of the x, y and z axes
+        counts (np.ndarray): ``(n_days + 1, bins**3)`` running row counts
+        color_sums (np.ndarray): Running sums of the color column
+        color_counts (np.ndarray): Running counts of non-missing colors
+    """
+
+    def __init__(self, dataset, axes, bins=DENSITY_BINS):
+        self.bins = bins
+        coords = [dataset.column(axes[axis]) for axis in ('x', 'y', 'z')]
+        color = dataset.column(axes['color'])
+
+        self.edges = []
+        flat = np.zeros(len(dataset), dtype='int64')
+        valid = np.ones(len(dataset), dtype=bool)
+        for values in coords:
+            lo, hi = _finite_range(values)
+            self.edges.append(np.linspace(lo, hi, bins + 1))
+            scaled = (values - lo) / (hi - lo) * bins
+            valid &= np.isfinite(scaled)
+            index = np.clip(np.nan_to_num(scaled), 0, bins - 1).astype('int64')
+            flat = flat * bins + index
+
+        # One bincount over (day, cell) keys builds every day's grid at once
+        n_days = len(dataset.day_starts)
+        n_cells = bins ** 3
+        days = np.repeat(np.arange(n_days), np.diff(dataset.day_offsets))
+        keys = (days * n_cells + flat)[valid]
+        has_color = np.isfinite(color[valid])
+
+        per_day = [
+            np.bincount(keys, minlength=n_days * n_cells),
+            np.bincount(keys[has_color], weights=color[valid][has_color], minlength=n_days * n_cells),
+            np.bincount(keys[has_color], minlength=n_days * n_cells),
+        ]
+        self.counts, self.color_sums, self.color_counts = (
+            np.concatenate([np.zeros((1, n_cells)), np.cumsum(g.reshape(n_days, n_cells), axis=0)])
+            for g in per_day
+        )
+
+    def centers(self):
+        """Flattened x, y and z bin centers, in grid order."""
+        mids = [(e[:-1] + e[1:]) / 2 for e in self.edges]
+        return [m.ravel() for m in np.meshgrid(*mids, indexing='ij')]
+
+    def grid(self, first_day, last_day, value='count'):
+        """
+        Histogram of an inclusive range of day indices.
+
+        Args:
+            first_day (int): Index of the first day
+            last_day (int): Index of the last day
+            value (str): 'count' for row counts or 'color' for the mean of
+                the color column per bin (NaN for empty bins)
+
+        Returns:
+            np.ndarray: Flattened grid of ``bins**3`` values
+        """
+        lo, hi = int(first_day), int(last_day) + 1
+        counts = self.counts[hi] - self.counts[lo]
+        if value == 'count':
+            return counts
+        color_counts = self.color_counts[hi] - self.color_counts[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(color_counts > 0, (self.color_sums[hi] - self.color_sums[lo]) / color_counts, np.nan)
+
+
+def _finite_range(values):
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return 0.0, 1.0
+    lo, hi = float(finite.min()), float(finite.max())
+    if hi <= lo:
+        hi = lo + 1.0
+    return lo, hi
+
+
+def density_grids(dataset, axes, bins=DENSITY_BINS):
+    """Density grids for a column choice, built on first use and cached on the dataset."""
+    key = ('density', bins) + tuple(axes[axis] for axis in ('x', 'y', 'z', 'color'))
+    if key not in dataset.cache:
+        dataset.cache[key] = DensityGrids(dataset, axes, bins)
+    return dataset.cache[key]
@@ -0,0 +1,59 @@
+"""
+Shape-preserving downsampling of time series for line plots.
+
+A time window is cut into equal buckets, about one per pixel of the plot,
+and only the first minimum and first maximum of each bucket are kept, in
+their time order. Peaks, dips and flat stretches look the same as with every
+sample drawn, while the points sent stay under twice the number of buckets.
+Buckets are contiguous runs of the time-sorted rows, so the whole reduction
+is a handful of ``reduceat`` calls.
+"""
+
+import os
+
+import numpy as np
+
+from segments import segment_starts
+
+# Buckets across the time axis, about the plot's width in pixels
+TIMESERIES_BUCKETS = int(os.environ.get('TIMESERIES_BUCKETS', 1000))
+
+
+def minmax_downsample(time, values, start_ns, end_ns, buckets=TIMESERIES_BUCKETS):
+    """
+    Minimum and maximum of each time bucket of a window.
+
+    Args:
+        time (np.ndarray): Sorted int64 nanosecond timestamps
+        values (np.ndarray): Values aligned with ``time``
+        start_ns (int): Start of the window (inclusive)
+        end_ns (int): End of the window (exclusive)
+        buckets (int): Number of equal-width buckets
+
+    Returns:
+        tuple: ``(time, values)`` of the kept samples in time order; all
+        non-missing samples of the window when there are few enough
+    """
+    rows = slice(int(np.searchsorted(time, start_ns)), int(np.searchsorted(time, end_ns)))
+    time, values = time[rows], values[rows]
+    valid = ~np.isnan(values)
+    if not valid.all():
+        time, values = time[valid], values[valid]
+    n = len(values)
+    if n <= 2 * buckets:
+        return time, values
+
+    keys = (time - start_ns) * buckets // max(end_ns - start_ns, 1)
+    starts = segment_starts(keys)
+    lengths = np.diff(np.append(starts, n))
+    positions = np.arange(n)
+
+    # First row of each bucket holding its minimum, and its maximum
+    lows = np.repeat(np.minimum.reduceat(values, starts), lengths)
+    highs = np.repeat(np.maximum.reduceat(values, starts), lengths)
+    first_low = np.minimum.reduceat(np.where(values == lows, positions, n), starts)
+    first_high = np.minimum.reduceat(np.where(values == highs, positions, n), starts)
+
+    # Sorted and without the doubles of buckets whose extremes coincide
+    picks = np.unique(np.concatenate((first_low, first_high)))
+    return time[picks], values[picks]
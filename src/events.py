@@ -0,0 +1,203 @@
+"""
+Clinical event annotations (seizures, medication, sleep, ...).
+
+Events come from a side CSV with a start time, an end time and a label per
+row, and may overlap. They are indexed once into elementary segments: the
+sorted start/end times cut the timeline into pieces during which the set of
+active events doesn't change, and each piece records the label of the most
+recently started active event. Tagging samples is then a single binary
+search per sample into the segment boundaries, O((n + m) log m) overall.
+
+Loaded event sets belong to the session that uploaded them, not to the
+dataset: identical uploads from different sessions share one dataset. They
+are kept in their own store under ``EventIndex.key``, which the browser
+holds on to.
+"""
+
+import base64
+import heapq
+import io
+import os
+import re
+import uuid
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from storage import APP_CACHE_DIR, MirroredStore
+
+NO_EVENT = 'No event'
+
+_START_COLUMNS = ('start', 'start_time', 'starttime', 'from')
+_END_COLUMNS = ('end', 'end_time', 'endtime', 'stop', 'to')
+_LABEL_COLUMNS = ('event', 'label', 'type', 'name')
+
+# Where loaded event sets are mirrored so every worker process can find
+# them; only ever used if private to this user, see ``storage``
+EVENTS_DIR = os.environ.get('EVENTS_CACHE_DIR', os.path.join(APP_CACHE_DIR, 'events'))
+
+# How many event sets each worker keeps in memory
+MAX_CACHED_EVENTS = int(os.environ.get('MAX_CACHED_EVENTS', 32))
+
+_EVENTS_KEY = re.compile(r'^[0-9a-f]{32}$')
+
+
+class EventIndex:
+    """
+    Sorted interval index over a set of labelled events.
+
+    Args:
+        starts (np.ndarray): int64 nanosecond start of each event
+        ends (np.ndarray): int64 nanosecond end of each event (exclusive)
+        labels (list): Label of each event
+
+    Attributes:
+        key (str): Identifies this set of events in caches
+        labels (list): ``NO_EVENT`` followed by the distinct event labels;
+            codes returned by ``tag`` index into this list
+        boundaries (np.ndarray): Sorted start times of the elementary segments
+        segment_codes (np.ndarray): Label code active in each segment
+        row_codes (weakref.WeakKeyDictionary): Dataset or pyramid level ->
+            ``(time, codes)`` of its rows, see ``event_codes``
+    """
+
+    def __init__(self, starts, ends, labels):
+        self.key = uuid.uuid4().hex
+        self.row_codes = weakref.WeakKeyDictionary()
+        starts = np.asarray(starts, dtype='int64')
+        ends = np.asarray(ends, dtype='int64')
+        self.labels = [NO_EVENT] + sorted(set(labels))
+        lookup = {label: code for code, label in enumerate(self.labels)}
+        codes = np.array([lookup[label] for label in labels], dtype='int64')
+        self.n_events = len(starts)
+
+        order = np.argsort(starts, kind='mergesort')
+        starts, ends, codes = starts[order], ends[order], codes[order]
+        self.boundaries = np.unique(np.concatenate([starts, ends]))
+
+        # Sweep the boundaries once; the heap top is the latest-started event,
+        # and events that have ended are dropped when they surface
+        self.segment_codes = np.zeros(len(self.boundaries), dtype='int64')
+        active = []
+        next_event = 0
+        for k, boundary in enumerate(self.boundaries):
+            while next_event < len(starts) and starts[next_event] <= boundary:
+                heapq.heappush(active, (-starts[next_event], -next_event, ends[next_event], codes[next_event]))
+                next_event += 1
+            while active and active[0][2] <= boundary:
+                heapq.heappop(active)
+            if active:
+                self.segment_codes[k] = active[0][3]
+
+    def __getstate__(self):
+        # Row codes are per process and rebuilt on demand
+        state = dict(self.__dict__)
+        state.pop('row_codes', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.row_codes = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build an index from a DataFrame of events.
+
+        Accepts start/end columns named e.g. 'start'/'end' or
+        'start_time'/'end_time', and a label column named 'event', 'label'
+        or 'type'.
+
+        Raises:
+            ValueError: If a column is missing or an event ends before it starts
+        """
+        df = df.rename(columns={c: c.strip().lower() for c in df.columns})
+        start_col = _find_column(df, _START_COLUMNS, 'start')
+        end_col = _find_column(df, _END_COLUMNS, 'end')
+        label_col = _find_column(df, _LABEL_COLUMNS, 'event label')
+
+        starts = _to_ns(df[start_col])
+        ends = _to_ns(df[end_col])
+        if np.any(ends < starts):
+            raise ValueError("events must not end before they start")
+        labels = df[label_col].fillna('unlabelled').astype(str).str.strip().tolist()
+        return cls(starts, ends, labels)
+
+    def tag(self, time_ns):
+        """
+        Event code of each timestamp (0 for no event).
+
+        Args:
+            time_ns (np.ndarray): int64 nanosecond timestamps, in any order
+
+        Returns:
+            np.ndarray: int64 codes indexing ``labels``
+        """
+        segment = np.searchsorted(self.boundaries, time_ns, side='right') - 1
+        inside = segment >= 0
+        codes = np.zeros(len(time_ns), dtype='int64')
+        codes[inside] = self.segment_codes[segment[inside]]
+        return codes
+
+
+class EventStore(MirroredStore):
+    """
+    LRU of event sets in this process, mirrored to pickles on disk.
+
+    Event sets are small, so the on-disk copies aren't size-capped.
+
+    Args:
+        directory (str): Folder for the on-disk copies
+        max_entries (int): Event sets to keep in memory per process
+    """
+
+    key_pattern = _EVENTS_KEY
+    kind = 'events'
+
+    def __init__(self, directory=EVENTS_DIR, max_entries=MAX_CACHED_EVENTS):
+        super().__init__(directory, max_entries)
+
+    def key(self, events):
+        return events.key
+
+
+def _find_column(df, candidates, description):
+    for col in candidates:
+        if col in df.columns:
+            return col
+    raise ValueError(f"no {description} column found (expected one of {list(candidates)})")
+
+
+def _to_ns(values):
+    times = pd.to_datetime(values)
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def parse_events(contents):
+    """Parse an uploaded events CSV into an ``EventIndex``."""
+    content_type, content_string = contents.split(',')
+    decoded = base64.b64decode(content_string)
+    return EventIndex.from_frame(pd.read_csv(io.StringIO(decoded.decode('utf-8'))))
+
+
+def event_codes(dataset, events):
+    """
+    Event code per row of a dataset (or pyramid level).
+
+    Codes are cached on the event set rather than on the shared dataset, so
+    they are dropped with the event set when the store forgets it, and with
+    the level when it is replaced. Appending rows gives the level a new time
+    array, which invalidates its codes.
+    """
+    cached = events.row_codes.get(dataset)
+    if cached is None or cached[0] is not dataset.time:
+        cached = (dataset.time, events.tag(dataset.time))
+        events.row_codes[dataset] = cached
+    return cached[1]
+
+
+# Shared store used by the dashboard callbacks
+event_sets = EventStore()
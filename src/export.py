@@ -0,0 +1,132 @@
+"""
+Streaming export of the rows shown in the dashboard.
+
+An export is written chunk by chunk straight from the dataset's time-sorted
+columns: the date range is a contiguous row slice found through the time
+index, and each chunk only materializes its own rows. The download starts
+with the first chunk and memory stays bounded by the chunk size, however
+many rows are exported.
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+# Rows converted and sent per chunk of an export
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 100_000))
+
+# Export format -> MIME type
+EXPORT_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def export_formats():
+    """Formats that can be exported; Parquet needs pyarrow."""
+    return ['csv'] + (['parquet'] if pq is not None else [])
+
+
+def export_chunks(dataset, rows, columns, keep=None, extra=None, categories=None,
+                  chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Consecutive DataFrames holding the exported rows.
+
+    Args:
+        dataset (Dataset): Time-sorted dataset
+        rows (slice): Contiguous row range, e.g. from ``time_slice``
+        columns (list): Stored or derived columns to write after ``time``
+        keep (np.ndarray, optional): Boolean mask over ``rows`` of the rows
+            to write
+        extra (dict, optional): Column name -> array over all rows, e.g.
+            outlier flags
+        categories (dict, optional): Column name -> ``(codes, labels)``
+            written as labels, e.g. clinical events
+        chunk_rows (int): Rows per chunk before filtering
+
+    Yields:
+        pd.DataFrame: At least one frame, empty when no row is selected
+    """
+    arrays = {name: dataset.column(name) for name in columns}
+    arrays.update(extra or {})
+    categories = categories or {}
+
+    for lo in range(rows.start, max(rows.stop, rows.start + 1), chunk_rows):
+        hi = min(lo + chunk_rows, rows.stop)
+        index = slice(lo, hi)
+        if keep is not None:
+            index = np.flatnonzero(keep[lo - rows.start:hi - rows.start]) + lo
+        data = {'time': dataset.time[index].view('datetime64[ns]')}
+        data.update({name: values[index] for name, values in arrays.items()})
+        for name, (codes, labels) in categories.items():
+            data[name] = pd.Categorical.from_codes(codes[index], labels)
+        yield pd.DataFrame(data)
+
+
+def csv_stream(frames):
+    """Encode frames as one CSV document, yielding bytes per frame."""
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header, date_format='%Y-%m-%d %H:%M:%S').encode('utf-8')
+        header = False
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_stream(frames):
+    """
+    Encode frames as one Parquet file, yielding bytes per row group.
+
+    Parquet is written front to back with the footer last, so each row
+    group can be sent as soon as it is encoded.
+    """
+    if pq is None:
+        raise ImportError("Parquet export needs pyarrow")
+    sink = _ChunkSink()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# Export format -> function encoding a sequence of frames
+EXPORT_WRITERS = {
+    'csv': csv_stream,
+    'parquet': parquet_stream
+}
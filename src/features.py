@@ -0,0 +1,189 @@
+"""
+Derived signal columns computed on demand from a dataset.
+
+Derived columns are addressed by name as ``<column>__<kind>``, e.g.
+``heart_rate_max__diff`` or ``heart_rate_max__rollmedian_5min``.
+``Dataset.column`` resolves such names lazily and caches the result on the
+dataset, so each series is computed at most once per dataset (and per pyramid
+level) no matter how often it is plotted.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+NS_PER_MINUTE = 60 * 10**9
+
+# Time-based windows offered for the rolling statistics
+ROLLING_WINDOWS = tuple(os.environ.get('ROLLING_WINDOWS', '1min,5min,15min,1h').split(','))
+
+ROLLING_STATS = ('mean', 'median', 'std')
+
+# Signals whose stat columns get rolling variants in the column choices
+ROLLING_SIGNALS = ('heart_rate', 'heart_rate_variability')
+
+SEPARATOR = '__'
+
+# Per-timestamp statistics of the converted signals, as column name suffixes
+STATISTICS = ('min', 'median', 'max')
+
+
+def first_difference(time_ns, values):
+    """Change from the previous sample, like ``Series.diff()``."""
+    out = np.full(len(values), np.nan)
+    np.subtract(values[1:], values[:-1], out=out[1:])
+    return out
+
+
+def rate_per_minute(time_ns, values):
+    """Change from the previous sample divided by the minutes between them."""
+    out = first_difference(time_ns, values)
+    minutes = np.diff(time_ns).astype('float64') / NS_PER_MINUTE
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[1:] = np.where(minutes > 0, out[1:] / minutes, np.nan)
+    return out
+
+
+def percent_change(time_ns, values):
+    """Change from the previous sample in percent of the previous value."""
+    out = first_difference(time_ns, values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[1:] = np.where(values[:-1] != 0, out[1:] / values[:-1] * 100.0, np.nan)
+    return out
+
+
+def rolling_statistic(time_ns, values, stat, window):
+    """
+    Statistic over a trailing time window ending at each sample.
+
+    pandas updates time-based windows incrementally as samples enter and
+    leave: mean and std keep running sums, and median keeps a sorted skiplist
+    of the window, so each step costs O(log w) instead of re-sorting it.
+
+    Args:
+        time_ns (np.ndarray): Sorted int64 nanosecond timestamps
+        values (np.ndarray): float64 samples
+        stat (str): One of ``ROLLING_STATS``
+        window (str): pandas offset such as '5min'
+
+    Returns:
+        np.ndarray: float64 statistic per sample
+    """
+    series = pd.Series(values, index=pd.DatetimeIndex(time_ns.view('datetime64[ns]')))
+    return getattr(series.rolling(window, min_periods=1), stat)().to_numpy()
+
+
+def rolling_kind(stat, window):
+    """Kind part of a rolling column name, e.g. 'rollmedian_5min'."""
+    return f"roll{stat}_{window}"
+
+
+def _parse_rolling(kind):
+    if not kind or not kind.startswith('roll') or '_' not in kind:
+        return None
+    stat, window = kind[len('roll'):].split('_', 1)
+    if stat not in ROLLING_STATS:
+        return None
+    return stat, window
+
+
+# kind -> (label suffix, function of (time_ns, values))
+DERIVED = {
+    'diff': ('Δ', first_difference),
+    'rate': ('Δ per min', rate_per_minute),
+    'pct': ('% change', percent_change),
+}
+
+
+def derived_name(column, kind):
+    """Name under which a derived column of ``column`` is resolved."""
+    return f"{column}{SEPARATOR}{kind}"
+
+
+def split_name(name):
+    """Split a column name into ``(base column, kind)``; kind is None for plain columns."""
+    base, sep, kind = name.rpartition(SEPARATOR)
+    if not sep:
+        return name, None
+    return base, kind
+
+
+def transform_label(kind):
+    """Label of a derived kind, e.g. 'Δ per min' or 'rolling median (5min)'."""
+    if kind in DERIVED:
+        return DERIVED[kind][0]
+    if _parse_rolling(kind):
+        stat, window = _parse_rolling(kind)
+        return f"rolling {stat} ({window})"
+    return kind
+
+
+def column_label(name):
+    """Human readable label, e.g. 'Heart Rate Max Δ per min'."""
+    base, kind = split_name(name)
+    label = base.replace('_', ' ').title()
+    if kind is not None:
+        label = f"{label} {transform_label(kind)}"
+    return label
+
+
+def split_statistic(column):
+    """Split a stored column into ``(signal, statistic)``; the statistic is '' without a known suffix."""
+    signal, sep, stat = column.rpartition('_')
+    if sep and stat in STATISTICS:
+        return signal, stat
+    return column, ''
+
+
+def transforms(signal):
+    """Derived kinds offered for a signal; '' stands for the plain values."""
+    kinds = [''] + list(DERIVED)
+    if signal in ROLLING_SIGNALS:
+        kinds += [rolling_kind(stat, window) for window in ROLLING_WINDOWS for stat in ROLLING_STATS]
+    return kinds
+
+
+def signal_choices(dataset):
+    """
+    Signals of a dataset, with the statistics and transforms of each.
+
+    Returns:
+        dict: Signal -> ``{'stats': [...], 'transforms': [...]}``, in column order
+    """
+    choices = {}
+    for column in dataset.numeric_columns:
+        signal, stat = split_statistic(column)
+        choice = choices.setdefault(signal, {'stats': [], 'transforms': transforms(signal)})
+        choice['stats'].append(stat)
+    return choices
+
+
+def compute_derived(dataset, name):
+    """
+    Compute a derived column of a dataset.
+
+    Args:
+        dataset (Dataset): Time-sorted dataset
+        name (str): Derived column name, see ``derived_name``
+
+    Returns:
+        np.ndarray: float64 values aligned with ``dataset.time``
+
+    Raises:
+        KeyError: If the name doesn't describe a known derived column
+    """
+    base, kind = split_name(name)
+    rolling = _parse_rolling(kind)
+    if kind not in DERIVED and not rolling:
+        raise KeyError(name)
+    values = dataset.column(base)
+    if values.dtype.kind != 'f':
+        raise KeyError(f"{base} is not numeric")
+    if rolling:
+        stat, window = rolling
+        try:
+            return rolling_statistic(dataset.time, values, stat, window)
+        except ValueError:
+            raise KeyError(f"invalid rolling window: {window}") from None
+    return DERIVED[kind][1](dataset.time, values)
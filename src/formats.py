@@ -0,0 +1,304 @@
+"""
+Registry of the CSV layouts the dashboard can ingest.
+
+Each layout is described by an ``InputFormat``: the header columns that
+identify it, how its columns map to the dashboard's names, their dtypes, how
+its time column is parsed and whether rows are aggregated per timestamp.
+A format is picked from the header line alone and compiled into a
+``ParsePlan`` for that header, which reads the file with fixed dtypes (no
+type inference pass) and converts it to the old format in one go.
+
+Raw rows are aggregated per timestamp through contiguous segments when they
+are in time order (device exports nearly always are), falling back to a hash
+``groupby`` for shuffled files.
+
+Supporting another export means registering one more descriptor, e.g.::
+
+    register(InputFormat(
+        'example',
+        signature=('recorded_at', 'pulse'),
+        time_columns=('recorded_at',),
+        time_format='%d.%m.%Y %H:%M:%S',
+        column_map={'pulse': 'heart_rate'},
+        aggregate=('min', 'median', 'max')
+    ))
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from segments import segment_starts, segment_min, segment_max, segment_median, segment_mean, segment_first
+
+# Statistics with a contiguous-segment reduction
+SEGMENT_STATS = {
+    'min': segment_min,
+    'max': segment_max,
+    'median': segment_median,
+    'mean': segment_mean,
+    'first': segment_first,
+}
+
+# Largest share of out-of-order rows that are still sorted and segmented;
+# less ordered files are aggregated with groupby
+NEARLY_SORTED_SHARE = float(os.environ.get('NEARLY_SORTED_SHARE', 0.05))
+
+
+class InputFormat:
+    """
+    Descriptor of one CSV layout.
+
+    Args:
+        name (str): Registry key, e.g. 'new'
+        signature (tuple): Lowercase header columns that identify the format;
+            detection scores how many of them a header has
+        time_columns (tuple): Candidate time columns, most preferred first
+        column_map (dict, optional): Raw column base -> dashboard name, e.g.
+            'heartratevalue' -> 'heart_rate'
+        dtypes (dict, optional): Lowercase column -> dtype used when reading
+        time_format (str, optional): strftime format of the time column;
+            None lets pandas infer it
+        time_unit (str, optional): Unit of numeric epoch times, e.g. 'ms'
+        aggregate (tuple, optional): Statistics computed per timestamp for
+            each numeric column (raw formats); None keeps rows as they are
+    """
+
+    def __init__(self, name, signature, time_columns=('time',), column_map=None, dtypes=None,
+                 time_format=None, time_unit=None, aggregate=None):
+        self.name = name
+        self.signature = tuple(signature)
+        self.time_columns = tuple(time_columns)
+        self.column_map = dict(column_map or {})
+        self.dtypes = dict(dtypes or {})
+        self.time_format = time_format
+        self.time_unit = time_unit
+        self.aggregate = tuple(aggregate) if aggregate else None
+
+    def score(self, columns):
+        """Number of signature columns present in a lowercase header."""
+        return sum(1 for col in self.signature if col in columns)
+
+
+class ParsePlan:
+    """
+    A format compiled for one concrete header.
+
+    Args:
+        input_format (InputFormat): Format of the file
+        header (list): Column names as they appear in the file
+
+    Attributes:
+        time_column (str): Lowercase raw time column
+        dtypes (dict): Raw column name -> dtype, ready for ``pd.read_csv``
+    """
+
+    def __init__(self, input_format, header):
+        self.format = input_format
+        self.header = list(header)
+        lower = [c.lower() for c in self.header]
+        self.time_column = next((c for c in input_format.time_columns if c in lower), None)
+        self.dtypes = {
+            raw: input_format.dtypes[col]
+            for raw, col in zip(self.header, lower)
+            if col in input_format.dtypes
+        }
+
+    @property
+    def aggregates(self):
+        """Whether rows are combined per timestamp during conversion."""
+        return self.format.aggregate is not None
+
+    def read_csv(self, source, **kwargs):
+        """Read a CSV with this plan's dtypes; ``kwargs`` go to ``pd.read_csv``."""
+        return pd.read_csv(source, dtype=self.dtypes or None, **kwargs)
+
+    def parse_time(self, values):
+        """Parse raw time values into datetimes."""
+        if self.format.time_unit:
+            return pd.to_datetime(values, unit=self.format.time_unit)
+        return pd.to_datetime(values, format=self.format.time_format)
+
+    def convert(self, df):
+        """
+        Convert raw rows to the old format.
+
+        Args:
+            df (pd.DataFrame): Rows read with this plan
+
+        Returns:
+            pd.DataFrame: A 'time' column followed by the (aggregated)
+            columns under their dashboard names
+        """
+        # Normalize columns to lowercase
+        df.columns = [c.lower() for c in df.columns]
+        # ——— 0) guard against any accidental duplicate columns ———
+        df = df.loc[:, ~df.columns.duplicated()]
+
+        # ——— 1) unify the time column ———
+        if self.time_column is None:
+            raise KeyError(f"no time column found (expected one of {list(self.format.time_columns)})")
+        other_times = [c for c in self.format.time_columns if c in df.columns and c != self.time_column]
+        df = df.drop(columns=other_times).rename(columns={self.time_column: 'time'})
+        df['time'] = self.parse_time(df['time'])
+
+        if not self.aggregates:
+            return df.rename(columns=self.format.column_map)
+
+        # ——— 2) pick the numeric columns (exclude 'time') and the others ———
+        numeric_cols = df.select_dtypes(include='number').columns.difference(['time'])
+        others = [c for c in df.columns if c not in numeric_cols and c != 'time']
+
+        # ——— 3) one row per timestamp, one column per statistic ———
+        out = self._aggregate_sorted(df, numeric_cols, others)
+        if out is None:
+            out = self._aggregate_groupby(df, numeric_cols, others)
+        return out
+
+    def _aggregate_sorted(self, df, numeric_cols, others):
+        """
+        Aggregate through the runs of equal timestamps in a single pass.
+
+        Rows with a few out-of-order timestamps are stably sorted first, so
+        the first values stay those of the file order.
+
+        Returns:
+            pd.DataFrame: Same result as ``_aggregate_groupby``, or None
+            when the rows are too far from time order or a column or
+            statistic has no segment reduction
+        """
+        if any(stat not in SEGMENT_STATS for stat in self.format.aggregate):
+            return None
+        # Nullable numbers and tz-aware times keep their semantics in groupby
+        if any(not isinstance(df[col].dtype, np.dtype) for col in ['time', *numeric_cols]):
+            return None
+
+        time = df['time'].to_numpy()
+        rows = np.flatnonzero(~np.isnat(time))
+        keys = time[rows].view('int64')
+        descents = np.count_nonzero(keys[1:] < keys[:-1])
+        if descents > NEARLY_SORTED_SHARE * len(keys):
+            print(f"{descents} rows out of time order, aggregating with groupby")
+            return None
+        if descents:
+            order = np.argsort(keys, kind='stable')
+            rows, keys = rows[order], keys[order]
+        # Rows already in place are used without a copy
+        in_place = not descents and len(rows) == len(time)
+
+        def column(values):
+            return values if in_place else values[rows]
+
+        starts = segment_starts(keys)
+        out = {'time': time[rows[starts]]}
+        for col in numeric_cols:
+            values = column(df[col].to_numpy())
+            for stat in self.format.aggregate:
+                out[f"{self.format.column_map.get(col, col)}_{stat}"] = SEGMENT_STATS[stat](values, starts)
+        out = pd.DataFrame(out)
+
+        # First non-null row of each segment, taken by position to keep any dtype
+        for col in others:
+            valid = column(df[col].notna().to_numpy())
+            positions = np.minimum.reduceat(np.where(valid, column(np.arange(len(df))), len(df)), starts)
+            found = positions < len(df)
+            firsts = df[col].take(np.where(found, positions, 0)).reset_index(drop=True)
+            out[col] = firsts if found.all() else firsts.where(found, None)
+        return out
+
+    def _aggregate_groupby(self, df, numeric_cols, others):
+        """Aggregate per timestamp with hash groupbys, for rows in any order."""
+        agg = df.groupby('time')[numeric_cols].agg(list(self.format.aggregate))
+
+        # Flatten the MultiIndex and rename the bases, e.g. 'heart_rate_min'
+        agg.columns = [f"{self.format.column_map.get(col, col)}_{stat}" for col, stat in agg.columns]
+        out = agg.reset_index()
+
+        # Take *all* the other (non-numeric, non-time) cols and join them back
+        if others:
+            extras = df.groupby('time')[others].first()
+            out = out.join(extras, on='time')
+
+        return out
+
+
+# Registered formats, in registration order
+FORMATS = {}
+
+# Format assumed when a header matches nothing at all
+DEFAULT_FORMAT = 'old'
+
+
+def register(input_format):
+    """Add a format to the registry, replacing one with the same name."""
+    FORMATS[input_format.name] = input_format
+    return input_format
+
+
+def detect_format(columns):
+    """
+    Pick the registered format of a header.
+
+    The format with the most signature columns wins, earlier registrations
+    on ties. Without any signature match ``DEFAULT_FORMAT`` is assumed.
+
+    Args:
+        columns (list): Header column names, any case
+
+    Returns:
+        InputFormat: The detected format
+    """
+    columns = [c.lower() for c in columns]
+    best, best_score = None, 0
+    for input_format in FORMATS.values():
+        score = input_format.score(columns)
+        print(f"{input_format.name} format indicators found: {score}")
+        if score > best_score:
+            best, best_score = input_format, score
+    if best is not None:
+        return best
+
+    default = FORMATS[DEFAULT_FORMAT]
+    if not any(col in columns for col in default.time_columns):
+        print(f"Warning: Could not determine data format, defaulting to {DEFAULT_FORMAT} format")
+    return default
+
+
+def compile_plan(header, input_format=None):
+    """Parse plan for a header, detecting the format unless one is given."""
+    return ParsePlan(input_format or detect_format(header), header)
+
+
+def read_header(source):
+    """Column names of a CSV file or buffer, reading only its first line."""
+    return list(pd.read_csv(source, nrows=0).columns)
+
+
+# Pre-aggregated exports: one row per timestamp with min/median/max columns
+register(InputFormat(
+    'old',
+    signature=('heart_rate_max', 'respiration_rate_max',
+               'heart_rate_variability_max', 'relative_stroke_volume_max'),
+    time_columns=('time',)
+))
+
+# Raw sensor exports: several rows per timestamp, aggregated on upload
+register(InputFormat(
+    'new',
+    signature=('biosignaltime', 'heartratevalue', 'respirationratevalue',
+               'heartratevariabilityvalue', 'relativestrokevolumevalue'),
+    time_columns=('time', 'biosignaltime'),
+    column_map={
+        'heartratevalue': 'heart_rate',
+        'respirationratevalue': 'respiration_rate',
+        'heartratevariabilityvalue': 'heart_rate_variability',
+        'relativestrokevolumevalue': 'relative_stroke_volume',
+    },
+    dtypes={
+        'heartratevalue': 'float64',
+        'respirationratevalue': 'float64',
+        'heartratevariabilityvalue': 'float64',
+        'relativestrokevolumevalue': 'float64',
+    },
+    aggregate=('min', 'median', 'max')
+))
@@ -0,0 +1,165 @@
+"""
+Background jobs for slow upload processing.
+
+Uploads are parsed and converted in a local process pool, so the web workers
+stay free to answer other sessions' callbacks while a large file ingests.
+Job state lives in small JSON files next to the spooled upload, so any web
+worker can report the progress of a job or cancel it, whichever worker
+started it. A job's files are removed once the browser has polled its final
+state; jobs nobody polls to the end (closed tabs, crashed workers) are
+removed once they haven't changed for ``JOB_MAX_AGE_SECONDS``.
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from storage import APP_CACHE_DIR, private_directory
+
+# Where job state and spooled uploads are kept; only ever used if private to
+# this user, see ``storage``
+JOB_DIR = os.environ.get('UPLOAD_JOB_DIR', os.path.join(APP_CACHE_DIR, 'jobs'))
+
+# Job files untouched for this long are removed by the next upload
+JOB_MAX_AGE_SECONDS = float(os.environ.get('JOB_MAX_AGE_SECONDS', 24 * 3600))
+
+# Suffixes of the files a job can leave behind
+_JOB_FILES = ('.json', '.cancel', '.upload')
+
+# Upload conversions running at the same time in each web worker
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 2))
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+class JobStore:
+    """
+    Disk-backed state of background jobs.
+
+    Each job is a JSON file written atomically by the process running it.
+    Cancelling only creates a flag file, so it never races with progress
+    updates; the job checks the flag between steps.
+
+    Args:
+        directory (str): Folder for job files and spooled uploads
+        max_age (float): Seconds after which untouched job files are removed
+    """
+
+    def __init__(self, directory=JOB_DIR, max_age=JOB_MAX_AGE_SECONDS):
+        self.directory = directory
+        self.max_age = max_age
+
+    def _path(self, job_id, suffix):
+        if not _JOB_ID.match(job_id or ''):
+            raise KeyError(f"invalid job id: {job_id!r}")
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def _write(self, job_id, state):
+        path = self._path(job_id, '.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, path)
+
+    def create(self, **fields):
+        """Register a queued job, returning its id, and remove stale jobs."""
+        private_directory(self.directory)
+        self.prune()
+        job_id = uuid.uuid4().hex
+        self._write(job_id, dict(fields, status='queued', created=time.time()))
+        return job_id
+
+    def get(self, job_id):
+        """
+        Current state of a job.
+
+        Raises:
+            KeyError: If the job is unknown
+        """
+        try:
+            with open(self._path(job_id, '.json')) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            raise KeyError(f"unknown job: {job_id}") from None
+
+    def update(self, job_id, **fields):
+        """Merge fields into the state of a job."""
+        state = self.get(job_id)
+        state.update(fields)
+        self._write(job_id, state)
+        return state
+
+    def cancel(self, job_id):
+        """Ask a job to stop at its next check."""
+        with open(self._path(job_id, '.cancel'), 'w'):
+            pass
+
+    def check(self, job_id):
+        """
+        Raises:
+            JobCancelled: If the job has been cancelled
+        """
+        if os.path.exists(self._path(job_id, '.cancel')):
+            raise JobCancelled(job_id)
+
+    def upload_path(self, job_id):
+        """File holding the uploaded bytes of a job."""
+        return self._path(job_id, '.upload')
+
+    def remove(self, job_id):
+        """Delete every file of a job; unknown jobs are ignored."""
+        for suffix in _JOB_FILES:
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def prune(self, now=None):
+        """
+        Delete the files of jobs that haven't changed for ``max_age``.
+
+        Running jobs rewrite their state after every chunk, so only
+        finished or abandoned jobs get this old.
+
+        Returns:
+            int: Number of files removed
+        """
+        cutoff = (now or time.time()) - self.max_age
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+_executor = None
+
+
+def submit(fn, *args):
+    """
+    Run a function in the upload process pool, starting the pool on first use.
+
+    Pool processes are spawned rather than forked, so they never inherit
+    locks held by the web worker's threads.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(UPLOAD_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _executor.submit(fn, *args)
+
+
+# Shared store used by the dashboard callbacks and the pool processes
+jobs = JobStore()
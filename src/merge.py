@@ -0,0 +1,167 @@
+"""
+Time-ordered merge of CSV files that are each sorted by time.
+
+Device exports that overlap in time can't simply be stacked: the result
+would be unsorted and repeat the overlapping rows. Instead the files are read
+in chunks side by side and merged k-way on the time column. Every step emits
+the rows up to the smallest "last time" among the chunks in hand. No later
+chunk can hold an earlier row, so the batch can be sorted and written at once.
+Memory stays at one chunk per file, however long the files are.
+
+Exact duplicates share their timestamp, so they can only be found among rows
+of the same time. Rows of the last emitted timestamp are remembered by hash
+(a bounded window) to catch copies that arrive in a later batch.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from formats import compile_plan, read_header
+
+# Rows read per file and chunk while merging
+MERGE_CHUNK_ROWS = int(os.environ.get('MERGE_CHUNK_ROWS', 200_000))
+
+# Most row hashes kept to drop duplicates that straddle two batches
+DEDUP_WINDOW_ROWS = int(os.environ.get('DEDUP_WINDOW_ROWS', 100_000))
+
+
+class SortedReader:
+    """
+    Chunked reader of one time-sorted CSV file.
+
+    Args:
+        path (str): CSV file
+        columns (list): Column order of the merged output
+        time_column (str): Column the file is sorted by, as in the header
+        plan (ParsePlan): Plan supplying dtypes and time parsing
+        chunk_rows (int): Rows per chunk
+
+    Raises:
+        ValueError: (while reading) If the file is not sorted by time
+    """
+
+    def __init__(self, path, columns, time_column, plan, chunk_rows=MERGE_CHUNK_ROWS):
+        self.path = path
+        self.columns = columns
+        self.time_column = time_column
+        self.plan = plan
+        self._chunks = plan.read_csv(path, chunksize=chunk_rows)
+        self._last = None
+
+    def next_chunk(self):
+        """Next non-empty chunk with a parsed time column, or None at the end."""
+        for chunk in self._chunks:
+            if chunk.empty:
+                continue
+            chunk = chunk.reindex(columns=self.columns)
+            chunk[self.time_column] = self.plan.parse_time(chunk[self.time_column])
+            times = chunk[self.time_column].to_numpy()
+            previous = self._last if self._last is not None else times[0]
+            if times[0] < previous or (np.diff(times) < np.timedelta64(0)).any():
+                raise ValueError(f"{os.path.basename(self.path)} is not sorted by {self.time_column}")
+            self._last = times[-1]
+            return chunk
+        return None
+
+
+def merge_sorted(paths, chunk_rows=MERGE_CHUNK_ROWS, window_rows=DEDUP_WINDOW_ROWS, stats=None):
+    """
+    Merge time-sorted CSV files into one time-sorted stream without duplicates.
+
+    Args:
+        paths (list): CSV files with the same columns, each sorted by time
+        chunk_rows (int): Rows read per file and chunk
+        window_rows (int): Most hashes kept of rows at the last timestamp
+        stats (dict, optional): Filled with 'rows', 'duplicates' and the
+            detected 'time_column' as the merge goes
+
+    Yields:
+        pd.DataFrame: Consecutive batches of merged rows
+
+    Raises:
+        ValueError: If the files' columns differ, there is no time column, or
+            a file is not sorted
+    """
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, duplicates=0)
+    headers = [read_header(path) for path in paths]
+    columns = headers[0]
+    for path, header in zip(paths, headers):
+        if set(header) != set(columns):
+            missing = [c for c in columns if c not in header]
+            extra = [c for c in header if c not in columns]
+            raise ValueError(
+                f"Column mismatch in {os.path.basename(path)}. Missing: {missing}; Extra: {extra}"
+            )
+
+    plan = compile_plan(columns)
+    if plan.time_column is None:
+        raise ValueError(f"No time column found for {plan.format.name} format files")
+    time_column = next(c for c in columns if c.lower() == plan.time_column)
+    stats['time_column'] = time_column
+
+    readers = [SortedReader(path, columns, time_column, plan, chunk_rows) for path in paths]
+    current = [reader.next_chunk() for reader in readers]
+    window = np.zeros(0, dtype='uint64')
+    window_time = None
+
+    while any(chunk is not None for chunk in current):
+        # Rows up to the earliest chunk end are final: no file can go below it
+        watermark = min(chunk[time_column].iloc[-1] for chunk in current if chunk is not None)
+        parts = []
+        for i, chunk in enumerate(current):
+            if chunk is None:
+                continue
+            cut = chunk[time_column].searchsorted(watermark, side='right')
+            parts.append(chunk.iloc[:cut])
+            current[i] = chunk.iloc[cut:] if cut < len(chunk) else readers[i].next_chunk()
+
+        # Files are listed in order, so a stable sort keeps ties in file order
+        batch = pd.concat(parts, ignore_index=True)
+        batch = batch.sort_values(time_column, kind='stable', ignore_index=True)
+
+        hashes = pd.util.hash_pandas_object(batch, index=False).to_numpy()
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        if window_time is not None:
+            # Only rows of the previous batch's last timestamp can repeat here
+            same_time = (batch[time_column] == window_time).to_numpy()
+            keep &= ~(same_time & np.isin(hashes, window))
+        stats['duplicates'] += int((~keep).sum())
+        batch = batch[keep].reset_index(drop=True)
+        hashes = hashes[keep]
+
+        if len(batch):
+            last_time = batch[time_column].iloc[-1]
+            at_last = hashes[(batch[time_column] == last_time).to_numpy()]
+            if last_time == window_time:
+                at_last = np.concatenate([window, at_last])
+            window, window_time = at_last[-window_rows:], last_time
+            stats['rows'] += len(batch)
+            yield batch
+
+
+def merge_to_csv(paths, out_path, progress=None, **kwargs):
+    """
+    Merge time-sorted CSV files into one CSV file.
+
+    Args:
+        paths (list): CSV files to merge
+        out_path (str): CSV file to write
+        progress (callable, optional): Called with the rows written so far
+            after every batch
+        **kwargs: Passed to ``merge_sorted``
+
+    Returns:
+        dict: 'rows', 'duplicates' and 'time_column' of the merge
+    """
+    stats = {}
+    header = True
+    with open(out_path, 'w', newline='') as fh:
+        for batch in merge_sorted(paths, stats=stats, **kwargs):
+            batch.to_csv(fh, index=False, header=header)
+            header = False
+            if progress is not None:
+                progress(stats['rows'])
+    return stats
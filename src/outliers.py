@@ -0,0 +1,71 @@
+"""
+Artifact and outlier detection over the converted columns.
+
+Each sample gets a robust z-score per column, measured against the median and
+the median absolute deviation (MAD) of its own calendar day. Days are
+contiguous in the time-sorted dataset, so the per-day medians are segment
+reductions over the day offsets rather than a groupby. A sample is flagged
+when any column's robust z-score exceeds the threshold.
+"""
+
+import os
+
+import numpy as np
+import scipy.stats as stats
+
+from segments import segment_median
+
+# Robust z-score above which a sample counts as an outlier (Iglewicz & Hoaglin)
+OUTLIER_Z = float(os.environ.get('OUTLIER_Z', 3.5))
+
+# Scale factor making the MAD consistent with the standard deviation of a normal
+MAD_SCALE = 1.0 / stats.norm.ppf(0.75)
+
+
+def robust_zscores(dataset, column):
+    """
+    Robust z-scores of a column against per-day median and MAD.
+
+    Days whose MAD is zero (e.g. a flat signal) fall back to the MAD of the
+    whole column, so a single deviating sample on a flat day still stands out.
+
+    Returns:
+        np.ndarray: float64 z-scores, NaN where the value is missing
+    """
+    values = dataset.column(column)
+    starts = dataset.day_offsets[:-1]
+    lengths = np.diff(dataset.day_offsets)
+
+    medians = np.repeat(segment_median(values, starts), lengths)
+    deviations = np.abs(values - medians)
+    mads = np.repeat(segment_median(deviations, starts), lengths) * MAD_SCALE
+
+    overall = stats.median_abs_deviation(values, scale='normal', nan_policy='omit')
+    mads = np.where(mads > 0, mads, overall if overall > 0 else np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return deviations / mads
+
+
+def outlier_mask(dataset, columns=None, threshold=OUTLIER_Z):
+    """
+    Boolean mask of samples that are outliers in any of the given columns.
+
+    The mask is computed once per dataset (and pyramid level) and cached.
+
+    Args:
+        dataset (Dataset): Time-sorted dataset
+        columns (list, optional): Columns to check; defaults to every
+            stored numeric column
+        threshold (float): Robust z-score limit
+
+    Returns:
+        np.ndarray: bool per row
+    """
+    columns = dataset.numeric_columns if columns is None else columns
+    key = ('outliers', threshold) + tuple(columns)
+    if key not in dataset.cache:
+        mask = np.zeros(len(dataset), dtype=bool)
+        for column in columns:
+            mask |= robust_zscores(dataset, column) > threshold
+        dataset.cache[key] = mask
+    return dataset.cache[key]
@@ -0,0 +1,291 @@
+"""
+Date-partitioned columnar storage of concatenated recordings.
+
+Instead of one monolithic file, rows are written to a directory with one
+Parquet folder per day (and optionally per patient):
+
+    output/
+        _partitions.json
+        date=2024-01-01/part-00000.parquet
+        date=2024-01-02/patient_id=p7/part-00000.parquet
+
+``_partitions.json`` lists every partition with its row count and min/max
+time, so a reader interested in a date range opens only the partitions that
+overlap it, without listing or touching the others.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from formats import compile_plan
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Partitioned output is optional
+    pa = pq = None
+
+# Metadata file at the root of a partitioned directory
+PARTITION_METADATA = '_partitions.json'
+
+# Column whose values split partitions per patient
+PATIENT_COLUMN = 'patient_id'
+
+
+def _path_value(value):
+    """Partition folder value, safe to use as a path component."""
+    return re.sub(r'[^\w.-]', '_', str(value))
+
+
+class PartitionWriter:
+    """
+    Writes frames of rows into a date-partitioned Parquet directory.
+
+    Rows can arrive in any order, but time-sorted input (e.g. from
+    ``merge_sorted``) gives one file per partition: writers of days before the
+    current batch are closed as soon as it arrives, so open files stay bounded
+    by the patients of one day.
+
+    Args:
+        directory (str): Output folder, created if needed
+        time_column (str, optional): Time column; detected from the first
+            frame's header through the format registry if not given
+        by_patient (bool): Also partition by the patient column
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+
+    def __init__(self, directory, time_column=None, by_patient=False):
+        if pq is None:
+            raise ImportError("Partitioned output needs pyarrow")
+        self.directory = directory
+        self.time_column = time_column
+        self.by_patient = by_patient
+        self.patient_column = None
+        self.plan = None
+        self.schema = None
+        self.partitions = {}
+        self._writers = {}
+
+    def _prepare(self, frame):
+        if self.plan is None:
+            self.plan = compile_plan(frame.columns)
+            if self.time_column is None:
+                if self.plan.time_column is None:
+                    raise ValueError("No time column found to partition by")
+                self.time_column = next(c for c in frame.columns if c.lower() == self.plan.time_column)
+            if self.by_patient:
+                self.patient_column = next((c for c in frame.columns if c.lower() == PATIENT_COLUMN), None)
+                if self.patient_column is None:
+                    raise ValueError(f"No {PATIENT_COLUMN} column to partition by")
+        if not pd.api.types.is_datetime64_any_dtype(frame[self.time_column]):
+            frame = frame.assign(**{self.time_column: self.plan.parse_time(frame[self.time_column])})
+        return frame
+
+    def _infer_schema(self, frame):
+        """
+        Parquet schema of every file, from the plan's dtypes and the first frame.
+
+        Columns that are empty in the first frame can't be inferred from it;
+        unless the plan types them they are taken as text, which is what
+        sparse columns (notes, annotations) usually are.
+        """
+        inferred = pa.Schema.from_pandas(frame, preserve_index=False)
+        fields = []
+        for field in inferred:
+            dtype = self.plan.dtypes.get(field.name)
+            if dtype is not None:
+                field = field.with_type(pa.from_numpy_dtype(np.dtype(dtype)))
+            elif frame[field.name].isna().all():
+                field = field.with_type(pa.string())
+            fields.append(field)
+        return pa.schema(fields, metadata=inferred.metadata)
+
+    def _table(self, group):
+        """A group of rows as an Arrow table in the shared schema."""
+        text = {
+            field.name: group[field.name].astype('string')
+            for field in self.schema
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+            if not pd.api.types.is_string_dtype(group[field.name])
+        }
+        if text:
+            # Values of text columns that happened to parse as numbers
+            group = group.assign(**text)
+        try:
+            return pa.Table.from_pandas(group, schema=self.schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"rows don't match the types of the first rows written: {e}") from e
+
+    def _open(self, key):
+        date, patient = key
+        path = f"date={date}"
+        if self.patient_column is not None:
+            path = os.path.join(path, f"{PATIENT_COLUMN}={_path_value(patient)}")
+        entry = self.partitions.setdefault(key, {
+            'path': path.replace(os.sep, '/'),
+            'date': date,
+            'patient_id': None if self.patient_column is None else str(patient),
+            'files': [],
+            'rows': 0,
+            'min_time': None,
+            'max_time': None
+        })
+        folder = os.path.join(self.directory, path)
+        os.makedirs(folder, exist_ok=True)
+        filename = f"part-{len(entry['files']):05d}.parquet"
+        entry['files'].append(filename)
+        return pq.ParquetWriter(os.path.join(folder, filename), self.schema)
+
+    def write(self, frame):
+        """Append a frame of rows to the partitions its rows fall in."""
+        if frame.empty:
+            return
+        frame = self._prepare(frame)
+        times = frame[self.time_column]
+        dates = times.dt.strftime('%Y-%m-%d')
+        first_date = dates.min()
+        for key in [key for key in self._writers if key[0] < first_date]:
+            self._writers.pop(key).close()
+
+        if self.schema is None:
+            self.schema = self._infer_schema(frame)
+
+        by = [dates] if self.patient_column is None else [dates, frame[self.patient_column].astype(str)]
+        for key, group in frame.groupby(by, sort=True):
+            key = (key[0], key[1] if self.patient_column is not None else None)
+            table = self._table(group)
+            if key not in self._writers:
+                self._writers[key] = self._open(key)
+            self._writers[key].write_table(table)
+
+            entry = self.partitions[key]
+            group_times = group[self.time_column]
+            low, high = group_times.min().isoformat(), group_times.max().isoformat()
+            entry['rows'] += len(group)
+            entry['min_time'] = low if entry['min_time'] is None else min(entry['min_time'], low)
+            entry['max_time'] = high if entry['max_time'] is None else max(entry['max_time'], high)
+
+    def close(self):
+        """
+        Close all files and write the metadata.
+
+        Returns:
+            dict: The metadata written to ``PARTITION_METADATA``
+        """
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+        partitions = sorted(self.partitions.values(), key=lambda entry: entry['path'])
+        metadata = {
+            'time_column': self.time_column,
+            'patient_column': self.patient_column,
+            'format': self.plan.format.name if self.plan is not None else None,
+            'columns': list(self.schema.names) if self.schema is not None else [],
+            'rows': sum(entry['rows'] for entry in partitions),
+            'min_time': min((entry['min_time'] for entry in partitions), default=None),
+            'max_time': max((entry['max_time'] for entry in partitions), default=None),
+            'partitions': partitions
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, PARTITION_METADATA)
+        with open(f"{path}.tmp", 'w') as fh:
+            json.dump(metadata, fh, indent=2)
+        os.replace(f"{path}.tmp", path)
+        return metadata
+
+
+def write_partitions(frames, directory, time_column=None, by_patient=False):
+    """
+    Write frames of rows to a partitioned directory.
+
+    Args:
+        frames (iterable): DataFrames of rows, ideally in time order
+        directory (str): Output folder
+        time_column (str, optional): Time column, detected if not given
+        by_patient (bool): Also partition by patient
+
+    Returns:
+        dict: The written metadata
+    """
+    writer = PartitionWriter(directory, time_column, by_patient)
+    for frame in frames:
+        writer.write(frame)
+    return writer.close()
+
+
+def read_metadata(directory):
+    """
+    Metadata of a partitioned directory.
+
+    Raises:
+        FileNotFoundError: If the directory has no metadata file
+    """
+    with open(os.path.join(directory, PARTITION_METADATA)) as fh:
+        return json.load(fh)
+
+
+def select_partitions(metadata, start=None, end=None, patients=None):
+    """
+    Partitions holding rows in a time range.
+
+    Args:
+        metadata (dict): Metadata from ``read_metadata``
+        start, end (str or datetime, optional): Inclusive range bounds
+        patients (list, optional): Patient ids to keep
+
+    Returns:
+        list: Matching partition entries, in path order
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    selected = []
+    for entry in metadata['partitions']:
+        if start is not None and pd.Timestamp(entry['max_time']) < start:
+            continue
+        if end is not None and pd.Timestamp(entry['min_time']) > end:
+            continue
+        if patients is not None and entry['patient_id'] not in patients:
+            continue
+        selected.append(entry)
+    return selected
+
+
+def read_partition(directory, entry):
+    """Rows of one partition as a DataFrame."""
+    paths = [os.path.join(directory, entry['path'], filename) for filename in entry['files']]
+    return pd.concat([pq.read_table(path).to_pandas() for path in paths], ignore_index=True)
+
+
+def read_partitions(directory, start=None, end=None, patients=None):
+    """
+    Rows in a time range, reading only the partitions that overlap it.
+
+    Args:
+        directory (str): Partitioned directory
+        start, end (str or datetime, optional): Inclusive range bounds
+        patients (list, optional): Patient ids to keep
+
+    Returns:
+        pd.DataFrame: Matching rows in partition order
+    """
+    if pq is None:
+        raise ImportError("Reading partitions needs pyarrow")
+    metadata = read_metadata(directory)
+    entries = select_partitions(metadata, start, end, patients)
+    if not entries:
+        return pd.DataFrame(columns=metadata['columns'])
+    df = pd.concat([read_partition(directory, entry) for entry in entries], ignore_index=True)
+    times = df[metadata['time_column']]
+    keep = pd.Series(True, index=df.index)
+    if start is not None:
+        keep &= times >= pd.Timestamp(start)
+    if end is not None:
+        keep &= times <= pd.Timestamp(end)
+    return df[keep].reset_index(drop=True)
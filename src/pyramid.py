@@ -0,0 +1,193 @@
+"""
+Multi-resolution aggregate pyramid for converted datasets.
+
+At upload the converted rows are aggregated into progressively coarser time
+buckets (minute, 10 minutes, hour, day, ISO week). When plotting a date range
+the finest level whose row count stays within the point budget is used, so a
+sixty-day range draws about as fast as a single day.
+
+Each level is built from the one below it. Minimum and maximum columns
+aggregate exactly; median columns become the median of the bucket medians.
+"""
+
+import os
+
+import numpy as np
+
+from dataset import Dataset, NS_PER_DAY
+from segments import segment_starts, segment_min, segment_max, segment_median, segment_mean, segment_first
+
+# Upper bound on the markers sent to the 3D plot for one range
+POINT_BUDGET = int(os.environ.get('POINT_BUDGET', 100_000))
+
+NS_PER_MINUTE = 60 * 10**9
+
+# 1970-01-01 was a Thursday; ISO weeks start on Monday, four days later
+_MONDAY = 4 * NS_PER_DAY
+
+# (name, bucket width in ns, bucket origin in ns), finest first
+LEVELS = [
+    ('1 minute', NS_PER_MINUTE, 0),
+    ('10 minutes', 10 * NS_PER_MINUTE, 0),
+    ('1 hour', 60 * NS_PER_MINUTE, 0),
+    ('1 day', NS_PER_DAY, 0),
+    ('ISO week', 7 * NS_PER_DAY, _MONDAY),
+]
+
+
+def floor_time(time_ns, width, origin=0):
+    """Round nanosecond timestamps down to the start of their bucket."""
+    return time_ns - (time_ns - origin) % width
+
+
+def aggregate_columns(columns, keys):
+    """
+    Collapse aligned columns to one row per bucket key.
+
+    Args:
+        columns (dict): Column name -> values in time order
+        keys (np.ndarray): Non-decreasing bucket start per row
+
+    Returns:
+        tuple: ``(bucket starts, aggregated columns)``
+    """
+    starts = segment_starts(keys)
+    aggregated = {}
+    for name, values in columns.items():
+        if values.dtype.kind != 'f':
+            aggregated[name] = segment_first(values, starts)
+        elif name.endswith('_min'):
+            aggregated[name] = segment_min(values, starts)
+        elif name.endswith('_max'):
+            aggregated[name] = segment_max(values, starts)
+        elif name.endswith('_median'):
+            aggregated[name] = segment_median(values, starts)
+        else:
+            aggregated[name] = segment_mean(values, starts)
+    return keys[starts], aggregated
+
+
+def aggregate_level(dataset, keys):
+    """
+    Collapse a dataset to one row per bucket key.
+
+    Args:
+        dataset (Dataset): Time-sorted dataset
+        keys (np.ndarray): Non-decreasing bucket start per row
+
+    Returns:
+        Dataset: One row per bucket, timed at the bucket start
+    """
+    time, columns = aggregate_columns(dataset.columns, keys)
+    return Dataset.from_columns(time, columns, dataset.dataset_id)
+
+
+class Pyramid:
+    """
+    Raw rows plus their aggregates at every level in ``LEVELS``.
+
+    Attributes:
+        levels (list): ``(name, width, origin, Dataset)`` tuples, raw first
+    """
+
+    def __init__(self, dataset, levels=LEVELS):
+        self.levels = [('raw', 1, 0, dataset)]
+        current = dataset
+        for name, width, origin in levels:
+            keys = floor_time(current.time, width, origin)
+            # Levels that wouldn't merge any rows just share the finer one
+            if len(current) and np.any(keys[1:] == keys[:-1]):
+                current = aggregate_level(current, keys)
+            self.levels.append((name, width, origin, current))
+
+    def extend(self, first_row):
+        """
+        Bring the levels up to date after rows were appended to the raw dataset.
+
+        Each level re-aggregates only from the bucket holding the first
+        changed row of the level below, so a refresh costs time proportional
+        to the new rows rather than to the whole dataset.
+
+        Args:
+            first_row (int): First raw row that changed
+        """
+        shared = [level is finer for (*_, level), (*_, finer) in zip(self.levels[1:], self.levels)]
+        changed = first_row
+        for i in range(1, len(self.levels)):
+            name, width, origin, level = self.levels[i]
+            source = self.levels[i - 1][3]
+            if changed >= len(source):
+                break
+            if shared[i - 1]:
+                # A shared level follows the level below until new rows merge
+                self.levels[i] = (name, width, origin, source)
+                keys = floor_time(source.time[max(changed - 1, 0):], width, origin)
+                if not np.any(keys[1:] == keys[:-1]):
+                    continue
+                level = aggregate_level(source, floor_time(source.time, width, origin))
+                self.levels[i] = (name, width, origin, level)
+                changed = 0
+                continue
+
+            key = floor_time(source.time[changed], width, origin)
+            source_from = int(np.searchsorted(source.time, key))
+            level_from = int(np.searchsorted(level.time, key))
+            rows = slice(source_from, None)
+            time, columns = aggregate_columns(
+                {c: v[rows] for c, v in source.columns.items()},
+                floor_time(source.time[rows], width, origin)
+            )
+            level.splice(level_from, time, columns)
+            changed = level_from
+
+    def select(self, start_ns, end_ns, budget=POINT_BUDGET):
+        """
+        Pick the finest level that plots a time range within the point budget.
+
+        Args:
+            start_ns (int): Start of the range in nanoseconds (inclusive)
+            end_ns (int): End of the range in nanoseconds (exclusive)
+            budget (int): Maximum number of rows to return
+
+        Returns:
+            tuple: ``(level name, level Dataset, row slice)``; the coarsest
+            level when no level fits the budget
+        """
+        for name, width, origin, level in self.levels:
+            # Include the bucket that straddles the start of the range
+            rows = level.time_slice(floor_time(start_ns, width, origin), end_ns)
+            if rows.stop - rows.start <= budget:
+                return name, level, rows
+        return name, level, rows
+
+    def level_within(self, width):
+        """
+        Coarsest level whose buckets are at most ``width`` ns wide, e.g.
+        one pixel of a time axis; the raw rows when none is.
+
+        Returns:
+            tuple: ``(level name, level Dataset)``
+        """
+        name, _, _, level = self.levels[0]
+        for level_name, level_width, _, candidate in self.levels[1:]:
+            if level_width > width:
+                break
+            name, level = level_name, candidate
+        return name, level
+
+
+def split_budget(counts, budget=POINT_BUDGET):
+    """
+    Share a point budget between datasets in proportion to their row counts.
+
+    Args:
+        counts (list): Raw rows of each dataset in the plotted range
+        budget (int): Points for all datasets together
+
+    Returns:
+        list: Budget of each dataset, at least one point each
+    """
+    total = sum(counts)
+    if total <= budget:
+        return [max(n, 1) for n in counts]
+    return [max(budget * n // total, 1) for n in counts]
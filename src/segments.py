@@ -0,0 +1,125 @@
+"""
+Reductions over contiguous segments of sorted data.
+
+When rows are ordered by a key, every group is a contiguous run of rows, so
+group-by style aggregates reduce to ``np.*.reduceat`` calls over the run
+boundaries instead of a hash-based ``groupby``.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Most padding (as a multiple of the values) spent on sorting short segments
+# as rows of a 2D block in ``segment_median``
+PADDED_MEDIAN_FACTOR = 4
+
+
+def segment_starts(keys):
+    """
+    Start offsets of the runs of equal values in a sorted key array.
+
+    Args:
+        keys (np.ndarray): Non-decreasing keys, e.g. bucketed timestamps
+
+    Returns:
+        np.ndarray: int64 offsets, one per distinct key, starting with 0
+    """
+    if len(keys) == 0:
+        return np.zeros(0, dtype='int64')
+    return np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1)).astype('int64')
+
+
+def segment_min(values, starts):
+    """NaN-ignoring minimum of each segment (NaN for all-NaN segments)."""
+    if len(starts) == 0:
+        return np.zeros(0, dtype=values.dtype)
+    return np.fmin.reduceat(values, starts)
+
+
+def segment_max(values, starts):
+    """NaN-ignoring maximum of each segment (NaN for all-NaN segments)."""
+    if len(starts) == 0:
+        return np.zeros(0, dtype=values.dtype)
+    return np.fmax.reduceat(values, starts)
+
+
+def segment_mean(values, starts):
+    """NaN-ignoring mean of each segment (NaN for all-NaN segments)."""
+    if len(starts) == 0:
+        return np.zeros(0, dtype='float64')
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    counts = np.add.reduceat(valid.astype('int64'), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def segment_median(values, starts):
+    """
+    NaN-ignoring median of each segment, like ``groupby(...).median()``.
+
+    Segments of length one (the common case for per-timestamp data) are
+    returned as is. Short segments (a few raw readings per timestamp) are
+    padded with NaN into one row each and sorted along the rows; long ones
+    are sorted within their segment with a single ``lexsort``. Either way the
+    middle elements are picked out directly.
+    """
+    n = len(values)
+    if len(starts) == 0:
+        return np.zeros(0, dtype='float64')
+    if len(starts) == n:
+        return values.astype('float64', copy=True)
+
+    lengths = np.diff(np.append(starts, n))
+    segment_ids = np.repeat(np.arange(len(starts)), lengths)
+    width = int(lengths.max())
+    if len(starts) * width <= PADDED_MEDIAN_FACTOR * n:
+        block = np.full((len(starts), width), np.nan)
+        block[segment_ids, np.arange(n) - np.repeat(starts, lengths)] = values
+        # NaN sorts last in each row, so the valid values come first
+        block.sort(axis=1)
+        counts = width - np.isnan(block).sum(axis=1)
+        safe = np.maximum(counts, 1)
+        segments = np.arange(len(starts))
+        lower = block[segments, (safe - 1) // 2]
+        upper = block[segments, safe // 2]
+        return np.where(counts > 0, (lower + upper) / 2.0, np.nan)
+
+    # NaN sorts last inside each segment, so the valid values come first
+    ordered = values[np.lexsort((values, segment_ids))]
+    counts = np.add.reduceat((~np.isnan(ordered)).astype('int64'), starts)
+
+    safe = np.maximum(counts, 1)
+    lower = ordered[starts + (safe - 1) // 2]
+    upper = ordered[starts + safe // 2]
+    return np.where(counts > 0, (lower + upper) / 2.0, np.nan)
+
+
+def segment_first(values, starts, valid=None):
+    """
+    First valid value of each segment, like ``groupby(...).first()``.
+
+    Args:
+        values (np.ndarray): Values of any dtype
+        starts (np.ndarray): Segment start offsets
+        valid (np.ndarray, optional): Boolean mask of usable values;
+            defaults to the non-null entries
+
+    Returns:
+        np.ndarray: One value per segment (None/NaN where a segment has none)
+    """
+    n = len(values)
+    if len(starts) == 0:
+        return values[:0]
+    if valid is None:
+        valid = ~pd.isna(values)
+    positions = np.where(valid, np.arange(n), n)
+    first = np.minimum.reduceat(positions, starts)
+    found = first < n
+
+    out = values[np.minimum(first, n - 1)].copy()
+    if not found.all():
+        out = out.astype(object) if out.dtype.kind not in 'fc' else out
+        out[~found] = None if out.dtype == object else np.nan
+    return out
+
@@ -0,0 +1,192 @@
+"""
+On-disk stores shared by the dashboard's worker processes.
+
+The files kept there hold patient data and are read back with ``pickle``,
+so nobody but the user running the dashboard may read or write these
+folders. They default to that user's cache directory rather than the shared
+temp directory, are created with mode 0o700, and an existing folder is only
+used when this user owns it and no one else has access to it.
+"""
+
+import os
+import pickle
+import re
+import stat
+import threading
+from collections import OrderedDict
+
+# Parent of the default storage folders
+APP_CACHE_DIR = os.environ.get(
+    'BIOSIGNAL_CACHE_DIR',
+    os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')),
+                 'biosignal-dashboard')
+)
+
+
+def private_directory(path):
+    """
+    Create a folder only the current user can access, or check an existing one.
+
+    Missing parents are created with mode 0o700 too.
+
+    Args:
+        path (str): Folder to create or check
+
+    Returns:
+        str: ``path``
+
+    Raises:
+        PermissionError: If the folder is a symlink, belongs to another user,
+            or is accessible to its group or to others
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a folder")
+    # POSIX only; elsewhere folders inherit the user profile's access rules
+    if hasattr(os, 'getuid'):
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{path} belongs to another user")
+        if info.st_mode & 0o077:
+            raise PermissionError(f"{path} is accessible to other users (mode {stat.S_IMODE(info.st_mode):o})")
+    return path
+
+
+class MirroredStore:
+    """
+    LRU of objects in this process, mirrored to pickles on disk, so every
+    worker process can serve an object stored through another one.
+
+    The folder is checked to be private to this user before anything is
+    written to or loaded from it. Subclasses say how objects are keyed.
+
+    Args:
+        directory (str): Folder for the on-disk copies
+        max_entries (int): Objects to keep in memory per process
+        max_bytes (int, optional): Total size of the on-disk copies to keep;
+            the least recently used are removed first. Unbounded if None.
+    """
+
+    # Keys that may name a file; anything else is rejected as unknown
+    key_pattern = re.compile(r'^[0-9a-f]{8,64}$')
+
+    # What is stored, for error messages
+    kind = 'object'
+
+    def __init__(self, directory, max_entries, max_bytes=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._checked = False
+
+    def key(self, item):
+        """Key an object is stored under."""
+        raise NotImplementedError
+
+    def _path(self, key):
+        if not self.key_pattern.match(key or ''):
+            raise KeyError(f"invalid {self.kind} key: {key!r}")
+        if not self._checked:
+            private_directory(self.directory)
+            self._checked = True
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _remember(self, key, item):
+        self._memory[key] = item
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, item, persist=True):
+        """
+        Store an object in memory and on disk, returning its key.
+
+        Args:
+            item: Object to store
+            persist (bool): Also rewrite the on-disk copy. Live datasets
+                that grow every few seconds skip it between refreshes.
+        """
+        key = self.key(item)
+        with self._lock:
+            self._remember(key, item)
+        if not persist:
+            return key
+
+        path = self._path(key)
+        # Write to a temporary name first so readers never see half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            pickle.dump(item, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        if self.max_bytes is not None:
+            self._evict(keep=path)
+        return key
+
+    def _evict(self, keep=None):
+        # Modification times double as last use, see ``get``
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                try:
+                    info = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, os.path.join(self.directory, name)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def contains(self, key):
+        """Whether an object can be served from memory or disk."""
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """
+        Look up an object, loading it from disk when this process hasn't seen it.
+
+        Raises:
+            KeyError: If the key is unknown
+        """
+        item = None
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                item = self._memory[key]
+        if item is not None:
+            self._touch(key)
+            return item
+
+        try:
+            with open(self._path(key), 'rb') as fh:
+                item = pickle.load(fh)
+        except FileNotFoundError:
+            raise KeyError(f"unknown {self.kind}: {key}") from None
+        self._touch(key)
+
+        with self._lock:
+            self._remember(key, item)
+        return item
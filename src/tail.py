@@ -0,0 +1,110 @@
+"""
+Incremental reading of a CSV file that keeps growing, e.g. a live export.
+
+The reader remembers the byte offset up to which the file has been consumed
+and on each refresh parses only the complete lines past it, so a refresh
+costs time proportional to the new data rather than to the file.
+
+Raw (new format) rows are aggregated per timestamp, and more rows for the
+last timestamp seen may still be on their way. Those rows are held back until
+a later timestamp shows up, so every group is aggregated exactly once.
+"""
+
+import io
+import os
+
+import pandas as pd
+
+# Most bytes parsed per refresh; a large backlog is caught up over several
+TAIL_MAX_READ_BYTES = int(os.environ.get('TAIL_MAX_READ_BYTES', 64 * 2**20))
+
+
+class CsvTail:
+    """
+    Follows a CSV file that is appended to.
+
+    Args:
+        path (str): CSV file to follow
+        group_column (str, optional): Time column whose trailing group of
+            equal values is held back until it is complete
+        dtype (dict, optional): Lowercase column -> dtype used when parsing
+
+    Attributes:
+        offset (int): Bytes of the file consumed so far
+        header (bytes): Header line, prepended to every parsed chunk
+        pending (pd.DataFrame): Held back rows of the last timestamp
+    """
+
+    def __init__(self, path, group_column=None, dtype=None):
+        self.path = path
+        self.group_column = group_column
+        self.dtype = dtype or {}
+        self.offset = 0
+        self.header = b''
+        self.pending = None
+
+    def _read_lines(self):
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            raise ValueError(f"{os.path.basename(self.path)} shrank from {self.offset} to {size} bytes")
+        with open(self.path, 'rb') as fh:
+            fh.seek(self.offset)
+            chunk = fh.read(TAIL_MAX_READ_BYTES)
+        # A last line without its newline may still be being written
+        end = chunk.rfind(b'\n') + 1
+        self.offset += end
+        chunk = chunk[:end]
+        if not self.header:
+            newline = chunk.find(b'\n') + 1
+            self.header, chunk = chunk[:newline], chunk[newline:]
+        return chunk
+
+    def columns(self):
+        """Lowercase column names from the header line, reading it if needed."""
+        if not self.header:
+            # Only the header is consumed, so the rows are parsed with the dtypes set after this
+            self._read_lines()
+            self.offset = len(self.header)
+        if not self.header:
+            return []
+        return [c.lower() for c in pd.read_csv(io.BytesIO(self.header)).columns]
+
+    def _parse(self, chunk):
+        if not self.header or not chunk.strip():
+            return None
+        dtype = {
+            raw: self.dtype[raw.lower()]
+            for raw in pd.read_csv(io.BytesIO(self.header)).columns
+            if raw.lower() in self.dtype
+        }
+        frame = pd.read_csv(io.BytesIO(self.header + chunk), dtype=dtype or None)
+        frame.columns = [c.lower() for c in frame.columns]
+        return frame
+
+    def read(self):
+        """
+        Parse the complete rows appended since the last call.
+
+        Returns:
+            pd.DataFrame: New rows with lowercase column names, possibly empty
+
+        Raises:
+            ValueError: If the file shrank, i.e. was truncated or replaced
+        """
+        frame = _concat(self.pending, self._parse(self._read_lines()))
+        self.pending = None
+        if frame is None:
+            return pd.DataFrame(columns=self.columns())
+
+        if self.group_column in frame.columns and len(frame):
+            times = pd.to_datetime(frame[self.group_column])
+            last = (times == times.max()).to_numpy()
+            self.pending = frame[last]
+            frame = frame[~last]
+        return frame.reset_index(drop=True)
+
+
+def _concat(first, second):
+    if first is None or second is None:
+        return second if first is None else first
+    return pd.concat([first, second], ignore_index=True)
@@ -0,0 +1,73 @@
+"""
+Test script for brushing on the 2D projections
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from brush import region_mask, brush_masks, combine_masks
+from dataset import Dataset
+
+def test_region_mask():
+    """Box and lasso regions select exactly the points inside them"""
+    print("Testing brushed regions...")
+
+    x = np.array([0.5, 1.2, 2.5, 0.5, np.nan, 1.9])
+    y = np.array([0.5, 0.5, 0.5, 1.2, 0.5, 1.9])
+
+    # Corners can come in any order
+    box = {'box': {'x': [2, 0], 'y': [0, 1]}}
+    assert list(region_mask(x, y, box)) == [True, True, False, False, False, False]
+
+    # Triangle (0,0) (2,0) (0,2): inside when x + y < 2
+    lasso = {'lasso': {'x': [0, 2, 0], 'y': [0, 0, 2]}}
+    assert list(region_mask(x, y, lasso)) == [True, True, False, True, False, False]
+
+    print("✅ Brushed region tests passed!")
+
+def test_brushes_filter_other_views():
+    """Each view is filtered by the other views' brushes, the 3D plot by all"""
+    print("\nTesting linked brushing...")
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    df = pd.DataFrame({
+        'time': pd.date_range('2024-01-01', periods=n, freq='min'),
+        'a': rng.uniform(0, 10, n),
+        'b': rng.uniform(0, 10, n),
+        'c': rng.uniform(0, 10, n)
+    })
+    dataset = Dataset(df)
+    views = {'ab': ('a', 'b'), 'bc': ('b', 'c'), 'ac': ('a', 'c')}
+    brushes = {
+        'ab': {'box': {'x': [0, 5], 'y': [0, 10]}},
+        'bc': {'lasso': {'x': [0, 10, 10, 0], 'y': [0, 0, 3, 3]}},
+        'unknown': {'box': {'x': [0, 1], 'y': [0, 1]}}
+    }
+    rows = slice(100, 9_000)
+    masks = brush_masks(dataset, rows, brushes, views)
+    assert sorted(masks) == ['ab', 'bc'], "Only brushes of known views apply"
+
+    a, c = df['a'].to_numpy()[rows], df['c'].to_numpy()[rows]
+    assert np.array_equal(combine_masks(masks, skip='bc'), a <= 5)
+    assert np.array_equal(combine_masks(masks, skip='ab'), c <= 3)
+    assert np.array_equal(combine_masks(masks), (a <= 5) & (c <= 3))
+    assert combine_masks({}) is None
+
+    print("✅ Linked brushing tests passed!")
+
+if __name__ == "__main__":
+    print("Running brushing tests...\n")
+
+    try:
+        test_region_mask()
+        test_brushes_filter_other_views()
+        print("\n🎉 All tests passed! Brushing is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,116 @@
+"""
+Test script for the catalog of partitioned archives
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import base64
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from catalog import Catalog
+from partitions import pq, write_partitions
+import app
+
+def test_catalog_loads_only_selected_days():
+    """Archives open from metadata, and ranges read and cache only their days"""
+    print("Testing archive catalog...")
+
+    if pq is None:
+        print("⚠️ pyarrow is not installed, skipping catalog tests")
+        return
+
+    n = 5 * 24 * 12
+    df = pd.DataFrame({
+        'time': pd.date_range('2024-05-01', periods=n, freq='5min'),
+        'heart_rate_max': np.arange(n, dtype=float)
+    })
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_partitions([df], os.path.join(directory, 'ward_a'))
+        os.makedirs(os.path.join(directory, 'not_an_archive'))
+
+        converted = []
+        def convert(frame):
+            converted.append(frame['time'].min().strftime('%Y-%m-%d') if len(frame) else None)
+            return frame
+
+        # Room for about two days of converted rows
+        catalog = Catalog(directory, convert=convert, max_bytes=2 * 288 * 16 + 1)
+        assert catalog.archives() == ['ward_a']
+        assert catalog.days('ward_a') == [f"2024-05-0{day}" for day in range(1, 6)]
+        assert list(catalog.empty_frame('ward_a').columns) == ['time', 'heart_rate_max']
+        assert converted == [None], "Opening an archive should read no rows"
+
+        rows = catalog.load('ward_a', '2024-05-02', '2024-05-03')
+        assert len(rows) == 2 * 288 and rows['time'].min() == pd.Timestamp('2024-05-02')
+        catalog.load('ward_a', '2024-05-03', '2024-05-03')
+        assert converted[1:] == ['2024-05-02', '2024-05-03'], f"Unexpected reads: {converted}"
+
+        # A third day evicts the least recently used one (the 2nd)
+        catalog.load('ward_a', '2024-05-04', '2024-05-04')
+        catalog.load('ward_a', '2024-05-03', '2024-05-03')
+        catalog.load('ward_a', '2024-05-02', '2024-05-02')
+        assert converted[3:] == ['2024-05-04', '2024-05-02'], f"Unexpected reads: {converted}"
+
+        for name in ('../ward_a', 'not_an_archive', ''):
+            try:
+                catalog.metadata(name)
+                raise AssertionError(f"{name!r} was accepted as an archive")
+            except KeyError:
+                pass
+
+    print("✅ Archive catalog tests passed!")
+
+def test_archive_events_and_export():
+    """Events load on an archive and its ranges export through the archive route"""
+    print("\nTesting archive events and export...")
+
+    if pq is None:
+        print("⚠️ pyarrow is not installed, skipping catalog tests")
+        return
+
+    n = 3 * 24 * 12
+    df = pd.DataFrame({'time': pd.date_range('2024-05-01', periods=n, freq='5min')})
+    for signal in ('heart_rate', 'heart_rate_variability', 'respiration_rate', 'relative_stroke_volume'):
+        df[f'{signal}_max'] = np.arange(n, dtype=float)
+
+    saved = app.catalog
+    with tempfile.TemporaryDirectory() as directory:
+        write_partitions([df], os.path.join(directory, 'ward_b'))
+        app.catalog = Catalog(directory, convert=app.prepare_frame)
+        stored_data = app.open_archive('ward_b')[0]
+
+        events_csv = "start,end,event\n2024-05-02 01:00,2024-05-02 02:00,seizure\n"
+        contents = 'data:text/csv;base64,' + base64.b64encode(events_csv.encode()).decode()
+        events_data, _ = app.load_events(contents, 'events.csv', stored_data)
+        assert events_data['dataset'] == 'ward_b', f"Events were not loaded: {events_data}"
+
+        client = app.server.test_client()
+        response = client.get(
+            f"/export/archive/ward_b.csv?first=1&last=1&columns=heart_rate_max&events={events_data['key']}"
+        )
+        lines = response.get_data(as_text=True).splitlines()
+        assert response.status_code == 200
+        assert lines[0] == 'time,heart_rate_max,outlier,event'
+        assert len(lines) == 1 + 288, f"Expected one day of rows, got {len(lines) - 1}"
+        assert sum(line.endswith(',seizure') for line in lines) == 12
+        assert client.get("/export/archive/no_such_archive.csv").status_code == 404
+    app.catalog = saved
+
+    print("✅ Archive events and export tests passed!")
+
+if __name__ == "__main__":
+    print("Running archive catalog tests...\n")
+
+    try:
+        test_catalog_loads_only_selected_days()
+        test_archive_events_and_export()
+        print("\n🎉 All tests passed! The archive catalog is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,97 @@
+"""
+Test script for the sliding-window correlations
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from correlation import rolling_correlation
+from pyramid import NS_PER_MINUTE
+
+def create_test_dataset(n=6000):
+    """Three signals sampled every 10 s with missing values, a gap and a flat stretch"""
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2024-01-01 00:00:25', periods=n, freq='10s')
+    times = times[(times < '2024-01-01 05:00') | (times >= '2024-01-01 07:30')]
+    n = len(times)
+    hr = 70 + 8 * np.sin(np.arange(n) / 300) + rng.normal(0, 3, n)
+    hrv = 1000 - 0.5 * hr + rng.normal(0, 2, n)
+    rr = rng.normal(14, 2, n)
+    hrv[rng.integers(0, n, 300)] = np.nan
+    rr[rng.integers(0, n, 50)] = np.nan
+    rr[1000:1100] = 14.0
+    return Dataset(pd.DataFrame({'time': times, 'hr': hr, 'hrv': hrv, 'rr': rr}))
+
+def test_matches_windows_computed_directly():
+    """Running-total correlations equal each window's correlation computed from its rows"""
+    print("Testing rolling correlations...")
+
+    dataset = create_test_dataset()
+    window, step = 30 * NS_PER_MINUTE, 5 * NS_PER_MINUTE
+    correlation = rolling_correlation(dataset, ['hr', 'hrv', 'rr'], window, step)
+    assert rolling_correlation(dataset, ['hr', 'hrv', 'rr'], window, step) is correlation, "Series should be cached"
+    assert correlation.pairs == [('hr', 'hrv'), ('hr', 'rr'), ('hrv', 'rr')]
+    assert np.all(correlation.time % step == 0)
+    assert correlation.time[0] > dataset.time[0] and correlation.time[-1] > dataset.time[-1]
+
+    for i, (a, b) in enumerate(correlation.pairs):
+        x, y = dataset.column(a), dataset.column(b)
+        for j, end in enumerate(correlation.time):
+            rows = (dataset.time >= end - window) & (dataset.time < end) & ~np.isnan(x) & ~np.isnan(y)
+            assert correlation.counts[i, j] == rows.sum()
+            got = correlation.values[i, j]
+            if rows.sum() < 5 or x[rows].std() == 0 or y[rows].std() == 0:
+                assert np.isnan(got), f"{a}/{b} window to {end} should be empty"
+            else:
+                expected = np.corrcoef(x[rows], y[rows])[0, 1]
+                assert abs(got - expected) < 1e-9, f"{a}/{b} window to {end}: {got} != {expected}"
+
+    # The strongly coupled pair stays negative, the gap has no windows with data
+    assert np.nanmax(correlation.values[0]) < -0.2 and abs(np.nanmean(correlation.values[1])) < 0.1
+    gap = correlation.window_slice(pd.Timestamp('2024-01-01 06:00').value, pd.Timestamp('2024-01-01 07:30').value)
+    assert np.isnan(correlation.values[:, gap]).all()
+
+    print("✅ Rolling correlation tests passed!")
+
+def test_level_shift_over_long_recording():
+    """Windows stay exact after days of data and far from the overall mean"""
+    print("\nTesting rolling correlations across a level shift...")
+
+    rng = np.random.default_rng(1)
+    n = 4 * 86400
+    common = rng.normal(0, 1, n)
+    x = 1000 + 0.05 * common + rng.normal(0, 0.05, n)
+    y = 60 + 0.02 * common + rng.normal(0, 0.02, n)
+    # One day sits thousands of standard deviations away from the others
+    x[86400:2 * 86400] += 2000
+    y[86400:2 * 86400] -= 800
+    times = pd.date_range('2024-01-01', periods=n, freq='s')
+    dataset = Dataset(pd.DataFrame({'time': times, 'x': x, 'y': y}))
+
+    window = 10 * NS_PER_MINUTE
+    correlation = rolling_correlation(dataset, ['x', 'y'], window, NS_PER_MINUTE)
+    errors = []
+    for j, end in enumerate(correlation.time):
+        lo, hi = np.searchsorted(dataset.time, [end - window, end])
+        if hi - lo >= 5:
+            errors.append(abs(correlation.values[0, j] - np.corrcoef(x[lo:hi], y[lo:hi])[0, 1]))
+    assert max(errors) < 1e-12, f"Windows drifted from their rows' correlation by up to {max(errors)}"
+
+    print("✅ Level shift tests passed!")
+
+if __name__ == "__main__":
+    print("Running correlation tests...\n")
+
+    try:
+        test_matches_windows_computed_directly()
+        test_level_shift_over_long_recording()
+        print("\n🎉 All tests passed! The correlation analysis is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,160 @@
+"""
+Test script for the server-side dataset store
+"""
+
+import pandas as pd
+import numpy as np
+import tempfile
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import dataset as dataset_module
+from dataset import Dataset, DatasetStore, dataset_hash
+
+def create_test_dataset():
+    """Create an unsorted old-format frame spanning three days"""
+    base_time = datetime(2024, 1, 1, 12, 0, 0)
+    times = [base_time + timedelta(hours=6 * i) for i in range(10)]
+
+    data = {
+        'time': times[::-1],
+        'heart_rate_max': np.arange(10, dtype=float)[::-1],
+        'heart_rate_variability_max': np.random.uniform(30, 90, 10),
+        'respiration_rate_max': np.random.randint(14, 22, 10),
+        'relative_stroke_volume_max': np.random.uniform(60, 130, 10),
+        'patient_id': ['P001'] * 10
+    }
+
+    return Dataset(pd.DataFrame(data))
+
+def test_dataset_is_time_sorted():
+    """Rows are sorted by time and numeric columns stored as float64"""
+    print("Testing dataset sorting...")
+
+    dataset = create_test_dataset()
+    assert np.all(np.diff(dataset.time) >= 0), "Time index is not sorted"
+    assert list(dataset.columns['heart_rate_max']) == list(range(10)), "Columns not reordered with time"
+    assert dataset.columns['respiration_rate_max'].dtype == np.float64, "Numeric column not float64"
+    assert dataset.columns['patient_id'].dtype == object, "Text column not object"
+
+    print("✅ Dataset sorting tests passed!")
+
+def test_day_slice():
+    """Day indices map to contiguous row ranges"""
+    print("\nTesting day slicing...")
+
+    dataset = create_test_dataset()
+    # 12:00 and 18:00 on day 1, then four samples on each of days 2 and 3
+    assert dataset.date_labels() == ['01-01-2024', '02-01-2024', '03-01-2024']
+
+    rows = dataset.day_slice(1, 2)
+    times = dataset.frame(rows)['time']
+    assert len(times) == 8, f"Expected 8 rows, got {len(times)}"
+    assert times.dt.date.min().isoformat() == '2024-01-02'
+    assert times.dt.date.max().isoformat() == '2024-01-03'
+
+    start = pd.Timestamp('2024-01-02').value
+    end = pd.Timestamp('2024-01-03').value
+    assert dataset.time_slice(start, end) == dataset.day_slice(1, 1)
+
+    print("✅ Day slicing tests passed!")
+
+def test_store_round_trip():
+    """A dataset written by one store can be read by another process' store"""
+    print("\nTesting dataset store...")
+
+    dataset = create_test_dataset()
+    with tempfile.TemporaryDirectory() as directory:
+        DatasetStore(directory).put(dataset)
+        loaded = DatasetStore(directory).get(dataset.dataset_id)
+        assert np.array_equal(loaded.time, dataset.time), "Time index changed on disk"
+
+        try:
+            DatasetStore(directory).get('../../etc/passwd')
+            raise AssertionError("Invalid dataset id was accepted")
+        except KeyError:
+            pass
+
+    print("✅ Dataset store tests passed!")
+
+def test_store_refuses_shared_folder():
+    """Datasets are only kept in a folder no other user can access"""
+    print("\nTesting dataset store permissions...")
+
+    dataset = create_test_dataset()
+    with tempfile.TemporaryDirectory() as directory:
+        private = os.path.join(directory, 'new', 'cache')
+        DatasetStore(private).put(dataset)
+        assert os.stat(private).st_mode & 0o777 == 0o700, "New folders should be private"
+
+        shared = os.path.join(directory, 'shared')
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        for call in (lambda store: store.put(dataset), lambda store: store.get(dataset.dataset_id)):
+            try:
+                call(DatasetStore(shared))
+                raise AssertionError("A folder other users can write to was used")
+            except PermissionError:
+                pass
+        assert os.listdir(shared) == []
+
+    print("✅ Dataset store permission tests passed!")
+
+def test_ids_change_with_format():
+    """Content-derived ids change with the dataset format"""
+    print("\nTesting dataset ids...")
+
+    content = b'BiosignalTime,HeartRateValue\n'
+    current = dataset_hash(content).hexdigest()
+    assert dataset_hash(content).hexdigest() == current
+    saved = dataset_module.DATASET_FORMAT
+    try:
+        dataset_module.DATASET_FORMAT += 1
+        assert dataset_hash(content).hexdigest() != current, "A new format should not reuse old datasets"
+    finally:
+        dataset_module.DATASET_FORMAT = saved
+
+    print("✅ Dataset id tests passed!")
+
+def test_store_eviction():
+    """On-disk copies beyond the size cap are removed, least recently used first"""
+    print("\nTesting dataset store eviction...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        first, second, third = (create_test_dataset() for _ in range(3))
+        store = DatasetStore(directory, max_entries=1)
+        store.put(first)
+        size = os.path.getsize(os.path.join(directory, f"{first.dataset_id}.pkl"))
+        store.max_bytes = 2 * size + size // 2
+
+        store.put(second)
+        os.utime(os.path.join(directory, f"{first.dataset_id}.pkl"), (0, 0))
+        os.utime(os.path.join(directory, f"{second.dataset_id}.pkl"), (1, 1))
+        # Reading the first one marks it as recently used
+        store.get(first.dataset_id)
+        store.put(third)
+
+        assert store.contains(first.dataset_id), "Recently used dataset was evicted"
+        assert not DatasetStore(directory).contains(second.dataset_id), "Least recently used dataset was kept"
+        assert store.contains(third.dataset_id)
+
+    print("✅ Dataset store eviction tests passed!")
+
+if __name__ == "__main__":
+    print("Running dataset tests...\n")
+
+    try:
+        test_dataset_is_time_sorted()
+        test_day_slice()
+        test_store_round_trip()
+        test_store_refuses_shared_folder()
+        test_ids_change_with_format()
+        test_store_eviction()
+        print("\n🎉 All tests passed! The dataset store is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,86 @@
+"""
+Test script for the density view's binned histograms
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from density import DensityGrids, density_grids
+
+AXES = {
+    'x': 'heart_rate_variability_max',
+    'y': 'heart_rate_max',
+    'z': 'respiration_rate_max',
+    'color': 'relative_stroke_volume_max'
+}
+
+def create_test_dataset():
+    """Create four days of old-format data with a few missing values"""
+    times = pd.date_range('2024-01-01', periods=4 * 288, freq='5min')
+    rng = np.random.default_rng(0)
+    data = {
+        'time': times,
+        'heart_rate_variability_max': rng.uniform(20, 80, len(times)),
+        'heart_rate_max': rng.uniform(50, 120, len(times)),
+        'respiration_rate_max': rng.uniform(10, 25, len(times)),
+        'relative_stroke_volume_max': rng.uniform(60, 130, len(times))
+    }
+    data['heart_rate_max'][::50] = np.nan
+    return Dataset(pd.DataFrame(data))
+
+def test_grid_matches_histogram():
+    """Range grids equal a direct histogram of the rows in the range"""
+    print("Testing density grids...")
+
+    dataset = create_test_dataset()
+    grids = DensityGrids(dataset, AXES, bins=6)
+
+    rows = dataset.day_slice(1, 2)
+    sample = np.column_stack([dataset.column(AXES[a])[rows] for a in ('x', 'y', 'z')])
+    sample = sample[~np.isnan(sample).any(axis=1)]
+    expected, _ = np.histogramdd(sample, bins=grids.edges)
+
+    assert np.array_equal(grids.grid(1, 2).reshape(6, 6, 6), expected), "Bin counts differ from histogramdd"
+    assert grids.grid(0, 3).sum() == len(dataset) - len(dataset.time[::50]), "Missing values were binned"
+
+    print("✅ Density grid tests passed!")
+
+def test_mean_color():
+    """Mean color per bin averages the color column of the binned rows"""
+    print("\nTesting mean color grids...")
+
+    dataset = create_test_dataset()
+    grids = DensityGrids(dataset, AXES, bins=1)
+    rows = dataset.day_slice(0, 0)
+    valid = ~np.isnan(dataset.column('heart_rate_max')[rows])
+    expected = dataset.column('relative_stroke_volume_max')[rows][valid].mean()
+    assert np.isclose(grids.grid(0, 0, 'color')[0], expected), "Mean color incorrect"
+
+    print("✅ Mean color tests passed!")
+
+def test_grids_are_cached():
+    """Grids are built once per dataset and column choice"""
+    print("\nTesting density grid cache...")
+
+    dataset = create_test_dataset()
+    assert density_grids(dataset, AXES, bins=4) is density_grids(dataset, AXES, bins=4)
+
+    print("✅ Density grid cache tests passed!")
+
+if __name__ == "__main__":
+    print("Running density tests...\n")
+
+    try:
+        test_grid_matches_histogram()
+        test_mean_color()
+        test_grids_are_cached()
+        print("\n🎉 All tests passed! The density grids are working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,70 @@
+"""
+Test script for the downsampled time-series panel
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from downsample import minmax_downsample
+from pyramid import Pyramid, NS_PER_MINUTE
+
+def test_minmax_keeps_bucket_extremes():
+    """Every bucket keeps its minimum and maximum, in time order"""
+    print("Testing min/max downsampling...")
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    time = np.arange(n, dtype='int64') * 10**9
+    values = rng.normal(size=n)
+    values[rng.integers(0, n, 500)] = np.nan
+    values[54_321] = 50.0
+
+    start, end, buckets = 10 * 10**9, 90_010 * 10**9, 300
+    kept_time, kept = minmax_downsample(time, values, start, end, buckets)
+    assert len(kept) <= 2 * buckets
+    assert np.all(np.diff(kept_time) > 0), "Kept samples should stay in time order"
+    assert kept.max() == 50.0, "A spike must survive downsampling"
+    assert not np.isnan(kept).any()
+
+    window = (time >= start) & (time < end)
+    keys = (time[window] - start) * buckets // (end - start)
+    expected = pd.Series(values[window]).groupby(keys).agg(['min', 'max'])
+    kept_keys = (kept_time - start) * buckets // (end - start)
+    got = pd.Series(kept).groupby(kept_keys).agg(['min', 'max'])
+    assert np.array_equal(got.to_numpy(), expected.to_numpy()), "Bucket extremes differ"
+
+    # Short windows are returned whole
+    _, few = minmax_downsample(time, values, 0, 100 * 10**9, buckets)
+    assert len(few) == np.count_nonzero(~np.isnan(values[:100]))
+
+    print("✅ Min/max downsampling tests passed!")
+
+def test_level_within_pixel():
+    """The coarsest level no wider than a pixel is picked"""
+    print("\nTesting level choice...")
+
+    times = pd.date_range('2024-01-01', periods=3 * 8640, freq='10s')
+    pyramid = Pyramid(Dataset(pd.DataFrame({'time': times, 'heart_rate_max': np.ones(len(times))})))
+    assert pyramid.level_within(5 * 10**9)[0] == 'raw'
+    assert pyramid.level_within(NS_PER_MINUTE)[0] == '1 minute'
+    assert pyramid.level_within(30 * NS_PER_MINUTE)[0] == '10 minutes'
+    assert pyramid.level_within(10**18)[0] == 'ISO week'
+
+    print("✅ Level choice tests passed!")
+
+if __name__ == "__main__":
+    print("Running time-series panel tests...\n")
+
+    try:
+        test_minmax_keeps_bucket_extremes()
+        test_level_within_pixel()
+        print("\n🎉 All tests passed! The time-series panel is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,120 @@
+"""
+Test script for clinical event annotations
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from events import EventIndex, EventStore, NO_EVENT, event_codes
+
+def brute_force_tag(time_ns, starts, ends, labels, index):
+    """Label of the latest-started event covering each timestamp"""
+    codes = []
+    for t in time_ns:
+        active = [i for i in range(len(starts)) if starts[i] <= t < ends[i]]
+        if not active:
+            codes.append(0)
+        else:
+            latest = max(active, key=lambda i: (starts[i], i))
+            codes.append(index.labels.index(labels[latest]))
+    return np.array(codes)
+
+def test_tag_overlapping_events():
+    """Tagging matches a brute-force scan over overlapping events"""
+    print("Testing event tagging...")
+
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, 10_000, 200)
+    ends = starts + rng.integers(0, 500, 200)
+    labels = list(rng.choice(['seizure', 'medication', 'sleep'], 200))
+    index = EventIndex(starts, ends, labels)
+
+    time_ns = np.sort(rng.integers(-100, 11_000, 2_000))
+    expected = brute_force_tag(time_ns, starts, ends, labels, index)
+    assert np.array_equal(index.tag(time_ns), expected), "Event tags differ from brute force"
+
+    print("✅ Event tagging tests passed!")
+
+def test_from_frame():
+    """Events load from a CSV-like frame with start, end and label columns"""
+    print("\nTesting event loading...")
+
+    df = pd.DataFrame({
+        'Start': ['2024-01-01 01:00', '2024-01-01 05:00'],
+        'End': ['2024-01-01 02:00', '2024-01-01 06:00'],
+        'Event': ['seizure', 'sleep']
+    })
+    index = EventIndex.from_frame(df)
+    assert index.labels == [NO_EVENT, 'seizure', 'sleep']
+
+    times = pd.to_datetime(['2024-01-01 00:59', '2024-01-01 01:00', '2024-01-01 02:00', '2024-01-01 05:30'])
+    codes = index.tag(times.to_numpy(dtype='datetime64[ns]').view('int64'))
+    assert list(codes) == [0, 1, 0, 2], f"Unexpected codes: {list(codes)}"
+
+    try:
+        EventIndex.from_frame(df.drop(columns='Event'))
+        raise AssertionError("Events without labels were accepted")
+    except ValueError:
+        pass
+
+    print("✅ Event loading tests passed!")
+
+def test_event_store():
+    """Event sets are found by key from another worker's store"""
+    print("\nTesting the event store...")
+
+    index = EventIndex([0], [10], ['seizure'])
+    with tempfile.TemporaryDirectory() as directory:
+        EventStore(directory).put(index)
+        other_worker = EventStore(directory)
+        loaded = other_worker.get(index.key)
+        assert loaded.labels == index.labels and list(loaded.tag(np.array([5, 10]))) == [1, 0]
+        for key in ['0' * 32, '../secret', None]:
+            try:
+                other_worker.get(key)
+                raise AssertionError(f"Unknown key {key!r} was found")
+            except KeyError:
+                pass
+
+    print("✅ Event store tests passed!")
+
+def test_event_codes_stay_with_event_set():
+    """Row codes are cached on the event set, never on the shared dataset"""
+    print("\nTesting cached event codes...")
+
+    times = pd.date_range('2024-01-01', periods=10, freq='min')
+    dataset = Dataset(pd.DataFrame({'time': times, 'hr': np.arange(10.0)}))
+    index = EventIndex([times[2].value], [times[5].value], ['seizure'])
+
+    codes = event_codes(dataset, index)
+    assert list(codes) == [0, 0, 1, 1, 1, 0, 0, 0, 0, 0]
+    assert event_codes(dataset, index) is codes, "Codes should be cached"
+    assert not dataset.cache, "Codes should not be kept on the dataset"
+
+    dataset.append_frame(pd.DataFrame({'time': [times[-1] + pd.Timedelta(minutes=1)], 'hr': [10.0]}))
+    assert len(event_codes(dataset, index)) == 11, "Appended rows should be tagged"
+
+    del dataset
+    assert len(index.row_codes) == 0, "Codes should go with the dataset"
+
+    print("✅ Cached event code tests passed!")
+
+if __name__ == "__main__":
+    print("Running event tests...\n")
+
+    try:
+        test_tag_overlapping_events()
+        test_from_frame()
+        test_event_store()
+        test_event_codes_stay_with_event_set()
+        print("\n🎉 All tests passed! The event annotations are working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
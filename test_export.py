@@ -0,0 +1,60 @@
+"""
+Test script for the streaming export
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import io
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from export import export_chunks, csv_stream
+
+def create_test_dataset():
+    """Create an old-format dataset of one sample per minute over two days"""
+    times = pd.date_range('2024-01-01', periods=2 * 1440, freq='1min')
+    data = {
+        'time': times,
+        'heart_rate_max': np.arange(len(times), dtype=float)
+    }
+    return Dataset(pd.DataFrame(data))
+
+def test_csv_export_in_chunks():
+    """Chunked CSV export equals the selected rows written at once"""
+    print("Testing chunked CSV export...")
+
+    dataset = create_test_dataset()
+    rows = dataset.time_slice(*dataset.day_range(1, 1))
+    keep = dataset.columns['heart_rate_max'][rows] % 2 == 0
+    flags = dataset.columns['heart_rate_max'] > 2000
+
+    frames = export_chunks(dataset, rows, ['heart_rate_max', 'heart_rate_max__diff'], keep,
+                           {'outlier': flags}, chunk_rows=100)
+    exported = pd.read_csv(io.BytesIO(b''.join(csv_stream(frames))), parse_dates=['time'])
+
+    expected = dataset.frame(rows, ['heart_rate_max', 'heart_rate_max__diff'])[keep].reset_index(drop=True)
+    assert len(exported) == 720, f"Expected 720 rows, got {len(exported)}"
+    assert list(exported.columns) == ['time', 'heart_rate_max', 'heart_rate_max__diff', 'outlier']
+    assert (exported['time'] == expected['time']).all(), "Times differ"
+    assert np.allclose(exported['heart_rate_max__diff'], expected['heart_rate_max__diff'])
+    assert exported['outlier'].sum() == (expected['heart_rate_max'] > 2000).sum()
+
+    # An empty selection still writes the header
+    empty = b''.join(csv_stream(export_chunks(dataset, slice(5, 5), ['heart_rate_max'])))
+    assert empty.decode().strip() == 'time,heart_rate_max'
+
+    print("✅ Chunked CSV export tests passed!")
+
+if __name__ == "__main__":
+    print("Running export tests...\n")
+
+    try:
+        test_csv_export_in_chunks()
+        print("\n🎉 All tests passed! The export is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
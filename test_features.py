@@ -0,0 +1,112 @@
+"""
+Test script for derived feature columns
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from features import column_label, derived_name, signal_choices, split_statistic
+
+def create_test_dataset():
+    """Create an old-format dataset with uneven sample spacing"""
+    times = pd.to_datetime(['2024-01-01 12:00', '2024-01-01 12:01', '2024-01-01 12:03',
+                            '2024-01-01 12:04', '2024-01-01 12:08'])
+    data = {
+        'time': times,
+        'heart_rate_max': [70.0, 75.0, 85.0, 0.0, 10.0],
+        'patient_id': ['P001'] * 5
+    }
+    return Dataset(pd.DataFrame(data))
+
+def test_derived_columns():
+    """Derived columns match their pandas equivalents"""
+    print("Testing derived columns...")
+
+    dataset = create_test_dataset()
+    series = pd.Series(dataset.columns['heart_rate_max'])
+
+    diff = dataset.column(derived_name('heart_rate_max', 'diff'))
+    assert np.allclose(diff, series.diff(), equal_nan=True), "First difference incorrect"
+
+    rate = dataset.column(derived_name('heart_rate_max', 'rate'))
+    assert np.allclose(rate, [np.nan, 5.0, 5.0, -85.0, 2.5], equal_nan=True), "Rate per minute incorrect"
+
+    pct = dataset.column(derived_name('heart_rate_max', 'pct'))
+    assert np.allclose(pct[:4], series.pct_change().to_numpy()[:4] * 100, equal_nan=True), "Percent change incorrect"
+    assert np.isnan(pct[4]), "Percent change from zero should be NaN"
+
+    print("✅ Derived column tests passed!")
+
+def test_derived_columns_are_cached():
+    """A derived column is computed once per dataset"""
+    print("\nTesting derived column cache...")
+
+    dataset = create_test_dataset()
+    name = derived_name('heart_rate_max', 'diff')
+    assert dataset.column(name) is dataset.column(name), "Derived column was recomputed"
+    assert name in dataset.derived
+
+    try:
+        dataset.column(derived_name('patient_id', 'diff'))
+        raise AssertionError("Text column was differenced")
+    except KeyError:
+        pass
+
+    print("✅ Derived column cache tests passed!")
+
+def test_signal_choices():
+    """Columns split into signals with their statistics and transforms"""
+    print("\nTesting signal choices...")
+
+    df = create_test_dataset().frame()
+    df['heart_rate_min'] = df['heart_rate_max'] - 5
+    df['spo2'] = 98.0
+    choices = signal_choices(Dataset(df))
+
+    assert list(choices) == ['heart_rate', 'spo2'], f"Unexpected signals: {list(choices)}"
+    assert choices['heart_rate']['stats'] == ['max', 'min']
+    assert choices['spo2']['stats'] == [''], "Columns without a statistic suffix are plain"
+    assert 'rollmedian_5min' in choices['heart_rate']['transforms']
+    assert choices['spo2']['transforms'] == ['', 'diff', 'rate', 'pct']
+    assert split_statistic('heart_rate_variability_median') == ('heart_rate_variability', 'median')
+    assert column_label('heart_rate_max__rate') == 'Heart Rate Max Δ per min'
+
+    print("✅ Signal choice tests passed!")
+
+def test_rolling_columns():
+    """Rolling statistics cover a trailing time window"""
+    print("\nTesting rolling statistics...")
+
+    dataset = create_test_dataset()
+    values = dataset.columns['heart_rate_max']
+    minutes = (dataset.time - dataset.time[0]) / 60e9
+
+    median = dataset.column(derived_name('heart_rate_max', 'rollmedian_3min'))
+    # Each window holds the samples less than three minutes before the current one
+    expected = [np.median(values[(minutes > m - 3) & (minutes <= m)]) for m in minutes]
+    assert np.allclose(median, expected), "Rolling median incorrect"
+
+    mean = dataset.column(derived_name('heart_rate_max', 'rollmean_3min'))
+    assert np.isclose(mean[2], 80.0), "Rolling mean incorrect"
+    assert column_label('heart_rate_max__rollstd_5min') == 'Heart Rate Max rolling std (5min)'
+
+    print("✅ Rolling statistic tests passed!")
+
+if __name__ == "__main__":
+    print("Running feature tests...\n")
+
+    try:
+        test_derived_columns()
+        test_derived_columns_are_cached()
+        test_signal_choices()
+        test_rolling_columns()
+        print("\n🎉 All tests passed! The derived features are working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,115 @@
+"""
+Test script for the input format registry
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import io
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from formats import FORMATS, InputFormat, compile_plan, detect_format, read_header, register
+
+def test_detect_from_header():
+    """Formats are told apart from the header line alone"""
+    print("Testing format detection from headers...")
+
+    raw = "BiosignalTime,HeartRateValue,RespirationRateValue,patient_id\n"
+    assert detect_format(read_header(io.StringIO(raw))).name == 'new'
+    assert detect_format(['time', 'heart_rate_max', 'heart_rate_min']).name == 'old'
+    # A distinctive time column is part of the signature; anything else is the default
+    assert detect_format(['biosignaltime', 'spo2']).name == 'new'
+    assert detect_format(['time', 'spo2']).name == 'old'
+    assert detect_format(['when', 'spo2']).name == 'old'
+
+    plan = compile_plan(['BiosignalTime', 'HeartRateValue', 'status'])
+    assert plan.aggregates and plan.time_column == 'biosignaltime'
+    assert plan.dtypes == {'HeartRateValue': 'float64'}, f"Unexpected dtypes: {plan.dtypes}"
+
+    print("✅ Format detection tests passed!")
+
+def test_registered_format():
+    """A registered format is detected, parsed and aggregated by its plan"""
+    print("\nTesting a registered format...")
+
+    example = register(InputFormat(
+        'example',
+        signature=('recorded_at', 'pulse'),
+        time_columns=('recorded_at',),
+        time_format='%d.%m.%Y %H:%M:%S',
+        column_map={'pulse': 'heart_rate'},
+        dtypes={'pulse': 'float64'},
+        aggregate=('min', 'max')
+    ))
+    try:
+        csv = (
+            "Recorded_At,Pulse,Ward\n"
+            "01.02.2024 10:00:00,60,A\n"
+            "01.02.2024 10:00:00,80,A\n"
+            "01.02.2024 10:00:05,70,B\n"
+        )
+        plan = compile_plan(read_header(io.StringIO(csv)))
+        assert plan.format is example
+
+        raw = plan.read_csv(io.StringIO(csv))
+        assert raw['Pulse'].dtype == 'float64', "Declared dtypes should be used when reading"
+
+        df = plan.convert(raw)
+        assert list(df.columns) == ['time', 'heart_rate_min', 'heart_rate_max', 'ward']
+        assert list(df['time']) == [pd.Timestamp('2024-02-01 10:00:00'), pd.Timestamp('2024-02-01 10:00:05')]
+        assert list(df['heart_rate_min']) == [60, 70] and list(df['heart_rate_max']) == [80, 70]
+        assert list(df['ward']) == ['A', 'B']
+    finally:
+        del FORMATS['example']
+
+    print("✅ Registered format tests passed!")
+
+def test_sorted_aggregation():
+    """Time-ordered rows aggregate through segments exactly like groupby"""
+    print("\nTesting sorted aggregation...")
+
+    rng = np.random.default_rng(0)
+    n = 3 * 1300
+    times = pd.Series(pd.date_range('2024-01-01', periods=n // 3, freq='s').repeat(3))
+    times.iloc[rng.integers(0, n, 5)] = pd.NaT
+    raw = pd.DataFrame({
+        'BiosignalTime': times,
+        'HeartRateValue': rng.normal(70, 5, n),
+        'RespirationRateValue': rng.integers(10, 20, n),
+        'status': pd.Series(rng.choice(['ok', 'paused', None], n), dtype=object)
+    })
+    raw.loc[rng.integers(0, n, 200), 'HeartRateValue'] = np.nan
+    raw.loc[:5, 'status'] = None
+    plan = compile_plan(raw.columns)
+
+    def split(frame):
+        df = frame.rename(columns=str.lower).rename(columns={'biosignaltime': 'time'})
+        return df, df.select_dtypes(include='number').columns.difference(['time']), ['status']
+
+    # Sorted, nearly sorted (neighbours swapped) and shuffled rows
+    swapped = raw.copy()
+    i = rng.choice(np.arange(0, n - 1, 2), 20, replace=False)
+    swapped.iloc[np.r_[i, i + 1]] = swapped.iloc[np.r_[i + 1, i]].to_numpy()
+    shuffled = raw.sample(frac=1, random_state=0)
+    for frame in (raw, swapped, shuffled):
+        pd.testing.assert_frame_equal(plan.convert(frame.copy()), plan._aggregate_groupby(*split(frame)))
+
+    assert plan._aggregate_sorted(*split(swapped)) is not None
+    assert plan._aggregate_sorted(*split(shuffled)) is None, "Shuffled rows should use groupby"
+
+    print("✅ Sorted aggregation tests passed!")
+
+if __name__ == "__main__":
+    print("Running input format tests...\n")
+
+    try:
+        test_detect_from_header()
+        test_registered_format()
+        test_sorted_aggregation()
+        print("\n🎉 All tests passed! Input formats are working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
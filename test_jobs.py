@@ -0,0 +1,80 @@
+"""
+Test script for the background job store
+"""
+
+import sys
+import os
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from jobs import JobStore, JobCancelled
+
+def test_job_state_and_cancel():
+    """Job state round-trips through disk and cancelling is seen by checks"""
+    print("Testing job store...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(directory)
+        job_id = store.create(filename='upload.csv')
+        assert store.get(job_id)['status'] == 'queued'
+
+        store.update(job_id, status='running', rows_parsed=100)
+        # Another store on the same folder, like another web worker, sees it
+        state = JobStore(directory).get(job_id)
+        assert state['status'] == 'running' and state['rows_parsed'] == 100
+        assert state['filename'] == 'upload.csv'
+
+        store.check(job_id)
+        store.cancel(job_id)
+        try:
+            store.check(job_id)
+            raise AssertionError("A cancelled job passed its check")
+        except JobCancelled:
+            pass
+
+        for bad_id in ('missing', '../' + job_id):
+            try:
+                store.get(bad_id)
+                raise AssertionError(f"Unknown job {bad_id!r} was found")
+            except KeyError:
+                pass
+
+    print("✅ Job store tests passed!")
+
+def test_job_files_are_removed():
+    """Finished jobs are removed after their last poll, abandoned ones once stale"""
+    print("\nTesting job cleanup...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(directory, max_age=3600)
+        finished = store.create(filename='done.csv')
+        with open(store.upload_path(finished), 'wb') as fh:
+            fh.write(b'time,hr\n')
+        store.cancel(finished)
+        store.remove(finished)
+        assert os.listdir(directory) == [], "Every file of the job should be removed"
+        store.remove(finished)
+
+        abandoned = store.create(filename='abandoned.csv')
+        with open(store.upload_path(abandoned), 'wb') as fh:
+            fh.write(b'time,hr\n')
+        for name in os.listdir(directory):
+            os.utime(os.path.join(directory, name), (0, 0))
+        running = store.create(filename='running.csv')
+        assert sorted(os.listdir(directory)) == [f"{running}.json"], "Stale jobs should be pruned on create"
+        assert store.get(running)['status'] == 'queued'
+
+    print("✅ Job cleanup tests passed!")
+
+if __name__ == "__main__":
+    print("Running job tests...\n")
+
+    try:
+        test_job_state_and_cancel()
+        test_job_files_are_removed()
+        print("\n🎉 All tests passed! The job store is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,83 @@
+"""
+Test script for the time-ordered merge of CSV files
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from merge import merge_sorted, merge_to_csv
+
+def write_csvs(directory, frames):
+    paths = []
+    for i, df in enumerate(frames):
+        path = os.path.join(directory, f"part{i}.csv")
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def test_merge_sorts_and_deduplicates():
+    """Overlapping sorted files merge into one sorted file without repeated rows"""
+    print("Testing k-way merge of overlapping files...")
+
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2024-01-01', periods=5_000, freq='s')
+    frames = []
+    for _ in range(3):
+        rows = np.sort(rng.choice(len(times), 2_000, replace=False))
+        frames.append(pd.DataFrame({
+            'BiosignalTime': times[rows].strftime('%Y-%m-%d %H:%M:%S'),
+            'HeartRateValue': rng.integers(50, 90, len(rows)).astype(float),
+            'patient_id': 'p1'
+        }))
+    # A re-export repeating part of the first file, columns in another order
+    frames.append(frames[0].iloc[100:900][['patient_id', 'BiosignalTime', 'HeartRateValue']])
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_csvs(directory, frames)
+        out_path = os.path.join(directory, 'merged.csv')
+        # Small chunks so that duplicates straddle batches
+        stats = merge_to_csv(paths, out_path, chunk_rows=97)
+        merged = pd.read_csv(out_path)
+
+    expected = pd.concat(frames[:3]).drop_duplicates()
+    assert stats['duplicates'] == 800 + (6_000 - len(expected)), f"Unexpected duplicate count: {stats}"
+    assert stats['rows'] == len(merged) == len(expected)
+    assert list(merged.columns) == ['BiosignalTime', 'HeartRateValue', 'patient_id']
+    assert pd.to_datetime(merged['BiosignalTime']).is_monotonic_increasing, "Merged rows should be sorted"
+
+    print("✅ Merge tests passed!")
+
+def test_merge_rejects_unsorted_input():
+    """A file out of time order is reported instead of merged wrongly"""
+    print("\nTesting unsorted input detection...")
+
+    frames = [
+        pd.DataFrame({'time': ['2024-01-01 00:00:01', '2024-01-01 00:00:00'], 'heart_rate_max': [1, 2]}),
+        pd.DataFrame({'time': ['2024-01-01 00:00:00'], 'heart_rate_max': [3]})
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_csvs(directory, frames)
+        try:
+            list(merge_sorted(paths))
+            raise AssertionError("Unsorted input was merged")
+        except ValueError as e:
+            assert 'not sorted' in str(e)
+
+    print("✅ Unsorted input tests passed!")
+
+if __name__ == "__main__":
+    print("Running merge tests...\n")
+
+    try:
+        test_merge_sorts_and_deduplicates()
+        test_merge_rejects_unsorted_input()
+        print("\n🎉 All tests passed! File merging is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
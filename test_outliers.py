@@ -0,0 +1,65 @@
+"""
+Test script for outlier and artifact detection
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from outliers import outlier_mask, robust_zscores
+
+def create_test_dataset():
+    """Create two days of heart rate with a different level per day and two spikes"""
+    times = pd.date_range('2024-01-01', periods=2 * 144, freq='10min')
+    rng = np.random.default_rng(0)
+    heart_rate = np.where(times.day == 1, 60.0, 100.0) + rng.normal(0, 2, len(times))
+    heart_rate[10] = 140.0
+    heart_rate[200] = 20.0
+    heart_rate[50] = np.nan
+    data = {
+        'time': times,
+        'heart_rate_max': heart_rate,
+        'patient_id': ['P001'] * len(times)
+    }
+    return Dataset(pd.DataFrame(data))
+
+def test_robust_zscores_per_day():
+    """Scores are relative to each day's own median"""
+    print("Testing robust z-scores...")
+
+    dataset = create_test_dataset()
+    scores = robust_zscores(dataset, 'heart_rate_max')
+
+    # The second day sits 40 bpm higher but is not an outlier against itself
+    assert np.nanmax(np.delete(scores, [10, 200])) < 3.5, "Day level shift flagged as outliers"
+    assert scores[10] > 3.5 and scores[200] > 3.5, "Spikes not flagged"
+    assert np.isnan(scores[50]), "Missing value got a score"
+
+    print("✅ Robust z-score tests passed!")
+
+def test_outlier_mask():
+    """The mask flags exactly the spikes and is cached"""
+    print("\nTesting outlier mask...")
+
+    dataset = create_test_dataset()
+    mask = outlier_mask(dataset)
+    assert list(np.flatnonzero(mask)) == [10, 200], f"Unexpected outliers: {np.flatnonzero(mask)}"
+    assert outlier_mask(dataset) is mask, "Outlier mask was recomputed"
+
+    print("✅ Outlier mask tests passed!")
+
+if __name__ == "__main__":
+    print("Running outlier tests...\n")
+
+    try:
+        test_robust_zscores_per_day()
+        test_outlier_mask()
+        print("\n🎉 All tests passed! The outlier detection is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
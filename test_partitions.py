@@ -0,0 +1,90 @@
+"""
+Test script for date-partitioned output
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import io
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from partitions import pq, read_metadata, read_partitions, select_partitions, write_partitions
+
+def test_partitions_by_date_and_patient():
+    """Rows land in one partition per day and patient, described by the metadata"""
+    print("Testing partitioned output...")
+
+    if pq is None:
+        print("⚠️ pyarrow is not installed, skipping partitioned output tests")
+        return
+
+    n = 3 * 24 * 60
+    df = pd.DataFrame({
+        'BiosignalTime': pd.date_range('2024-03-01', periods=n, freq='min').strftime('%Y-%m-%d %H:%M:%S'),
+        'HeartRateValue': np.arange(n, dtype=float),
+        'patient_id': np.where(np.arange(n) % 2, 'p1', 'p2')
+    })
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Two batches, the second one starting mid-day
+        metadata = write_partitions([df.iloc[:2000], df.iloc[2000:]], directory, by_patient=True)
+        assert metadata == read_metadata(directory)
+        assert metadata['time_column'] == 'BiosignalTime' and metadata['rows'] == n
+        assert [entry['path'] for entry in metadata['partitions']] == [
+            f"date=2024-03-0{day}/patient_id={patient}" for day in (1, 2, 3) for patient in ('p1', 'p2')
+        ]
+        first = metadata['partitions'][0]
+        assert first['rows'] == 720 and first['min_time'] == '2024-03-01T00:01:00'
+        assert first['max_time'] == '2024-03-01T23:59:00'
+
+        selected = select_partitions(metadata, '2024-03-02 12:00', '2024-03-02 13:00', patients=['p1'])
+        assert [entry['path'] for entry in selected] == ['date=2024-03-02/patient_id=p1']
+
+        rows = read_partitions(directory, '2024-03-02 12:00', '2024-03-03 00:00')
+        assert len(rows) == 12 * 60 + 1, f"Unexpected row count: {len(rows)}"
+        assert rows['BiosignalTime'].min() == pd.Timestamp('2024-03-02 12:00')
+        assert rows['BiosignalTime'].max() == pd.Timestamp('2024-03-03 00:00')
+
+    print("✅ Partitioned output tests passed!")
+
+def test_sparse_text_column():
+    """A text column that is empty in the first chunk still takes text later"""
+    print("\nTesting sparse columns across chunks...")
+
+    if pq is None:
+        print("⚠️ pyarrow is not installed, skipping partitioned output tests")
+        return
+
+    n = 2 * 24 * 60
+    df = pd.DataFrame({
+        'BiosignalTime': pd.date_range('2024-03-01', periods=n, freq='min').strftime('%Y-%m-%d %H:%M:%S'),
+        'HeartRateValue': np.arange(n, dtype=float),
+        'note': np.where(np.arange(n) == 2000, 'hi', '')
+    })
+    # Read back in chunks like the merge does: 'note' is all-NaN (float) on day 1
+    chunks = list(pd.read_csv(io.StringIO(df.to_csv(index=False)), chunksize=24 * 60))
+    assert chunks[0]['note'].dtype == 'float64'
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_partitions(chunks, directory)
+        rows = read_partitions(directory)
+        assert len(rows) == n
+        assert rows['note'].dropna().tolist() == ['hi']
+        assert rows['HeartRateValue'].dtype == 'float64'
+
+    print("✅ Sparse column tests passed!")
+
+if __name__ == "__main__":
+    print("Running partitioned output tests...\n")
+
+    try:
+        test_partitions_by_date_and_patient()
+        test_sparse_text_column()
+        print("\n🎉 All tests passed! Partitioned output is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,104 @@
+"""
+Test script for the segment reductions and the aggregate pyramid
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataset import Dataset
+from pyramid import Pyramid, split_budget
+from segments import segment_starts, segment_min, segment_max, segment_median, segment_first
+
+def create_test_dataset(days=3, freq='10s'):
+    """Create an old-format dataset with one sample every few seconds"""
+    times = pd.date_range('2024-01-01', periods=days * 8640, freq=freq)
+    rng = np.random.default_rng(0)
+    values = rng.uniform(50, 120, len(times))
+    data = {
+        'time': times,
+        'heart_rate_min': values - 5,
+        'heart_rate_median': values,
+        'heart_rate_max': values + 5,
+        'patient_id': ['P001'] * len(times)
+    }
+    return Dataset(pd.DataFrame(data))
+
+def test_segment_reductions():
+    """Segment reductions match pandas groupby on sorted keys"""
+    print("Testing segment reductions...")
+
+    rng = np.random.default_rng(1)
+    keys = np.sort(rng.integers(0, 50, 500))
+    values = rng.normal(size=500)
+    values[rng.integers(0, 500, 40)] = np.nan
+    labels = np.array([None if i % 3 == 0 else f"s{i}" for i in range(500)], dtype=object)
+
+    starts = segment_starts(keys)
+    grouped = pd.DataFrame({'k': keys, 'v': values, 'l': labels}).groupby('k')
+    assert np.allclose(segment_min(values, starts), grouped['v'].min(), equal_nan=True)
+    assert np.allclose(segment_max(values, starts), grouped['v'].max(), equal_nan=True)
+    assert np.allclose(segment_median(values, starts), grouped['v'].median(), equal_nan=True)
+    assert list(segment_first(labels, starts)) == list(grouped['l'].first().replace({np.nan: None}))
+
+    # One long segment among short ones is sorted with lexsort instead of padding
+    skewed = np.concatenate((np.zeros(400, dtype=int), np.arange(1, 101)))
+    grouped = pd.DataFrame({'k': skewed, 'v': values}).groupby('k')
+    assert np.allclose(segment_median(values, segment_starts(skewed)), grouped['v'].median(), equal_nan=True)
+
+    print("✅ Segment reduction tests passed!")
+
+def test_pyramid_levels():
+    """Coarser levels keep exact minima and maxima"""
+    print("\nTesting pyramid levels...")
+
+    dataset = create_test_dataset()
+    pyramid = Pyramid(dataset)
+    names = [name for name, _, _, _ in pyramid.levels]
+    assert names == ['raw', '1 minute', '10 minutes', '1 hour', '1 day', 'ISO week']
+
+    hourly = dict((name, level) for name, _, _, level in pyramid.levels)['1 hour']
+    assert len(hourly) == 72, f"Expected 72 hourly rows, got {len(hourly)}"
+    expected = dataset.frame().set_index('time')['heart_rate_max'].resample('1h').max()
+    assert np.allclose(hourly.columns['heart_rate_max'], expected.to_numpy())
+    assert hourly.columns['patient_id'][0] == 'P001'
+
+    print("✅ Pyramid level tests passed!")
+
+def test_pyramid_select():
+    """The finest level within the point budget is chosen"""
+    print("\nTesting level selection...")
+
+    dataset = create_test_dataset()
+    pyramid = Pyramid(dataset)
+
+    start, end = dataset.day_range(0, 0)
+    name, level, rows = pyramid.select(start, end, budget=10_000)
+    assert name == 'raw' and rows.stop - rows.start == 8640
+
+    start, end = dataset.day_range(0, 2)
+    name, level, rows = pyramid.select(start, end, budget=1_000)
+    assert name == '10 minutes', f"Expected '10 minutes', got {name}"
+    assert rows.stop - rows.start == 432
+
+    # Overlaid datasets share the budget in proportion to their rows
+    assert split_budget([600, 300, 100], budget=2_000) == [600, 300, 100]
+    assert split_budget([6_000, 3_000, 1_000, 0], budget=1_000) == [600, 300, 100, 1]
+
+    print("✅ Level selection tests passed!")
+
+if __name__ == "__main__":
+    print("Running pyramid tests...\n")
+
+    try:
+        test_segment_reductions()
+        test_pyramid_levels()
+        test_pyramid_select()
+        print("\n🎉 All tests passed! The aggregate pyramid is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
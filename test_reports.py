@@ -0,0 +1,72 @@
+"""
+Test script for the batch report renderer
+"""
+
+import pandas as pd
+import numpy as np
+import os
+import tempfile
+
+from render_reports import PLOTLY_JS, collect_jobs, render_reports
+
+def create_test_csv(path):
+    """Raw (new format) rows of two patients over nine days, from a Wednesday"""
+    rng = np.random.default_rng(0)
+    frames = []
+    for patient in ['p1', 'p/2']:
+        n = 9 * 24 * 60
+        frames.append(pd.DataFrame({
+            'BiosignalTime': pd.date_range('2024-01-03', periods=n, freq='min'),
+            'HeartRateValue': rng.normal(70, 8, n).round(1),
+            'RespirationRateValue': rng.normal(14, 2, n).round(1),
+            'HeartRateVariabilityValue': rng.normal(45, 10, n).round(1),
+            'RelativeStrokeVolumeValue': rng.normal(1, 0.1, n).round(3),
+            'patient_id': patient
+        }))
+    pd.concat(frames).to_csv(path, index=False)
+
+def test_reports_per_patient_and_week():
+    """One report per patient and ISO week, sharing one plotly.js"""
+    print("Testing batch report rendering...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'recording.csv')
+        create_test_csv(source)
+
+        jobs = collect_jobs([source])
+        assert [(job['patient'], f"{job['week']:%Y-%m-%d}") for job in jobs] == [
+            ('p/2', '2024-01-01'), ('p/2', '2024-01-08'), ('p1', '2024-01-01'), ('p1', '2024-01-08')
+        ], "Weeks should start on Monday"
+        assert sum(len(job['rows']) for job in jobs) == 2 * 9 * 24 * 60
+        assert len(collect_jobs([source], since='2024-01-08')) == 2
+
+        out = os.path.join(tmp, 'reports')
+        paths = render_reports([source], out, workers=2)
+        assert sorted(os.path.relpath(path, out) for path in paths) == [
+            os.path.join('p1', '2024-01-01.html'), os.path.join('p1', '2024-01-08.html'),
+            os.path.join('p_2', '2024-01-01.html'), os.path.join('p_2', '2024-01-08.html')
+        ]
+
+        bundle = os.path.getsize(os.path.join(out, PLOTLY_JS))
+        for path in paths:
+            with open(path, encoding='utf-8') as fh:
+                page = fh.read()
+            assert f'src="../{PLOTLY_JS}"' in page, "Reports should load the shared plotly.js"
+            assert len(page) < bundle, "plotly.js should not be embedded in each report"
+            assert '"type":"scatter3d"' in page
+
+        with open(os.path.join(out, 'index.html'), encoding='utf-8') as fh:
+            index = fh.read()
+        assert all(os.path.relpath(path, out).replace(os.sep, '/') in index for path in paths)
+
+    print("✅ Batch report tests passed!")
+
+if __name__ == "__main__":
+    print("Running batch report tests...\n")
+
+    try:
+        test_reports_per_patient_and_week()
+        print("\n🎉 All tests passed! The report renderer is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
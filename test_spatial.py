@@ -0,0 +1,96 @@
+"""
+Test script for the spatial index behind point details and neighborhoods
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import app
+from dataset import Dataset
+from spatial import spatial_index
+
+def create_test_dataset(n=5000):
+    """Create a dataset with three signals in very different units"""
+    rng = np.random.default_rng(0)
+    data = {
+        'time': pd.date_range('2024-01-01', periods=n, freq='min'),
+        'hrv': rng.normal(45, 10, n).round(1),
+        'hr': rng.normal(70, 8, n).round(0),
+        'rr': rng.normal(14, 2, n).round(0)
+    }
+    data['hrv'][::50] = np.nan
+    return Dataset(pd.DataFrame(data))
+
+def test_queries_match_brute_force():
+    """Radius and nearest queries agree with distances computed directly"""
+    print("Testing spatial queries...")
+
+    dataset = create_test_dataset()
+    columns = ['hrv', 'hr', 'rr']
+    index = spatial_index(dataset, columns)
+    assert spatial_index(dataset, columns) is index, "The index should be cached with the dataset"
+    assert len(index) == len(dataset) - len(dataset) // 50, "Rows with a missing coordinate are left out"
+
+    points = np.column_stack([dataset.column(c) for c in columns])
+    complete = ~np.isnan(points).any(axis=1)
+    distances = np.sqrt((((points - points[7]) / points[complete].std(axis=0)) ** 2).sum(axis=1))
+    distances[~complete] = np.inf
+    rows = slice(1000, 3000)
+    in_range = np.zeros(len(dataset), dtype=bool)
+    in_range[rows] = True
+
+    # A marker's own coordinates find it, and every sample sharing them
+    located = index.locate(points[7])
+    assert 7 in located and np.array_equal(located, np.flatnonzero(distances < 1e-9))
+
+    within = index.within(points[7], 0.3, rows)
+    assert np.array_equal(within, np.flatnonzero((distances <= 0.3) & in_range))
+
+    nearest, found = index.nearest(points[7], k=5, rows=rows)
+    expected = np.sort(distances[in_range])[:5]
+    assert np.allclose(found, expected), f"Expected distances {expected}, got {found}"
+    assert all(rows.start <= row < rows.stop for row in nearest)
+
+    print("✅ Spatial query tests passed!")
+
+def test_index_built_on_first_hover():
+    """Publishing leaves the levels unindexed; a hover indexes the plotted one"""
+    print("Testing lazy spatial indexes...")
+
+    rng = np.random.default_rng(1)
+    n = 3 * 24 * 60
+    data = {'time': pd.date_range('2024-01-01', periods=n, freq='min')}
+    for column in app.DEFAULT_AXES.values():
+        data[column] = rng.normal(50, 10, n).round(1)
+    dataset = app.publish_dataset(Dataset(pd.DataFrame(data)), persist=False)
+    levels = [level for _, _, _, level in dataset.pyramid.levels]
+    assert not any(key[0] == 'spatial' for level in levels for key in level.cache)
+
+    columns = [app.DEFAULT_AXES[axis] for axis in app.SPATIAL_AXES]
+    stored_data = app.stored_reference(dataset)
+    date_range = [0, len(stored_data['dates']) - 1]
+    _, plotted, rows = app.plotted_levels(dataset, *dataset.day_range(*date_range))[0]
+    point = dict(zip(app.SPATIAL_AXES, (plotted.column(c)[rows.start] for c in columns)))
+    _, _, level, _, found = app.plotted_marker(point, stored_data, date_range, [], columns)
+    assert level is plotted and rows.start in found
+    key = ('spatial',) + tuple(columns)
+    indexed = {id(level) for level in levels if key in level.cache}
+    assert indexed == {id(plotted)}, "Only the plotted level should be indexed"
+
+    print("✅ Lazy spatial index tests passed!")
+
+if __name__ == "__main__":
+    print("Running spatial index tests...\n")
+
+    try:
+        test_queries_match_brute_force()
+        test_index_built_on_first_hover()
+        print("\n🎉 All tests passed! The spatial index is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise
@@ -0,0 +1,156 @@
+"""
+Test script for live tailing of a growing CSV file
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from tail import CsvTail
+from dataset import Dataset, DatasetStore
+from pyramid import Pyramid
+import app
+
+def test_tail_reads_only_new_rows():
+    """Each read returns the complete rows appended since the last one"""
+    print("Testing incremental CSV reads...")
+
+    lines = ["BiosignalTime,HeartRateValue\n"] + [
+        f"2024-01-01 00:00:{s // 2:02d},{s}\n" for s in range(10)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'live.csv')
+        with open(path, 'w') as fh:
+            fh.write(''.join(lines[:4]) + lines[4][:8])
+
+        tail = CsvTail(path, group_column='biosignaltime')
+        assert tail.columns() == ['biosignaltime', 'heartratevalue']
+
+        # Rows of the last timestamp wait until a later one arrives
+        first = tail.read()
+        assert list(first['heartratevalue']) == [0, 1], f"Unexpected rows: {list(first['heartratevalue'])}"
+
+        with open(path, 'a') as fh:
+            fh.write(lines[4][8:] + ''.join(lines[5:]))
+        second = tail.read()
+        assert list(second['heartratevalue']) == [2, 3, 4, 5, 6, 7]
+        assert tail.read().empty, "Nothing new should give no rows"
+
+        # A truncated file can't be followed
+        with open(path, 'w') as fh:
+            fh.write(lines[0])
+        try:
+            tail.read()
+            raise AssertionError("A truncated file was read")
+        except ValueError:
+            pass
+
+    print("✅ Incremental CSV read tests passed!")
+
+def test_append_matches_full_build():
+    """Appending rows in batches gives the same levels as building at once"""
+    print("\nTesting incremental dataset and pyramid updates...")
+
+    rng = np.random.default_rng(0)
+    n = 20_000
+    df = pd.DataFrame({
+        'time': pd.date_range('2024-01-01 20:00', periods=n, freq='7s'),
+        'heart_rate_max': rng.normal(70, 5, n),
+        'heart_rate_median': rng.normal(65, 5, n),
+        'activity': ['rest'] * n
+    })
+    full = Pyramid(Dataset(df))
+
+    dataset = Dataset(df.iloc[:3])
+    pyramid = Pyramid(dataset)
+    for start, stop in [(3, 100), (100, 5_000), (5_000, n)]:
+        first_row, late = dataset.append_frame(df.iloc[start:stop])
+        assert first_row == start and late == 0
+        pyramid.extend(first_row)
+
+    for (name, _, _, expected), (_, _, _, level) in zip(full.levels, pyramid.levels):
+        assert np.array_equal(level.time, expected.time), f"Times differ at {name}"
+        assert np.array_equal(level.day_offsets, expected.day_offsets), f"Day index differs at {name}"
+        for column in ('heart_rate_max', 'heart_rate_median'):
+            assert np.allclose(level.columns[column], expected.columns[column]), f"{column} differs at {name}"
+        assert list(level.columns['activity']) == list(expected.columns['activity'])
+
+    # Rows that would break the time order are dropped
+    first_row, late = dataset.append_frame(df.iloc[:10])
+    assert late == 10 and len(dataset) == n
+
+    print("✅ Incremental dataset and pyramid tests passed!")
+
+def test_workers_follow_watched_file():
+    """Workers with their own copy of a watched dataset send each new row once"""
+    print("\nTesting watched files across workers...")
+
+    class Ctx:
+        triggered = [{'prop_id': 'watch-start.n_clicks'}]
+
+    def rows(start, stop):
+        times = pd.date_range('2024-01-01 08:00', periods=stop, freq='10s')[start:]
+        return ''.join(
+            f"{t},{i},{i + 1},{i + 2},{i + 3}\n" for i, t in zip(range(start, stop), times)
+        )
+
+    saved = app.WATCH_DIR, app.callback_context, app.datasets
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'live.csv')
+        with open(path, 'w') as fh:
+            fh.write("time,heart_rate_variability_max,heart_rate_max,respiration_rate_max,relative_stroke_volume_max\n")
+            fh.write(rows(0, 100))
+
+        app.WATCH_DIR = directory
+        app.callback_context = Ctx
+        worker_a = DatasetStore(os.path.join(directory, 'cache'))
+        app.datasets = worker_a
+        outputs = app.toggle_watch(1, 0, 'live.csv')
+        stored_data, shown = outputs[0], outputs[-1]
+        assert shown == 100
+
+        def refresh(store, shown):
+            app.datasets = store
+            outputs = app.refresh_watch(
+                1, stored_data, None, shown, *app.DEFAULT_AXES.values(), 'scatter', 'show', [], []
+            )
+            return list(outputs[0][0]['x'][0]), outputs[-1]
+
+        def append(start, stop):
+            with open(path, 'a') as fh:
+                fh.write(rows(start, stop))
+
+        append(100, 150)
+        x, shown = refresh(worker_a, shown)
+        assert x == list(range(100, 150)) and shown == 150
+
+        # Another worker only has the copy written when watching started
+        append(150, 180)
+        worker_b = DatasetStore(os.path.join(directory, 'cache'))
+        x, shown = refresh(worker_b, shown)
+        assert x == list(range(150, 180)) and shown == 180, "A lagging worker should catch up, not resend"
+
+        append(180, 200)
+        x, shown = refresh(worker_a, shown)
+        assert x == list(range(180, 200)) and shown == 200
+        assert len(worker_a.get(stored_data['dataset_id'])) == 200
+    app.WATCH_DIR, app.callback_context, app.datasets = saved
+
+    print("✅ Watched file tests passed!")
+
+if __name__ == "__main__":
+    print("Running live tail tests...\n")
+
+    try:
+        test_tail_reads_only_new_rows()
+        test_append_matches_full_build()
+        test_workers_follow_watched_file()
+        print("\n🎉 All tests passed! Live tailing is working correctly.")
+    except Exception as e:
+        print(f"\n❌ Test failed: {str(e)}")
+        raise